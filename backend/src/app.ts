@@ -24,6 +24,11 @@ export const createApp = (): Express => {
     res.json({ status: "ok", timestamp: new Date().toISOString() });
   });
 
+  // Downloaded ad media (scraper/src/media_downloader.py); files are named by content hash, so never change
+  if (config.mediaDir) {
+    app.use("/media", express.static(config.mediaDir, { immutable: true, maxAge: "365d", index: false }));
+  }
+
   // API Routes
   const adController = container.getAdController();
   app.use("/api/ads", createAdRoutes(adController));
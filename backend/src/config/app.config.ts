@@ -6,6 +6,7 @@ export interface AppConfig {
   port: number;
   nodeEnv: string;
   corsOrigin: string;
+  mediaDir: string | null;
 }
 
 export const getAppConfig = (): AppConfig => {
@@ -13,5 +14,6 @@ export const getAppConfig = (): AppConfig => {
     port: parseInt(process.env.PORT || "3000", 10),
     nodeEnv: process.env.NODE_ENV || "development",
     corsOrigin: process.env.CORS_ORIGIN || "http://localhost:5173",
+    mediaDir: process.env.MEDIA_DIR || null,
   };
 };
@@ -16,6 +16,9 @@ import {
   AssetType,
 } from "../../types";
 
+// `platform` of the ad_daily_stats rows counting every ad once (ALL_PLATFORMS in scraper/src/database/models.py)
+const ALL_PLATFORMS = "*";
+
 export class PostgreSQLAdRepository implements IAdRepository {
   constructor(private db: IDatabaseConnection) {}
 
@@ -178,6 +181,11 @@ export class PostgreSQLAdRepository implements IAdRepository {
   }
 
   async count(filters?: AdFilters): Promise<number> {
+    // Status/platform-only counts come from the rollup instead of scanning ads
+    if (!filters?.startDate && !filters?.endDate && !filters?.pageName) {
+      return this.countFromRollup(filters);
+    }
+
     const whereConditions: string[] = [];
     const queryParams: any[] = [];
     let paramIndex = 1;
@@ -223,29 +231,16 @@ export class PostgreSQLAdRepository implements IAdRepository {
   async getAdsByDate(
     filters?: AdFilters
   ): Promise<Array<{ date: string; count: number; active: number; inactive: number }>> {
-    const whereConditions: string[] = [];
-    const queryParams: any[] = [];
-    let paramIndex = 1;
-
-    if (filters?.platform) {
-      whereConditions.push(`a.id IN (
-        SELECT ad_id FROM ad_platforms WHERE platform = $${paramIndex}
-      )`);
-      queryParams.push(filters.platform);
-      paramIndex++;
-    }
-
-    const whereClause = whereConditions.length > 0 ? `WHERE ${whereConditions.join(" AND ")}` : "";
-
+    // Reads the ad_daily_stats rollup maintained by the Python importer (O(days), not O(ads))
     const query = `
       SELECT
-        DATE(start_date) as date,
-        COUNT(*) as count,
-        COUNT(*) FILTER (WHERE status = 'ACTIVE') as active,
-        COUNT(*) FILTER (WHERE status = 'INACTIVE') as inactive
-      FROM ads a
-      ${whereClause}
-      GROUP BY DATE(start_date)
+        start_date as date,
+        SUM(ad_count) as count,
+        COALESCE(SUM(ad_count) FILTER (WHERE status = 'ACTIVE'), 0) as active,
+        COALESCE(SUM(ad_count) FILTER (WHERE status = 'INACTIVE'), 0) as inactive
+      FROM ad_daily_stats
+      WHERE platform = $1
+      GROUP BY start_date
       ORDER BY date ASC
     `;
 
@@ -254,7 +249,7 @@ export class PostgreSQLAdRepository implements IAdRepository {
       count: string;
       active: string;
       inactive: string;
-    }>(query, queryParams);
+    }>(query, [filters?.platform || ALL_PLATFORMS]);
 
     return results.map((row) => ({
       date: row.date.toISOString().split("T")[0],
@@ -267,26 +262,24 @@ export class PostgreSQLAdRepository implements IAdRepository {
   async getPlatformStats(
     filters?: AdFilters
   ): Promise<Array<{ platform: string; count: number }>> {
-    const whereConditions: string[] = [];
-    const queryParams: any[] = [];
-    let paramIndex = 1;
+    const whereConditions: string[] = ["platform <> $1"];
+    const queryParams: any[] = [ALL_PLATFORMS];
+    let paramIndex = 2;
 
     if (filters?.status) {
-      whereConditions.push(`a.status = $${paramIndex}`);
+      whereConditions.push(`status = $${paramIndex}`);
       queryParams.push(filters.status);
       paramIndex++;
     }
 
-    const whereClause = whereConditions.length > 0 ? `WHERE ${whereConditions.join(" AND ")}` : "";
-
+    // Reads the ad_daily_stats rollup maintained by the Python importer
     const query = `
       SELECT
-        ap.platform,
-        COUNT(DISTINCT ap.ad_id) as count
-      FROM ad_platforms ap
-      INNER JOIN ads a ON ap.ad_id = a.id
-      ${whereClause}
-      GROUP BY ap.platform
+        platform,
+        SUM(ad_count) as count
+      FROM ad_daily_stats
+      WHERE ${whereConditions.join(" AND ")}
+      GROUP BY platform
       ORDER BY count DESC
     `;
 
@@ -298,11 +291,24 @@ export class PostgreSQLAdRepository implements IAdRepository {
     }));
   }
 
+  private async countFromRollup(filters?: AdFilters): Promise<number> {
+    const queryParams: any[] = [filters?.platform || ALL_PLATFORMS];
+    let statusCondition = "";
+    if (filters?.status) {
+      statusCondition = "AND status = $2";
+      queryParams.push(filters.status);
+    }
+
+    const query = `SELECT COALESCE(SUM(ad_count), 0) as total FROM ad_daily_stats WHERE platform = $1 ${statusCondition}`;
+    const result = await this.db.queryOne<{ total: string }>(query, queryParams);
+    return parseInt(result?.total || "0", 10);
+  }
+
   private async getVersionsByAdId(adId: string): Promise<AdVersion[]> {
     const query = `
       SELECT id, ad_id, version_number, ad_copy, title,
              image_url, video_url, asset_type, link_url,
-             link_description, cta_text, cta_type, caption, created_at
+             link_description, cta_text, cta_type, caption, media_path, video_path, created_at
       FROM ad_versions
       WHERE ad_id = $1
       ORDER BY version_number ASC
@@ -28,6 +28,8 @@ export interface AdVersionRow {
   cta_text: string | null;
   cta_type: string | null;
   caption: string | null;
+  media_path: string | null;
+  video_path: string | null;
   created_at: Date;
 }
 
@@ -10,6 +10,7 @@ import { AdStatus } from "../../types";
 import { Loading } from "../common/Loading";
 import { Error } from "../common/Error";
 import { getErrorMessage } from "../../utils/error";
+import { mediaSrc } from "../../utils/media";
 
 export const AdDetail = () => {
   const { id } = useParams<{ id: string }>();
@@ -100,7 +101,7 @@ export const AdDetail = () => {
                 {version.image_url && (
                   <div style={{ marginTop: "1rem" }}>
                     <img
-                      src={version.image_url}
+                      src={mediaSrc(version.media_path, version.image_url) ?? undefined}
                       alt={version.title || "Ad image"}
                       style={{ maxWidth: "400px", borderRadius: "4px" }}
                     />
@@ -109,7 +110,7 @@ export const AdDetail = () => {
                 {version.video_url && (
                   <div style={{ marginTop: "1rem" }}>
                     <video controls style={{ maxWidth: "400px", borderRadius: "4px" }}>
-                      <source src={version.video_url} />
+                      <source src={mediaSrc(version.video_path, version.video_url) ?? undefined} />
                     </video>
                   </div>
                 )}
@@ -5,6 +5,7 @@
 import { Link } from "react-router-dom";
 import type { AdWithRelations } from "../../types";
 import { AdStatus } from "../../types";
+import { mediaSrc } from "../../utils/media";
 
 interface AdListProps {
   ads: AdWithRelations[];
@@ -68,7 +69,7 @@ export const AdList = ({ ads, loading }: AdListProps) => {
           {ad.versions && ad.versions.length > 0 && ad.versions[0].image_url && (
             <div style={{ marginTop: "0.5rem" }}>
               <img
-                src={ad.versions[0].image_url}
+                src={mediaSrc(ad.versions[0].media_path, ad.versions[0].image_url) ?? undefined}
                 alt={ad.versions[0].title || "Ad image"}
                 style={{ maxWidth: "200px", borderRadius: "4px" }}
               />
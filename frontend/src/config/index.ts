@@ -4,6 +4,7 @@
 
 export const config = {
   apiUrl: import.meta.env.VITE_API_URL || "http://localhost:3000/api",
+  mediaUrl: import.meta.env.VITE_MEDIA_URL || "http://localhost:3000/media",
   appName: "Ads Dashboard",
   itemsPerPage: 20,
 } as const;
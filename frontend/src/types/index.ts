@@ -44,6 +44,8 @@ export interface AdVersion {
   cta_text: string | null;
   cta_type: string | null;
   caption: string | null;
+  media_path: string | null; // Relative to the backend's /media route
+  video_path: string | null;
   created_at: string;
 }
 
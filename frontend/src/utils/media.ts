@@ -0,0 +1,15 @@
+/**
+ * Media utility functions
+ */
+
+import { config } from "../config";
+
+/**
+ * Local copy of an ad's media when the scraper downloaded it, else the (expiring) CDN URL
+ */
+export function mediaSrc(localPath: string | null, remoteUrl: string | null): string | null {
+  if (localPath) {
+    return `${config.mediaUrl}/${localPath}`;
+  }
+  return remoteUrl;
+}
@@ -0,0 +1,111 @@
+"""
+Compact records for parsed ads
+
+ParsedAd and ParsedVersion are slotted dataclasses: no per-instance dict,
+and low-cardinality values (status, platforms, asset and CTA types, dates,
+page names) are interned so every record shares one copy of each.
+
+Records support read-only dict-style access (record["ad_id"],
+record.get("versions")), so code written against the old dict layout -
+including the database importer - accepts them directly. Dicts are only
+built when writing JSON: pass `to_json` as the `default` hook of
+json.dump/json.dumps, or call to_dict().
+"""
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+VERSION_FIELDS = (
+    "ad_copy", "title", "image_url", "video_url", "asset_type", "link_url",
+    "link_description", "cta_text", "cta_type", "caption",
+)
+
+AD_FIELDS = (
+    "ad_id", "status", "platforms", "start_date", "end_date", "page_name",
+    "page_profile_uri", "versions",
+)
+
+STATUS_ACTIVE = "active"
+STATUS_INACTIVE = "inactive"
+
+
+def intern_value(value: Any) -> Any:
+    """Intern strings so repeated values share one object; other values pass through"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class _RecordMapping:
+    """Read-only dict-style access to a record's fields"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+
+@dataclass
+class ParsedVersion(_RecordMapping):
+    """One ad version (card)"""
+
+    __slots__ = VERSION_FIELDS
+
+    ad_copy: Optional[str]
+    title: Optional[str]
+    image_url: Optional[str]
+    video_url: Optional[str]
+    asset_type: Optional[str]
+    link_url: Optional[str]
+    link_description: Optional[str]
+    cta_text: Optional[str]
+    cta_type: Optional[str]
+    caption: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in VERSION_FIELDS}
+
+
+@dataclass
+class ParsedAd(_RecordMapping):
+    """One ad with all of its versions"""
+
+    __slots__ = AD_FIELDS
+
+    ad_id: str
+    status: str
+    platforms: Tuple[str, ...]
+    start_date: Optional[str]
+    end_date: Optional[str]
+    page_name: Optional[str]
+    page_profile_uri: Optional[str]
+    versions: Tuple[ParsedVersion, ...]
+
+    @property
+    def version_count(self) -> int:
+        return len(self.versions)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The scraped_ads.json representation of the ad"""
+        return {
+            "ad_id": self.ad_id,
+            "status": self.status,
+            "platforms": list(self.platforms),
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "page_name": self.page_name,
+            "page_profile_uri": self.page_profile_uri,
+            "versions": [version.to_dict() for version in self.versions],
+            "version_count": len(self.versions),
+        }
+
+
+def to_json(obj: Any) -> Any:
+    """`default` hook for json.dump(s): converts records to dicts as they are written"""
+    if isinstance(obj, (ParsedAd, ParsedVersion)):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
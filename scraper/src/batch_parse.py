@@ -0,0 +1,252 @@
+"""
+Re-parse archived GraphQL captures in parallel
+
+Capture files (NDJSON, legacy JSON arrays or capture archives) are split
+into tasks - one per file, or per byte-range chunk of large NDJSON files
+and frame range of large archives - and parsed on a
+ProcessPoolExecutor. Results are merged with a global ad_id dedupe and
+written as sharded JSON lines files.
+
+Dedupe is deterministic: every ad is tagged with its position (file path,
+byte offset of the response or its archive frame, index within the response) and the ad from the latest
+position wins, i.e. the most recent capture when archives are named by
+date. Worker scheduling order never changes the result.
+
+Usage (from scraper/src):
+    py batch_parse.py archives/ --output-dir parsed --shards 8 --workers 4
+    py batch_parse.py "archives/2026-0*.ndjson" --chunk-mb 64
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+from ad_records import ParsedAd, to_json
+from capture_archive import ARCHIVE_SUFFIX, CaptureArchive, is_archive
+from graphql_parser import iter_collated_results, parse_collated_result
+from json_backend import CAPTURED_EDGES_POINTER, get_backend
+
+CAPTURE_EXTENSIONS = (".json", ".ndjson", ARCHIVE_SUFFIX)
+DEFAULT_SHARDS = 8
+DEFAULT_CHUNK_MB = 64
+
+# (file path, byte offset of the response, index of the ad within it)
+SourceKey = Tuple[str, int, int]
+
+
+def find_capture_files(patterns: List[str]) -> List[str]:
+    """Expand directories and glob patterns to a sorted list of capture files"""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in os.listdir(pattern):
+                if name.endswith(CAPTURE_EXTENSIONS):
+                    files.add(os.path.join(pattern, name))
+        else:
+            files.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(os.path.normpath(path) for path in files)
+
+
+def is_legacy_capture(file_path: str) -> bool:
+    if is_archive(file_path):
+        return False
+    with open(file_path, "rb") as f:
+        head = f.read(64).lstrip()
+    return head.startswith(b"[")
+
+
+def plan_tasks(files: List[str], chunk_bytes: int) -> List[Tuple[str, int, Optional[int]]]:
+    """Split files into (path, start, end) tasks; legacy arrays are never split, archives by frame"""
+    tasks = []
+    for path in files:
+        if is_archive(path):
+            tasks.extend(plan_archive_tasks(path, chunk_bytes))
+            continue
+        size = os.path.getsize(path)
+        if is_legacy_capture(path) or size <= chunk_bytes:
+            tasks.append((path, 0, None))
+            continue
+        for start in range(0, size, chunk_bytes):
+            tasks.append((path, start, min(start + chunk_bytes, size)))
+    return tasks
+
+
+def plan_archive_tasks(path: str, chunk_bytes: int) -> List[Tuple[str, int, Optional[int]]]:
+    """(path, first frame, end frame) tasks of about chunk_bytes of compressed frames each"""
+    with CaptureArchive(path) as archive:
+        tasks = []
+        start = size = 0
+        for frame, entry in enumerate(archive.entries):
+            size += entry["size"]
+            if size >= chunk_bytes:
+                tasks.append((path, start, frame + 1))
+                start, size = frame + 1, 0
+        if start < len(archive) or not tasks:
+            tasks.append((path, start, len(archive)))
+    return tasks
+
+
+def _parse_response(ads: Dict[str, Tuple[SourceKey, ParsedAd]], path: str, offset: int, raw: bytes,
+                    json_codec) -> None:
+    try:
+        results = json_codec.iter_collated_results(raw, CAPTURED_EDGES_POINTER)
+        for index, result in enumerate(results):
+            ad_data = parse_collated_result(result)
+            if ad_data:
+                _keep_latest(ads, (path, offset, index), ad_data)
+    except Exception as e:
+        print(f"Error parsing {path} at byte {offset}: {e}")
+
+
+def _keep_latest(ads: Dict[str, Tuple[SourceKey, ParsedAd]], key: SourceKey, ad_data: ParsedAd) -> None:
+    current = ads.get(ad_data.ad_id)
+    if current is None or key > current[0]:
+        ads[ad_data.ad_id] = (key, ad_data)
+
+
+def parse_chunk(path: str, start: int, end: Optional[int], backend: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse one task (a whole file, the NDJSON lines starting in [start, end)
+    or the archive frames start to end)
+
+    Returns the task's ads deduped locally (latest position wins), plus timing.
+    """
+    started = time.perf_counter()
+    json_codec = get_backend(backend)
+    ads: Dict[str, Tuple[SourceKey, ParsedAd]] = {}
+    responses = 0
+
+    if is_archive(path):
+        with CaptureArchive(path) as archive:
+            for frame in range(start, len(archive) if end is None else end):
+                responses += 1
+                _parse_response(ads, path, archive.entries[frame]["offset"], archive.read(frame), json_codec)
+        return {"path": path, "responses": responses, "ads": ads, "seconds": time.perf_counter() - started}
+
+    with open(path, "rb") as f:
+        if end is None and is_legacy_capture(path):
+            for position, response_obj in enumerate(json_codec.loads(f.read())):
+                responses += 1
+                for index, result in enumerate(iter_collated_results(response_obj)):
+                    ad_data = parse_collated_result(result)
+                    if ad_data:
+                        _keep_latest(ads, (path, position, index), ad_data)
+        else:
+            if start > 0:
+                # Skip the line that straddles the chunk boundary; it belongs to the previous chunk
+                f.seek(start - 1)
+                f.readline()
+            while end is None or f.tell() < end:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                responses += 1
+                _parse_response(ads, path, offset, line, json_codec)
+
+    return {
+        "path": path,
+        "responses": responses,
+        "ads": ads,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def shard_for(ad_id: str, shards: int) -> int:
+    """Stable shard number for an ad_id (independent of PYTHONHASHSEED)"""
+    return zlib.crc32(ad_id.encode("utf-8")) % shards
+
+
+def write_shards(ads: Dict[str, Tuple[SourceKey, ParsedAd]], output_dir: str, shards: int) -> List[str]:
+    """Write ads as ads-XXXXX-of-YYYYY.jsonl shards, sorted by ad_id within each shard"""
+    os.makedirs(output_dir, exist_ok=True)
+    buckets: List[List[str]] = [[] for _ in range(shards)]
+    for ad_id in ads:
+        buckets[shard_for(ad_id, shards)].append(ad_id)
+
+    paths = []
+    for number, ad_ids in enumerate(buckets):
+        path = os.path.join(output_dir, f"ads-{number:05d}-of-{shards:05d}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for ad_id in sorted(ad_ids):
+                f.write(json.dumps(ads[ad_id][1], ensure_ascii=False, default=to_json) + "\n")
+        paths.append(path)
+    return paths
+
+
+def batch_parse(patterns: List[str], output_dir: str, shards: int = DEFAULT_SHARDS,
+                workers: Optional[int] = None, chunk_mb: float = DEFAULT_CHUNK_MB,
+                backend: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse capture files across processes and write deduped, sharded output
+
+    Args:
+        patterns: Capture files, directories or glob patterns
+        output_dir: Directory for the sharded JSON lines output
+        shards: Number of output shards
+        workers: Worker processes (defaults to the CPU count)
+        chunk_mb: NDJSON files larger than this are split into chunks
+        backend: JSON backend name (see json_backend.get_backend)
+
+    Returns:
+        Summary with per-file timing, totals and output paths
+    """
+    files = find_capture_files(patterns)
+    if not files:
+        raise ValueError(f"No capture files found in: {', '.join(patterns)}")
+
+    tasks = plan_tasks(files, int(chunk_mb * 1024 * 1024))
+    print(f"Parsing {len(files)} files as {len(tasks)} tasks with {workers or os.cpu_count()} workers...")
+
+    started = time.perf_counter()
+    merged: Dict[str, Tuple[SourceKey, ParsedAd]] = {}
+    per_file: Dict[str, Dict[str, float]] = {path: {"seconds": 0.0, "responses": 0, "ads": 0} for path in files}
+    total_found = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_chunk, path, start, end, backend) for path, start, end in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            stats = per_file[result["path"]]
+            stats["seconds"] += result["seconds"]
+            stats["responses"] += result["responses"]
+            stats["ads"] += len(result["ads"])
+            total_found += len(result["ads"])
+            for ad_id, (key, ad_data) in result["ads"].items():
+                current = merged.get(ad_id)
+                if current is None or key > current[0]:
+                    merged[ad_id] = (key, ad_data)
+
+    wall = time.perf_counter() - started
+    outputs = write_shards(merged, output_dir, shards)
+
+    for path in files:
+        stats = per_file[path]
+        print(f"  {path}: {stats['responses']} responses, {stats['ads']} ads in {stats['seconds']:.2f}s")
+    cpu_seconds = sum(stats["seconds"] for stats in per_file.values())
+    print(f"\nParsed {total_found} ads ({len(merged)} unique) in {wall:.2f}s wall, "
+          f"{cpu_seconds:.2f}s in workers ({cpu_seconds / wall if wall else 0:.1f}x parallel speedup)")
+    print(f"Wrote {len(outputs)} shards to {output_dir}")
+
+    return {"files": per_file, "unique_ads": len(merged), "ads_found": total_found,
+            "seconds": wall, "outputs": outputs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse archived GraphQL captures in parallel")
+    parser.add_argument("inputs", nargs="+", help="Capture files, directories or glob patterns")
+    parser.add_argument("--output-dir", default="parsed_ads")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_MB,
+                        help=f"Split NDJSON files and archives larger than this into chunks (default: {DEFAULT_CHUNK_MB})")
+    parser.add_argument("--backend", default=None, help="JSON backend: auto, simdjson, orjson or json")
+    args = parser.parse_args()
+
+    batch_parse(args.inputs, args.output_dir, args.shards, args.workers, args.chunk_mb, args.backend)
@@ -0,0 +1 @@
+"""Benchmarks for the scraper, parser and importer (run with: py -m benchmarks.<name>)"""
@@ -0,0 +1,114 @@
+"""
+Full vs. capture-only browser profile against the fixture page with assets
+
+Each run launches Chromium with the profile, opens the fixture Ads Library
+page (images, video, CSS, web font and a third-party tracker) and scrolls
+until the results run out. Reported per profile (median of the runs):
+
+- time to the first captured GraphQL response, and total wall time
+- bytes the fixture server sent, split by kind
+- renderer main-thread CPU time (Chrome's TaskDuration performance metric)
+- requests the capture profile aborted
+
+Usage (from scraper/src):
+    py -m benchmarks.bench_browser_profile
+    py -m benchmarks.bench_browser_profile --runs 5 --latency 0.05
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from playwright.sync_api import sync_playwright
+
+from browser_profile import PROFILES, launch_options, new_context, save_storage_state
+from fixtures.server import FixtureServer
+from scrape_graphql import scroll_until_done
+from scroll_control import ScrollTracker
+
+
+def run_profile(playwright, fixture: FixtureServer, profile: str, storage_state_file: str,
+                idle_timeout: float) -> Dict[str, Any]:
+    """Scrape the fixture page once with a profile"""
+    url = fixture.library_url()
+    fixture.reset_counters()
+
+    browser = playwright.chromium.launch(**launch_options(profile))
+    context, blocker = new_context(browser, profile, page_url=url, storage_state_file=storage_state_file)
+    page = context.new_page()
+    cdp = context.new_cdp_session(page)
+    cdp.send("Performance.enable")
+
+    tracker = ScrollTracker()
+    first_graphql: List[float] = []
+
+    def handle_response(response):
+        if "/api/graphql/" in response.url:
+            if not first_graphql:
+                first_graphql.append(time.perf_counter())
+            try:
+                tracker.record_response({"url": response.url, "data": response.json()})
+            except Exception:
+                pass
+
+    page.on("response", handle_response)
+
+    started = time.perf_counter()
+    try:
+        page.goto(url, timeout=60000, wait_until="networkidle")
+        scroll_until_done(page, tracker, idle_timeout)
+        elapsed = time.perf_counter() - started
+        performance = {m["name"]: m["value"] for m in cdp.send("Performance.getMetrics")["metrics"]}
+        save_storage_state(context, profile, storage_state_file)
+    finally:
+        browser.close()
+
+    return {
+        "seconds": elapsed,
+        "first_graphql_ms": (first_graphql[0] - started) * 1000 if first_graphql else float("nan"),
+        "bytes": sum(fixture.bytes_served.values()),
+        "bytes_by_kind": dict(fixture.bytes_served),
+        "cpu_seconds": performance.get("TaskDuration", 0.0),
+        "script_seconds": performance.get("ScriptDuration", 0.0),
+        "blocked": sum(blocker.blocked.values()) if blocker else 0,
+        "ads": tracker.ad_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the full and capture-only browser profiles")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per profile (median reported)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Server latency per GraphQL page (s)")
+    parser.add_argument("--idle-timeout", type=float, default=2.0)
+    args = parser.parse_args()
+
+    results: Dict[str, List[Dict[str, Any]]] = {profile: [] for profile in PROFILES}
+    with FixtureServer(latency=args.latency, assets=True) as fixture, \
+            tempfile.TemporaryDirectory() as tmp, sync_playwright() as p:
+        storage_state_file = os.path.join(tmp, "browser_state.json")
+        for run in range(args.runs):
+            # Alternate the profiles so drift on the machine affects both alike
+            for profile in PROFILES:
+                result = run_profile(p, fixture, profile, storage_state_file, args.idle_timeout)
+                results[profile].append(result)
+                print(f"run {run + 1} {profile:<8} {result['ads']} ads, {result['seconds']:.2f}s, "
+                      f"{result['bytes'] / 1024:.0f} KB")
+
+    print(f"\n{'profile':<10} {'first GraphQL ms':>16} {'wall s':>8} {'KB served':>10} "
+          f"{'renderer CPU s':>15} {'script s':>9} {'blocked':>8}")
+    for profile, runs in results.items():
+        median = lambda key: statistics.median(run[key] for run in runs)
+        print(f"{profile:<10} {median('first_graphql_ms'):>16.0f} {median('seconds'):>8.2f} "
+              f"{median('bytes') / 1024:>10.0f} {median('cpu_seconds'):>15.2f} "
+              f"{median('script_seconds'):>9.2f} {median('blocked'):>8.0f}")
+
+    print("\nKB served by kind (last run):")
+    for profile, runs in results.items():
+        kinds = ", ".join(f"{kind}={size / 1024:.0f}" for kind, size in sorted(runs[-1]["bytes_by_kind"].items()))
+        print(f"  {profile:<8} {kinds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Capture storage: legacy JSON dump, NDJSON and the zstd capture archive
+
+Writes the same synthetic responses as the legacy JSON array (indent=2, what
+the scraper used to dump), as an NDJSON capture, as an archive at the capture
+level and as that archive compacted at COMPACT_LEVEL. Reports the size on
+disk, write time, time to parse every ad, time to re-parse one ad
+(parse_archived_ad decompresses one frame; the flat files have to be parsed
+until the ad turns up) and time to re-parse the responses of a time range.
+
+Usage (from scraper/src):
+    py -m benchmarks.bench_capture_archive
+    py -m benchmarks.bench_capture_archive --pages 500 --cards-per-ad 8 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import capture_archive
+from capture_archive import ArchiveWriter
+from capture_store import CaptureWriter
+from fixtures.synthetic import add_generator_arguments, generate_responses, generator_options
+from graphql_parser import iter_ads_from_archive, iter_ads_from_file, parse_archived_ad, parse_graphql_file
+
+START_TIME = 1767225600.0  # 2026-01-01, one response per minute after it
+
+
+def best_of(call: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - started)
+    return min(times) * 1000
+
+
+def find_ad(file_path: str, ad_id: str):
+    for ad in iter_ads_from_file(file_path, max_ads=None):
+        if ad.ad_id == ad_id:
+            return ad
+    return None
+
+
+def write_files(responses: List[Dict[str, Any]], directory: str, level: int) -> Dict[str, Dict[str, Any]]:
+    """Write every format; returns {format: {"path", "write_ms"}}"""
+    files = {}
+
+    started = time.perf_counter()
+    path = os.path.join(directory, "legacy.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(responses, f, indent=2, ensure_ascii=False)
+    files["legacy json"] = {"path": path, "write_ms": (time.perf_counter() - started) * 1000}
+
+    started = time.perf_counter()
+    path = os.path.join(directory, "capture.ndjson")
+    with CaptureWriter(path) as writer:
+        for response_obj in responses:
+            writer.write(response_obj["url"], response_obj["data"])
+    files["ndjson"] = {"path": path, "write_ms": (time.perf_counter() - started) * 1000}
+
+    started = time.perf_counter()
+    path = os.path.join(directory, "capture.zca")
+    with ArchiveWriter(path, append=False, level=level) as writer:
+        for i, response_obj in enumerate(responses):
+            writer.write(response_obj["url"], response_obj["data"], captured_at=START_TIME + i * 60)
+    files[f"archive l{level}"] = {"path": path, "write_ms": (time.perf_counter() - started) * 1000}
+
+    started = time.perf_counter()
+    compacted = os.path.join(directory, "compacted.zca")
+    capture_archive.compact([path], compacted)
+    files[f"compacted l{capture_archive.COMPACT_LEVEL}"] = {
+        "path": compacted, "write_ms": (time.perf_counter() - started) * 1000,
+    }
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark capture storage formats")
+    add_generator_arguments(parser)
+    parser.add_argument("--level", type=int, default=capture_archive.DEFAULT_LEVEL, help="Capture zstd level")
+    parser.add_argument("--lookups", type=int, default=20, help="Single-ad lookups to average")
+    parser.add_argument("--range", type=float, default=0.1, help="Share of the capture in the time range")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    responses = list(generate_responses(**generator_options(args)))
+    directory = tempfile.mkdtemp(prefix="bench_capture_archive_")
+    try:
+        files = write_files(responses, directory, args.level)
+        ad_ids = [ad.ad_id for ad in parse_graphql_file(files["ndjson"]["path"], max_ads=None)]
+        lookups = random.Random(args.seed).sample(ad_ids, min(args.lookups, len(ad_ids)))
+        frames = len(responses)
+        since = START_TIME + int(frames * (1 - args.range) / 2) * 60
+        until = since + max(1, int(frames * args.range)) * 60
+
+        print(f"{len(responses)} responses, {len(ad_ids)} ads")
+        print(f"{'format':<16} {'size MB':>8} {'ratio':>6} {'write ms':>9} {'parse all ms':>13} "
+              f"{'one ad ms':>10} {'range ms':>9}")
+        legacy_size = os.path.getsize(files["legacy json"]["path"])
+        for name, info in files.items():
+            path = info["path"]
+            size = os.path.getsize(path) + (os.path.getsize(path + capture_archive.INDEX_SUFFIX)
+                                            if capture_archive.is_archive(path) else 0)
+            parse_all = best_of(lambda: parse_graphql_file(path, max_ads=None), args.repeat)
+            if capture_archive.is_archive(path):
+                one_ad = best_of(lambda: [parse_archived_ad(path, ad_id) for ad_id in lookups], 1) / len(lookups)
+                time_range = best_of(lambda: list(iter_ads_from_archive(path, since, until)), args.repeat)
+                time_range = f"{time_range:.1f}"
+            else:
+                one_ad = best_of(lambda: [find_ad(path, ad_id) for ad_id in lookups], 1) / len(lookups)
+                time_range = "-"  # No capture times in the flat formats
+            print(f"{name:<16} {size / 1e6:>8.2f} {legacy_size / size:>6.1f} {info['write_ms']:>9.0f} "
+                  f"{parse_all:>13.1f} {one_ad:>10.2f} {time_range:>9}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Near-duplicate clustering: LSH buckets against all-pairs comparison
+
+Generates versions from a pool of base creatives with a few words changed
+per version (like advertisers tweaking one copy across many ads), clusters
+them with creative_index.cluster_signatures and, up to --pairwise-max
+versions, with a comparison of every pair. Reports signature throughput,
+clustering time, comparisons made and how many clusters both agree on.
+
+Usage (from scraper/src):
+    py -m benchmarks.bench_creative_index
+    py -m benchmarks.bench_creative_index --versions 1000 10000 100000 --pairwise-max 5000
+"""
+import argparse
+import random
+import time
+from typing import Dict, List, Tuple
+
+from database import creative_index
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+
+def build_versions(count: int, bases: int, edits: int, seed: int = 0) -> List[Tuple[str, str, str]]:
+    """(ad_copy, title, link_url) of count versions spread over bases creatives"""
+    rng = random.Random(seed)
+    base_copies = [[rng.choice(WORDS) for _ in range(rng.randint(15, 40))] for _ in range(bases)]
+    versions = []
+    for _ in range(count):
+        base = rng.randrange(bases)
+        words = list(base_copies[base])
+        for _ in range(rng.randint(0, edits)):
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+        versions.append((" ".join(words), f"Title {base}", f"https://www.example{base}.com/landing"))
+    return versions
+
+
+def pairwise_clusters(signatures: Dict[str, bytes], threshold: float) -> Tuple[List[List[str]], int]:
+    """Connected components of similar pairs, comparing every pair"""
+    ids = list(signatures)
+    parent = {version_id: version_id for version_id in ids}
+
+    def find(version_id: str) -> str:
+        while parent[version_id] != version_id:
+            parent[version_id] = parent[parent[version_id]]
+            version_id = parent[version_id]
+        return version_id
+
+    comparisons = 0
+    for i, a in enumerate(ids):
+        for b in ids[i + 1:]:
+            comparisons += 1
+            if creative_index.similarity(signatures[a], signatures[b]) >= threshold:
+                parent[find(b)] = find(a)
+    clusters: Dict[str, List[str]] = {}
+    for version_id in ids:
+        clusters.setdefault(find(version_id), []).append(version_id)
+    return [sorted(members) for members in clusters.values() if len(members) > 1], comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate clustering")
+    parser.add_argument("--versions", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--bases", type=float, default=0.05, help="Distinct creatives per version")
+    parser.add_argument("--edits", type=int, default=3, help="Maximum changed words per version")
+    parser.add_argument("--threshold", type=float, default=creative_index.DEFAULT_THRESHOLD)
+    parser.add_argument("--pairwise-max", type=int, default=5000, help="Skip all-pairs above this many versions")
+    args = parser.parse_args()
+
+    print(f"{'versions':>9} {'sign/s':>9} {'lsh s':>8} {'clusters':>9} {'pairwise s':>11} "
+          f"{'comparisons':>12} {'same':>6}")
+    for count in args.versions:
+        versions = build_versions(count, max(1, int(count * args.bases)), args.edits)
+        creative_index._cache.clear()
+
+        started = time.perf_counter()
+        signatures = {f"v{i}": creative_index.minhash_signature(*version) for i, version in enumerate(versions)}
+        sign_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        clusters = creative_index.cluster_signatures(signatures, args.threshold)
+        lsh_seconds = time.perf_counter() - started
+
+        pairwise = "-"
+        comparisons = "-"
+        same = "-"
+        if count <= args.pairwise_max:
+            started = time.perf_counter()
+            expected, compared = pairwise_clusters(signatures, args.threshold)
+            pairwise = f"{time.perf_counter() - started:.2f}"
+            comparisons = str(compared)
+            same = f"{len({tuple(c) for c in clusters} & {tuple(c) for c in expected}) / max(1, len(expected)):.0%}"
+        print(f"{count:>9} {count / sign_seconds:>9.0f} {lsh_seconds:>8.2f} {len(clusters):>9} {pairwise:>11} "
+              f"{comparisons:>12} {same:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Parse throughput and peak memory of each JSON backend on a recorded capture
+
+Each backend runs in its own subprocess so peak RSS is measured cleanly.
+
+Usage (from scraper/src):
+    py -m benchmarks.bench_json_backends
+    py -m benchmarks.bench_json_backends --capture-file graphql_responses.ndjson --repeat 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from capture_store import CaptureWriter
+from graphql_parser import iter_ads_from_file, iter_graphql_responses
+from json_backend import available_backends
+
+DEFAULT_CAPTURE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "graphql_responses.json")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(backend: str, ndjson_file: str, repeat: int) -> dict:
+    size = os.path.getsize(ndjson_file)
+    ads = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        ads += sum(1 for _ in iter_ads_from_file(ndjson_file, backend=backend))
+    elapsed = time.perf_counter() - started
+    return {
+        "backend": backend,
+        "mb_per_s": size * repeat / elapsed / (1024 * 1024),
+        "ads_per_s": ads / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def to_ndjson(capture_file: str, ndjson_file: str) -> None:
+    """Convert any capture file (legacy array or NDJSON) to NDJSON"""
+    with CaptureWriter(ndjson_file) as writer:
+        for response_obj in iter_graphql_responses(capture_file):
+            writer.write(response_obj.get("url", ""), response_obj.get("data"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON backends for graphql_parser")
+    parser.add_argument("--capture-file", default=DEFAULT_CAPTURE_FILE)
+    parser.add_argument("--repeat", type=int, default=10, help="Passes over the capture per backend")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--ndjson-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.ndjson_file, args.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ndjson_file = os.path.join(tmp, "capture.ndjson")
+        to_ndjson(args.capture_file, ndjson_file)
+        size_mb = os.path.getsize(ndjson_file) / (1024 * 1024)
+        print(f"Capture: {args.capture_file} ({size_mb:.1f} MB as NDJSON), {args.repeat} passes\n")
+
+        for backend in available_backends():
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_json_backends", "--worker", backend,
+                 "--ndjson-file", ndjson_file, "--repeat", str(args.repeat)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            rss = f"{result['peak_rss_mb']:.1f} MB" if result["peak_rss_mb"] is not None else "n/a"
+            print(f"{backend:>9}: {result['mb_per_s']:7.1f} MB/s  {result['ads_per_s']:9.0f} ads/s  peak RSS {rss}")
+
+
+if __name__ == "__main__":
+    main()
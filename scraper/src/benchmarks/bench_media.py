@@ -0,0 +1,81 @@
+"""
+Media downloader against the local fixture server
+
+Builds a list of media URLs on the fixture server (images and videos, with
+URLs repeated across versions and re-signed like re-scraped CDN links) and
+downloads them into a temporary store three times:
+
+- cold: empty store
+- re-signed: same files behind new signatures (served from the URL index)
+- copies: same content behind other paths (downloaded, stored once)
+
+Reports files/s, MB/s and what was downloaded or skipped per pass, for a
+few concurrency levels.
+
+Usage (from scraper/src):
+    py -m benchmarks.bench_media
+    py -m benchmarks.bench_media --files 500 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from fixtures.server import FixtureServer
+from graphql_replay import HttpPool
+from media_downloader import MediaDownloader, MediaStore
+
+
+def build_urls(fixture: FixtureServer, files: int, video_share: float, seed: int = 0) -> List[Tuple[str, str]]:
+    """(url, kind) pairs; every file appears twice, like versions sharing an image"""
+    rng = random.Random(seed)
+    urls = []
+    for i in range(files):
+        kind = "video" if rng.random() < video_share else "image"
+        url = fixture.media_url(f"asset{i}", "mp4" if kind == "video" else "jpg", token=f"{rng.getrandbits(32):08x}")
+        urls.extend([(url, kind)] * 2)
+    return urls
+
+
+def resign(urls: List[Tuple[str, str]], token: str) -> List[Tuple[str, str]]:
+    return [(url.split("?")[0] + f"?oh={token}", kind) for url, kind in urls]
+
+
+def run_pass(store_dir: str, urls: List[Tuple[str, str]], concurrency: int) -> Dict[str, Any]:
+    downloader = MediaDownloader(MediaStore(store_dir), HttpPool(max_connections=concurrency))
+    started = time.perf_counter()
+    results = asyncio.run(downloader.run_all(urls, concurrency))
+    elapsed = time.perf_counter() - started
+    downloader.pool.close()
+    return dict(downloader.stats, seconds=elapsed, urls=len(results),
+                failures=sum(1 for stored in results.values() if stored is None))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the media downloader against the fixture server")
+    parser.add_argument("--files", type=int, default=200, help="Distinct media files")
+    parser.add_argument("--video-share", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>11} {'pass':<10} {'URLs':>6} {'files/s':>9} {'MB/s':>8} {'downloaded':>10} "
+          f"{'cached':>7} {'dupes':>6} {'failed':>7}")
+    with FixtureServer() as fixture:
+        urls = build_urls(fixture, args.files, args.video_share)
+        copies = [(url.replace("/media/", "/media/mirror/"), kind) for url, kind in urls]
+        for concurrency in args.concurrency:
+            with tempfile.TemporaryDirectory() as store_dir:
+                passes = [("cold", urls), ("re-signed", resign(urls, "new")), ("copies", copies)]
+                for name, pass_urls in passes:
+                    result = run_pass(store_dir, pass_urls, concurrency)
+                    print(f"{concurrency:>11} {name:<10} {result['urls']:>6} "
+                          f"{result['urls'] / result['seconds']:>9.0f} "
+                          f"{result['bytes'] / 1024 / 1024 / result['seconds']:>8.1f} "
+                          f"{result['downloaded']:>10} {result['cached']:>7} {result['deduplicated']:>6} "
+                          f"{result['failed']:>7}")
+
+
+if __name__ == "__main__":
+    main()
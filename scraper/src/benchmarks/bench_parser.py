@@ -0,0 +1,186 @@
+"""
+Parser micro/macro benchmarks on synthetic GraphQL responses
+
+Times parse_timestamp, parse_card, parse_collated_result,
+parse_graphql_responses and the file load path (parse_graphql_file on an
+NDJSON and a legacy JSON array capture). Each case reports throughput
+(best of --repeat runs), peak traced memory and the number of memory
+blocks still allocated by its output (tracemalloc, measured in a separate
+untimed run).
+
+Results can be saved as a baseline and compared on later runs; a
+throughput drop larger than --threshold percent exits with status 1.
+
+Usage (from scraper/src):
+    py -m benchmarks.bench_parser
+    py -m benchmarks.bench_parser --save-baseline benchmarks/baselines/parser.json
+    py -m benchmarks.bench_parser --compare benchmarks/baselines/parser.json
+    py -m benchmarks.bench_parser --pages 100 --cards-per-ad 8 --malformed-rate 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from fixtures.synthetic import add_generator_arguments, generate_responses, generator_options
+from graphql_parser import (
+    iter_collated_results,
+    parse_card,
+    parse_collated_result,
+    parse_graphql_file,
+    parse_graphql_responses,
+    parse_timestamp,
+)
+from json_backend import get_backend
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "parser.json")
+DEFAULT_THRESHOLD = 10.0
+
+# name -> (function running the case once and returning its output, items processed, unit)
+Case = Tuple[Callable[[], Any], int, str]
+
+
+def build_cases(responses: List[Dict[str, Any]], ndjson_file: str, legacy_file: str, backend: str) -> Dict[str, Case]:
+    results = [result for response_obj in responses for result in iter_collated_results(response_obj)]
+    cards = [card for result in results for card in (result.get("snapshot") or {}).get("cards") or ()]
+    timestamps = [result.get(key) for result in results for key in ("start_date", "end_date")]
+    ads = len(parse_graphql_responses(responses, max_ads=None))
+
+    return {
+        "parse_timestamp": (lambda: [parse_timestamp(ts) for ts in timestamps], len(timestamps), "timestamps"),
+        "parse_card": (lambda: [parse_card(card) for card in cards], len(cards), "cards"),
+        "parse_collated_result": (lambda: [parse_collated_result(result) for result in results], len(results), "results"),
+        "parse_graphql_responses": (lambda: parse_graphql_responses(responses, max_ads=None), ads, "ads"),
+        "parse_graphql_file[ndjson]": (lambda: parse_graphql_file(ndjson_file, max_ads=None, backend=backend), ads, "ads"),
+        "parse_graphql_file[legacy]": (lambda: parse_graphql_file(legacy_file, max_ads=None, backend=backend), ads, "ads"),
+    }
+
+
+def measure(run: Callable[[], Any], items: int, unit: str, repeat: int) -> Dict[str, Any]:
+    """Best-of-`repeat` timing, then one traced run for memory"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        output = run()
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    del output
+
+    return {
+        "items": items,
+        "unit": unit,
+        "seconds": best,
+        "items_per_s": items / best if best > 0 else 0.0,
+        "peak_kb": peak / 1024,
+        "retained_kb": current / 1024,
+        "retained_blocks": blocks,
+    }
+
+
+def run_benchmarks(options: Dict[str, Any], repeat: int, backend: str) -> Dict[str, Any]:
+    responses = list(generate_responses(**options))
+    json_codec = get_backend(backend)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ndjson_file = os.path.join(tmp, "capture.ndjson")
+        legacy_file = os.path.join(tmp, "capture.json")
+        with open(ndjson_file, "w", encoding="utf-8") as f:
+            for response_obj in responses:
+                f.write(json_codec.dumps(response_obj) + "\n")
+        with open(legacy_file, "w", encoding="utf-8") as f:
+            f.write(json_codec.dumps(responses))
+        capture_mb = os.path.getsize(ndjson_file) / (1024 * 1024)
+
+        cases = build_cases(responses, ndjson_file, legacy_file, json_codec.name)
+        print(f"Synthetic capture: {options['pages']} responses, {capture_mb:.1f} MB, "
+              f"backend {json_codec.name}, best of {repeat}\n")
+        print(f"{'case':<28} {'items':>8} {'items/s':>12} {'us/item':>9} {'peak KB':>10} {'blocks':>9}")
+
+        results = {}
+        for name, (run, items, unit) in cases.items():
+            result = measure(run, items, unit, repeat)
+            results[name] = result
+            per_item = result["seconds"] / items * 1e6 if items else 0.0
+            print(f"{name:<28} {items:>8} {result['items_per_s']:>12,.0f} {per_item:>9.2f} "
+                  f"{result['peak_kb']:>10,.0f} {result['retained_blocks']:>9,}")
+
+    return {
+        "generator": options,
+        "backend": json_codec.name,
+        "repeat": repeat,
+        "capture_mb": capture_mb,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print deltas against a baseline; returns the cases that regressed"""
+    if baseline.get("generator") != report["generator"] or baseline.get("backend") != report["backend"]:
+        print("\nWarning: baseline was recorded with different generator options or backend")
+
+    print(f"\nCompared to baseline from {baseline.get('created_at', '?')} (Python {baseline.get('python', '?')}):")
+    print(f"{'case':<28} {'items/s':>10} {'peak mem':>10}")
+    regressions = []
+    for name, result in report["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            print(f"{name:<28} {'(new)':>10}")
+            continue
+        speed = (result["items_per_s"] / base["items_per_s"] - 1) * 100 if base["items_per_s"] else 0.0
+        memory = (result["peak_kb"] / base["peak_kb"] - 1) * 100 if base["peak_kb"] else 0.0
+        flag = ""
+        if speed < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28} {speed:>+9.1f}% {memory:>+9.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark graphql_parser on synthetic responses")
+    add_generator_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case (best is kept)")
+    parser.add_argument("--backend", default="json", help="JSON backend for the file cases (default: json)")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                        help=f"Write results as a baseline (default: {os.path.relpath(DEFAULT_BASELINE)})")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                        help="Compare results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Throughput drop (percent) reported as a regression (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    report = run_benchmarks(generator_options(args), args.repeat, args.backend)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
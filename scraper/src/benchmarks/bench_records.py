@@ -0,0 +1,85 @@
+"""
+Memory of parsed ads held as ParsedAd records vs plain dicts
+
+Parses a large synthetic capture with parse_graphql_file (slotted records,
+interned values) and compares the retained memory with the same ads held
+in the dict layout, as loaded from a JSON lines dump of them. Memory is
+measured with tracemalloc after a full collection; the capture itself is
+not retained by either layout.
+
+Usage (from scraper/src):
+    py -m benchmarks.bench_records
+    py -m benchmarks.bench_records --pages 1000 --cards-per-ad 5
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+from ad_records import to_json
+from fixtures.synthetic import add_generator_arguments, generator_options, write_capture
+from graphql_parser import parse_graphql_file
+
+
+def retained(build: Callable[[], Any]) -> Tuple[Any, int, float]:
+    """Build a value under tracemalloc; returns it with its retained bytes and build time"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        value = build()
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return value, current, elapsed
+
+
+def load_json_lines(file_path: str) -> list:
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory of ParsedAd records and dicts")
+    add_generator_arguments(parser)
+    parser.set_defaults(pages=200)
+    parser.add_argument("--backend", default="json", help="JSON backend used to parse the capture")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        capture_file = os.path.join(tmp, "capture.ndjson")
+        dicts_file = os.path.join(tmp, "ads.jsonl")
+        write_capture(capture_file, **generator_options(args))
+        capture_mb = os.path.getsize(capture_file) / (1024 * 1024)
+
+        records, records_bytes, records_seconds = retained(
+            lambda: parse_graphql_file(capture_file, max_ads=None, backend=args.backend))
+        with open(dicts_file, "w", encoding="utf-8") as f:
+            for ad in records:
+                f.write(json.dumps(ad, ensure_ascii=False, default=to_json) + "\n")
+        ads = len(records)
+        versions = sum(ad.version_count for ad in records)
+        del records
+
+        dicts, dicts_bytes, _ = retained(lambda: load_json_lines(dicts_file))
+        assert len(dicts) == ads
+        del dicts
+
+    print(f"Synthetic capture: {capture_mb:.1f} MB, {ads} ads, {versions} versions "
+          f"(parsed in {records_seconds:.2f}s with {args.backend})\n")
+    print(f"{'layout':<16} {'retained MB':>12} {'bytes/ad':>10}")
+    for name, size in (("dicts", dicts_bytes), ("ParsedAd", records_bytes)):
+        print(f"{name:<16} {size / (1024 * 1024):>12.1f} {size / ads if ads else 0:>10.0f}")
+    if records_bytes:
+        print(f"\nRecords use {records_bytes / dicts_bytes:.0%} of the dict layout "
+              f"({dicts_bytes / records_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
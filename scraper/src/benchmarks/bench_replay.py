@@ -0,0 +1,74 @@
+"""
+Throughput of cursor replay vs. browser scrolling against the local fixture server
+
+Usage (from scraper/src):
+    py -m benchmarks.bench_replay --targets 8 --concurrency 4 --latency 0.05
+    py -m benchmarks.bench_replay --browser   # also run the Playwright scroll path
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from fixtures.server import FIXTURE_LSD, FixtureServer
+from graphql_parser import parse_graphql_responses
+from graphql_replay import HttpPool, ReplaySession, replay_many
+
+
+def fixture_session(fixture: FixtureServer, page_id: str) -> ReplaySession:
+    """Replay session equivalent to what the browser captures on the fixture page"""
+    variables = json.dumps({"cursor": None, "viewAllPageID": page_id})
+    form = {"doc_id": "fixture", "lsd": FIXTURE_LSD, "variables": variables}
+    return ReplaySession(f"{fixture.base_url}/api/graphql/", form, cursor="0")
+
+
+def bench_replay(fixture: FixtureServer, page_ids, concurrency: int) -> dict:
+    pool = HttpPool(max_connections=concurrency)
+    started = time.perf_counter()
+    results = replay_many([fixture_session(fixture, page_id) for page_id in page_ids], pool,
+                          concurrency=concurrency)
+    ads = sum(len(parse_graphql_responses(responses, max_ads=10 ** 9)) for responses in results)
+    elapsed = time.perf_counter() - started
+    pool.close()
+    pages = sum(len(responses) for responses in results)
+    return {"mode": "replay", "seconds": elapsed, "pages": pages, "ads": ads,
+            "connections": pool.connections_opened}
+
+
+def bench_browser(fixture: FixtureServer, page_ids, concurrency: int) -> dict:
+    from scrape_multi import scrape_targets
+
+    targets = [fixture.library_url(page_id) for page_id in page_ids]
+    before = fixture.graphql_requests
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as output_dir:
+        results = asyncio.run(scrape_targets(targets, output_dir, concurrency=concurrency,
+                                             contexts=concurrency, max_ads=10 ** 9, idle_timeout=2.0))
+    elapsed = time.perf_counter() - started
+    return {"mode": "browser", "seconds": elapsed, "pages": fixture.graphql_requests - before,
+            "ads": sum(r.get("ads", 0) for r in results), "connections": None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark replay vs. browser pagination")
+    parser.add_argument("--targets", type=int, default=8, help="Number of fixture advertisers")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="Server latency per GraphQL page (s)")
+    parser.add_argument("--browser", action="store_true", help="Also benchmark the browser scroll path")
+    args = parser.parse_args()
+
+    page_ids = [str(100000 + i) for i in range(args.targets)]
+    with FixtureServer(latency=args.latency) as fixture:
+        results = [bench_replay(fixture, page_ids, args.concurrency)]
+        if args.browser:
+            results.append(bench_browser(fixture, page_ids, args.concurrency))
+
+    for result in results:
+        print(f"{result['mode']:>8}: {result['pages']} pages, {result['ads']} ads in {result['seconds']:.2f}s "
+              f"- {result['pages'] / result['seconds']:.1f} pages/s, {result['ads'] / result['seconds']:.0f} ads/s"
+              + (f", {result['connections']} connections" if result["connections"] is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Browser profiles for capture runs
+
+- full: 1920x1080 context that loads everything, like a user's browser
+- capture: only what the page needs to issue its /api/graphql/ requests.
+  Images, media, fonts and stylesheets are aborted through request routing,
+  as are requests to third-party hosts; the viewport is small, background
+  Chromium features are switched off and service workers are blocked.
+  Cookies and local storage (e.g. the cookie consent) are kept in a storage
+  state file and reused by the next run, which skips the consent round trips.
+
+The scrapers take --browser-profile full|capture (default: full).
+benchmarks/bench_browser_profile.py compares both against the fixture page.
+"""
+import ipaddress
+import os
+from collections import Counter
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+PROFILES = ("full", "capture")
+DEFAULT_PROFILE = "full"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+FULL_VIEWPORT = {"width": 1920, "height": 1080}
+CAPTURE_VIEWPORT = {"width": 800, "height": 600}
+
+STORAGE_STATE_FILE = "browser_state.json"
+
+# Playwright resource types the capture profile never loads
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet", "texttrack", "manifest"})
+
+# Sites serving the Ads Library's own scripts besides the page's site
+FIRST_PARTY_SITES = frozenset({"facebook.com", "fbcdn.net"})
+
+CHROMIUM_ARGS = [
+    "--blink-settings=imagesEnabled=false",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--disable-gpu",
+    "--disable-sync",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+
+def site_of(host: str) -> str:
+    """Registrable-domain approximation: the last two labels (IP addresses and single labels as they are)"""
+    host = (host or "").lower().rstrip(".")
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    labels = host.split(".")
+    return ".".join(labels[-2:]) if len(labels) > 2 else host
+
+
+def block_reason(resource_type: str, url: str, page_site: Optional[str]) -> Optional[str]:
+    """Why the capture profile aborts a request, or None to let it through"""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return resource_type
+    if page_site:
+        scheme = urlparse(url).scheme
+        if scheme in ("http", "https"):
+            site = site_of(urlparse(url).hostname or "")
+            if site != page_site and site not in FIRST_PARTY_SITES:
+                return "third_party"
+    return None
+
+
+class RequestBlocker:
+    """Route handler of the capture profile; counts allowed and blocked requests"""
+
+    def __init__(self, page_url: Optional[str] = None):
+        # Without a page URL the first top-level document decides what is first party
+        self.page_site = site_of(urlparse(page_url).hostname or "") if page_url else None
+        self.allowed = 0
+        self.blocked: Counter = Counter()
+
+    def _reason(self, request) -> Optional[str]:
+        if self.page_site is None and request.resource_type == "document":
+            self.page_site = site_of(urlparse(request.url).hostname or "")
+        reason = block_reason(request.resource_type, request.url, self.page_site)
+        if reason:
+            self.blocked[reason] += 1
+        else:
+            self.allowed += 1
+        return reason
+
+    def handle(self, route) -> None:
+        """Handler for the sync API (context.route)"""
+        if self._reason(route.request):
+            route.abort("blockedbyclient")
+        else:
+            route.continue_()
+
+    async def handle_async(self, route) -> None:
+        """Handler for the async API (await context.route)"""
+        if self._reason(route.request):
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    def report(self) -> str:
+        blocked = ", ".join(f"{reason}={count}" for reason, count in self.blocked.most_common())
+        return f"{self.allowed} requests allowed, {sum(self.blocked.values())} blocked ({blocked or 'none'})"
+
+
+def launch_options(profile: str = DEFAULT_PROFILE, headless: bool = True) -> Dict[str, Any]:
+    """Keyword arguments for chromium.launch()"""
+    options: Dict[str, Any] = {"headless": headless}
+    if profile == "capture":
+        options["args"] = list(CHROMIUM_ARGS)
+    return options
+
+
+def context_options(profile: str = DEFAULT_PROFILE,
+                    storage_state_file: Optional[str] = STORAGE_STATE_FILE) -> Dict[str, Any]:
+    """Keyword arguments for browser.new_context()"""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown browser profile {profile!r} (expected one of: {', '.join(PROFILES)})")
+    if profile == "full":
+        return {"viewport": FULL_VIEWPORT, "user_agent": USER_AGENT}
+
+    options: Dict[str, Any] = {
+        "viewport": CAPTURE_VIEWPORT,
+        "user_agent": USER_AGENT,
+        "device_scale_factor": 1,
+        "service_workers": "block",
+        "reduced_motion": "reduce",
+    }
+    if storage_state_file and os.path.exists(storage_state_file):
+        options["storage_state"] = storage_state_file
+    return options
+
+
+def new_context(browser, profile: str = DEFAULT_PROFILE, page_url: Optional[str] = None,
+                storage_state_file: Optional[str] = STORAGE_STATE_FILE):
+    """
+    Open a browser context for a profile (sync API)
+
+    Returns:
+        (context, RequestBlocker or None for the full profile)
+    """
+    context = browser.new_context(**context_options(profile, storage_state_file))
+    blocker = None
+    if profile == "capture":
+        blocker = RequestBlocker(page_url)
+        context.route("**/*", blocker.handle)
+    return context, blocker
+
+
+async def new_context_async(browser, profile: str = DEFAULT_PROFILE, page_url: Optional[str] = None,
+                            storage_state_file: Optional[str] = STORAGE_STATE_FILE):
+    """Async API version of new_context()"""
+    context = await browser.new_context(**context_options(profile, storage_state_file))
+    blocker = None
+    if profile == "capture":
+        blocker = RequestBlocker(page_url)
+        await context.route("**/*", blocker.handle_async)
+    return context, blocker
+
+
+def save_storage_state(context, profile: str = DEFAULT_PROFILE,
+                       storage_state_file: Optional[str] = STORAGE_STATE_FILE) -> None:
+    """Keep cookies/local storage of a capture context for the next run (sync API)"""
+    if profile == "capture" and storage_state_file:
+        try:
+            context.storage_state(path=storage_state_file)
+        except Exception as e:
+            print(f"[WARN] Could not save browser storage state: {e}")
+
+
+async def save_storage_state_async(context, profile: str = DEFAULT_PROFILE,
+                                   storage_state_file: Optional[str] = STORAGE_STATE_FILE) -> None:
+    """Async API version of save_storage_state()"""
+    if profile == "capture" and storage_state_file:
+        try:
+            await context.storage_state(path=storage_state_file)
+        except Exception as e:
+            print(f"[WARN] Could not save browser storage state: {e}")
@@ -0,0 +1,395 @@
+"""
+Compressed, indexed archive of captured GraphQL responses
+
+An archive is two files:
+
+- <name>.zca: one zstd frame per response; each frame holds the same JSON
+  object as an NDJSON capture line plus the capture time
+  ({"url", "captured_at", "data"})
+- <name>.zca.idx: one JSON line per frame with its offset and size, the
+  capture time, a hash of the response payload and the ad_archive_ids it
+  contains
+
+Archives are only ever appended to, so they keep the history of every run.
+Readers mmap the data file and load the index, so one ad or a time range is
+re-parsed by decompressing just the frames that hold it. A frame written
+without its index line (crash in between) is cut off the next time the
+archive is opened for appending.
+
+Compaction merges archives (and NDJSON or legacy JSON captures), drops
+duplicate responses and recompresses at a higher level:
+    py capture_archive.py compact captures/*.zca graphql_responses.ndjson -o captures/archive.zca
+    py capture_archive.py info captures/archive.zca
+    py capture_archive.py show captures/archive.zca --ad 1234567890
+    py capture_archive.py reindex captures/archive.zca      # rebuild a lost index
+
+Requires zstandard (pip install zstandard).
+"""
+import argparse
+import bisect
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from graphql_parser import iter_collated_results, iter_graphql_responses
+from json_backend import get_backend
+
+ARCHIVE_SUFFIX = ".zca"
+INDEX_SUFFIX = ".idx"
+DEFAULT_LEVEL = 3  # Fast enough to keep up with capture; compaction recompresses
+COMPACT_LEVEL = 19
+REINDEX_CHUNK_SIZE = 1024 * 1024
+_FRAME_HEADER_SIZE_MAX = 18
+
+
+def is_archive(file_path: str) -> bool:
+    return file_path.endswith(ARCHIVE_SUFFIX)
+
+
+def _require_zstandard() -> None:
+    if zstandard is None:
+        raise RuntimeError("Capture archives require zstandard (pip install zstandard)")
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def encode_response(url: Optional[str], data: Any, captured_at: float, json_backend=None):
+    """(frame JSON, sha256 of the payload); the hash ignores the capture time, so re-captures match"""
+    json_backend = json_backend or get_backend()
+    payload = json_backend.dumps(data)
+    raw = f'{{"url":{json_backend.dumps(url)},"captured_at":{captured_at!r},"data":{payload}}}'
+    return raw.encode("utf-8"), hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def response_ad_ids(data: Dict[str, Any]) -> List[str]:
+    """ad_archive_ids of the collated results in a response payload, in order"""
+    ids = []
+    for result in iter_collated_results({"data": data}):
+        ad_id = result.get("ad_archive_id") if isinstance(result, dict) else None
+        if ad_id:
+            ids.append(str(ad_id))
+    return list(dict.fromkeys(ids))
+
+
+def _load_index(index_path: str, data_size: int) -> List[Dict[str, Any]]:
+    """Index entries whose frames are complete in a data file of data_size bytes"""
+    entries = []
+    if not os.path.exists(index_path):
+        return entries
+    with open(index_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # Torn last line
+            if entry["offset"] + entry["size"] > data_size:
+                break
+            entries.append(entry)
+    return entries
+
+
+class ArchiveWriter:
+    """Appends captured responses to an archive (same interface as capture_store.CaptureWriter)"""
+
+    def __init__(self, file_path: str, append: bool = True, level: int = DEFAULT_LEVEL):
+        _require_zstandard()
+        self.file_path = file_path
+        self.count = 0
+        self.bytes_written = 0  # Compressed
+        self.raw_bytes = 0
+        self._json = get_backend()
+        self._compressor = zstandard.ZstdCompressor(level=level, write_content_size=True)
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        index_path = file_path + INDEX_SUFFIX
+        if append and os.path.exists(file_path):
+            entries = _load_index(index_path, os.path.getsize(file_path))
+            end = entries[-1]["offset"] + entries[-1]["size"] if entries else 0
+            # Drop frames (and index lines) a crashed writer left unindexed
+            with open(file_path, "r+b") as f:
+                f.truncate(end)
+            with open(index_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in entries)
+            self._offset = end
+        else:
+            self._offset = 0
+        mode = "ab" if append else "wb"
+        self._file = open(file_path, mode)
+        self._index = open(index_path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, url: str, data: Dict[str, Any], captured_at: Optional[float] = None,
+              ad_ids: Optional[List[str]] = None) -> None:
+        """Append one response as a frame, then its index line"""
+        captured_at = time.time() if captured_at is None else captured_at
+        raw, digest = encode_response(url, data, captured_at, self._json)
+        self.write_raw(raw, captured_at, response_ad_ids(data) if ad_ids is None else ad_ids, digest)
+
+    def write_raw(self, raw: bytes, captured_at: float, ad_ids: List[str], digest: str) -> None:
+        """Append an already encoded response (see encode_response)"""
+        frame = self._compressor.compress(raw)
+        self._file.write(frame)
+        self._file.flush()
+        entry = {"offset": self._offset, "size": len(frame), "captured_at": captured_at,
+                 "sha256": digest, "ads": ad_ids}
+        self._index.write(json.dumps(entry) + "\n")
+        self._index.flush()
+        self._offset += len(frame)
+        self.count += 1
+        self.bytes_written += len(frame)
+        self.raw_bytes += len(raw)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CaptureArchive:
+    """Read-only view of an archive: memory-mapped frames, looked up through the index"""
+
+    def __init__(self, file_path: str):
+        _require_zstandard()
+        self.file_path = file_path
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._json = get_backend()
+        self._file = open(file_path, "rb")
+        size = os.path.getsize(file_path)
+        # mmap cannot map an empty file
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.entries = _load_index(file_path + INDEX_SUFFIX, size)
+
+        self._by_ad: Dict[str, List[int]] = {}
+        for frame, entry in enumerate(self.entries):
+            for ad_id in entry["ads"]:
+                self._by_ad.setdefault(ad_id, []).append(frame)
+        self._by_time = sorted(range(len(self.entries)), key=lambda frame: self.entries[frame]["captured_at"])
+        self._times = [self.entries[frame]["captured_at"] for frame in self._by_time]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def read(self, frame: int) -> bytes:
+        """Decompressed JSON of one frame"""
+        entry = self.entries[frame]
+        return self._decompressor.decompress(self._data[entry["offset"]:entry["offset"] + entry["size"]])
+
+    def raw_size(self, frame: int) -> int:
+        """Decompressed size of a frame, from its header"""
+        offset = self.entries[frame]["offset"]
+        return zstandard.frame_content_size(self._data[offset:offset + _FRAME_HEADER_SIZE_MAX])
+
+    def response(self, frame: int) -> Dict[str, Any]:
+        return self._json.loads(self.read(frame))
+
+    def frames_for_ad(self, ad_id: str) -> List[int]:
+        """Frames containing an ad, oldest capture first"""
+        return sorted(self._by_ad.get(str(ad_id), []), key=lambda frame: self.entries[frame]["captured_at"])
+
+    def frames_between(self, since: Optional[float] = None, until: Optional[float] = None) -> List[int]:
+        """Frames captured in [since, until) (Unix time), oldest first"""
+        start = bisect.bisect_left(self._times, since) if since is not None else 0
+        end = bisect.bisect_left(self._times, until) if until is not None else len(self._times)
+        return self._by_time[start:end]
+
+    def iter_responses(self, frames: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Decode frames one at a time (all of them, oldest first, by default)"""
+        for frame in self._by_time if frames is None else frames:
+            yield self.response(frame)
+
+    def ad_ids(self) -> List[str]:
+        return list(self._by_ad)
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _iter_source(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Responses of an archive or capture file as frame records (raw, captured_at, ads, sha256), oldest first"""
+    if is_archive(file_path):
+        with CaptureArchive(file_path) as archive:
+            for frame in archive.frames_between():
+                entry = archive.entries[frame]
+                yield {"raw": archive.read(frame), "captured_at": entry["captured_at"],
+                       "ads": entry["ads"], "sha256": entry["sha256"]}
+        return
+
+    # NDJSON and legacy JSON captures have no capture times; use the file's
+    json_backend = get_backend()
+    captured_at = os.path.getmtime(file_path)
+    for response_obj in iter_graphql_responses(file_path):
+        data = response_obj.get("data")
+        raw, digest = encode_response(response_obj.get("url"), data, captured_at, json_backend)
+        yield {"raw": raw, "captured_at": captured_at, "ads": response_ad_ids(data), "sha256": digest}
+
+
+def compact(sources: List[str], destination: str, level: int = COMPACT_LEVEL, since: Optional[float] = None,
+            until: Optional[float] = None, keep_duplicates: bool = False) -> Dict[str, int]:
+    """
+    Merge archives and capture files into one archive, oldest capture first
+
+    Sources are streamed and merged by capture time, so memory does not grow with their size.
+
+    Args:
+        sources: Archives (.zca) and NDJSON / legacy JSON capture files
+        destination: Archive to write (replaced atomically; may be one of the sources)
+        level: zstd level of the new frames
+        since / until: Keep only responses captured in [since, until) (Unix time)
+        keep_duplicates: Keep responses whose payload was already archived
+
+    Returns:
+        Counts of responses read, written and dropped as duplicates, and the sizes before and after
+    """
+    _require_zstandard()
+    size_before = sum(os.path.getsize(source) for source in sources)
+    seen = set()
+    read = duplicates = 0
+    temp_path = destination + ".tmp"
+    records = heapq.merge(*(_iter_source(source) for source in sources), key=lambda record: record["captured_at"])
+    with ArchiveWriter(temp_path, append=False, level=level) as writer:
+        for record in records:
+            if since is not None and record["captured_at"] < since:
+                continue
+            if until is not None and record["captured_at"] >= until:
+                continue
+            read += 1
+            if not keep_duplicates and record["sha256"] in seen:
+                duplicates += 1
+                continue
+            seen.add(record["sha256"])
+            writer.write_raw(record["raw"], record["captured_at"], record["ads"], record["sha256"])
+
+    os.replace(temp_path, destination)
+    os.replace(temp_path + INDEX_SUFFIX, destination + INDEX_SUFFIX)
+    return {"read": read, "written": writer.count, "duplicates": duplicates,
+            "bytes_before": size_before, "bytes_after": writer.bytes_written}
+
+
+def reindex(file_path: str) -> int:
+    """Rebuild the sidecar index by walking the frames of a data file; returns the frame count"""
+    _require_zstandard()
+    json_backend = get_backend()
+    decompressor = zstandard.ZstdDecompressor()
+    entries = []
+    with open(file_path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(file_path) else b""
+        offset = 0
+        while offset < len(data):
+            stream = decompressor.decompressobj()
+            chunks = []
+            position = offset
+            while not stream.eof and position < len(data):
+                chunk = data[position:position + REINDEX_CHUNK_SIZE]
+                chunks.append(stream.decompress(chunk))
+                position += len(chunk)
+            if not stream.eof:
+                print(f"[WARN] Truncated frame at offset {offset}, dropped")
+                break
+            size = position - offset - len(stream.unused_data)
+            record = json_backend.loads(b"".join(chunks))
+            _, digest = encode_response(record.get("url"), record.get("data"), 0, json_backend)
+            entries.append({"offset": offset, "size": size, "captured_at": record.get("captured_at") or 0,
+                            "sha256": digest, "ads": response_ad_ids(record.get("data"))})
+            offset += size
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+    with open(file_path + INDEX_SUFFIX + ".tmp", "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    os.replace(file_path + INDEX_SUFFIX + ".tmp", file_path + INDEX_SUFFIX)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed archive of captured GraphQL responses")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = commands.add_parser("compact", help="Merge, deduplicate and recompress into one archive")
+    compact_parser.add_argument("sources", nargs="+", help="Archives (.zca) and NDJSON/JSON capture files")
+    compact_parser.add_argument("-o", "--output", required=True, help="Archive to write")
+    compact_parser.add_argument("--level", type=int, default=COMPACT_LEVEL)
+    compact_parser.add_argument("--since", help="Keep responses captured at or after (YYYY-MM-DD[ HH:MM])")
+    compact_parser.add_argument("--until", help="Keep responses captured before")
+    compact_parser.add_argument("--keep-duplicates", action="store_true")
+
+    info_parser = commands.add_parser("info", help="Frames, ads, sizes and time span of an archive")
+    info_parser.add_argument("archive")
+
+    show_parser = commands.add_parser("show", help="Re-parse one ad or a time range from an archive")
+    show_parser.add_argument("archive")
+    show_parser.add_argument("--ad", help="ad_archive_id (Library ID)")
+    show_parser.add_argument("--since")
+    show_parser.add_argument("--until")
+
+    reindex_parser = commands.add_parser("reindex", help="Rebuild the index of an archive from its frames")
+    reindex_parser.add_argument("archive")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "compact":
+            if not is_archive(args.output):
+                parser.error(f"the output must end with {ARCHIVE_SUFFIX}")
+            started = time.perf_counter()
+            result = compact(args.sources, args.output, args.level, _parse_time(args.since),
+                             _parse_time(args.until), args.keep_duplicates)
+            print(f"Compacted {result['read']} responses into {result['written']} "
+                  f"({result['duplicates']} duplicates dropped): "
+                  f"{result['bytes_before'] / 1024 / 1024:.1f} MB -> {result['bytes_after'] / 1024 / 1024:.1f} MB "
+                  f"in {time.perf_counter() - started:.1f}s")
+        elif args.command == "info":
+            with CaptureArchive(args.archive) as archive:
+                frames = archive.frames_between()
+                raw_size = sum(archive.raw_size(frame) for frame in frames)
+                data_size = os.path.getsize(args.archive)
+                print(f"{len(archive)} responses, {len(archive.ad_ids())} ads, "
+                      f"{data_size / 1024 / 1024:.1f} MB ({raw_size / max(1, data_size):.1f}x compression)")
+                if frames:
+                    first, last = (datetime.fromtimestamp(archive.entries[frame]["captured_at"])
+                                   for frame in (frames[0], frames[-1]))
+                    print(f"Captured {first:%Y-%m-%d %H:%M:%S} - {last:%Y-%m-%d %H:%M:%S}")
+        elif args.command == "show":
+            from ad_records import to_json
+            from graphql_parser import iter_ads_from_archive, parse_archived_ad
+            if args.ad:
+                ads = [ad for ad in [parse_archived_ad(args.archive, args.ad)] if ad]
+            else:
+                ads = list(iter_ads_from_archive(args.archive, _parse_time(args.since), _parse_time(args.until)))
+            print(json.dumps(ads, indent=2, ensure_ascii=False, default=to_json))
+            print(f"{len(ads)} ads", file=sys.stderr)
+        else:
+            print(f"Indexed {reindex(args.archive)} frames")
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
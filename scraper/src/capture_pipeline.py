@@ -0,0 +1,194 @@
+"""
+Parse-in-capture pipeline: captured GraphQL bodies are parsed and deduped
+on a worker thread while the scraper keeps scrolling
+"""
+import json
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Set
+from ad_records import ParsedAd, to_json
+from graphql_parser import iter_collated_results, parse_collated_result
+from instrumentation import metrics
+
+DEFAULT_QUEUE_SIZE = 32
+
+_STOP = object()
+
+
+class PipelineCounters:
+    """Thread-safe live counters of the pipeline"""
+
+    FIELDS = ("captured", "parsed", "duplicates", "reloaded", "skipped", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {field: 0 for field in self.FIELDS}
+
+    def incr(self, field: str, amount: int = 1) -> None:
+        with self._lock:
+            self._values[field] += amount
+
+    def __getattr__(self, field: str) -> int:
+        if field in PipelineCounters.FIELDS:
+            return self._values[field]
+        raise AttributeError(field)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
+
+    def __str__(self) -> str:
+        return ", ".join(f"{name}={value}" for name, value in self.snapshot().items())
+
+
+class CollectSink:
+    """Keeps parsed ads in memory (for the final scraped_ads.json)"""
+
+    def __init__(self):
+        self.ads: List[ParsedAd] = []
+
+    def write(self, ad_data: ParsedAd) -> None:
+        self.ads.append(ad_data)
+
+    def close(self) -> None:
+        pass
+
+
+class JsonLinesSink:
+    """Appends each parsed ad to a JSON lines file as soon as it is parsed"""
+
+    def __init__(self, file_path: str, append: bool = False):
+        self.file_path = file_path
+        # A resumed scrape adds to the ads of the earlier runs instead of truncating them
+        self._file = open(file_path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, ad_data: ParsedAd) -> None:
+        self._file.write(json.dumps(ad_data, ensure_ascii=False, default=to_json) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class DatabaseSink:
+    """Imports parsed ads into the database in batches while scraping continues"""
+
+    def __init__(self, batch_size: int = 100):
+        from database.connection import init_db
+        from database.import_ads import import_ads_bulk
+
+        init_db()
+        self._import = import_ads_bulk
+        self.batch_size = batch_size
+        self._pending: List[ParsedAd] = []
+
+    def write(self, ad_data: ParsedAd) -> None:
+        self._pending.append(ad_data)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self._import(self._pending, batch_size=self.batch_size)
+            self._pending = []
+
+    def close(self) -> None:
+        self.flush()
+
+
+class CapturePipeline:
+    """
+    Bounded queue + worker thread between the response handler and the sinks
+
+    submit() blocks while the queue is full, which slows the scroller down to
+    the pace of parsing (backpressure). Once max_ads unique ads were emitted
+    the pipeline reports done so the scroller can stop early.
+    """
+
+    def __init__(self, sinks: List[Any], max_ads: Optional[int] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, seen_ad_ids: Optional[Set[str]] = None):
+        self.sinks = sinks
+        self.max_ads = max_ads
+        self.counters = PipelineCounters()
+        self.seen_ad_ids: Set[str] = set(seen_ad_ids or ())
+        # Ads of earlier runs (resumed scrape) are neither parsed nor counted again
+        self._earlier_ad_ids = frozenset(self.seen_ad_ids)
+        self.emitted = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="capture-pipeline", daemon=True)
+
+    @property
+    def done(self) -> bool:
+        """True once max_ads ads were emitted"""
+        return self._done.is_set()
+
+    def start(self) -> "CapturePipeline":
+        self._thread.start()
+        return self
+
+    def submit(self, response_obj: Dict[str, Any]) -> bool:
+        """Queue one captured response; returns False once the pipeline is done"""
+        if self.done:
+            return False
+        self.counters.incr("captured")
+        self._queue.put(response_obj)
+        return True
+
+    def _emit(self, ad_data: ParsedAd) -> None:
+        for sink in self.sinks:
+            sink.write(ad_data)
+        self.emitted += 1
+        if self.max_ads is not None and self.emitted >= self.max_ads:
+            self._done.set()
+
+    def _process(self, response_obj: Dict[str, Any]) -> None:
+        for result in iter_collated_results(response_obj):
+            if self.done:
+                return
+            # Results without an ID or cards are not ads the parser keeps
+            if not result.get("ad_archive_id") or not (result.get("snapshot") or {}).get("cards"):
+                self.counters.incr("skipped")
+                continue
+            ad_id = str(result["ad_archive_id"])
+            if ad_id in self._earlier_ad_ids:
+                self.counters.incr("reloaded")
+                continue
+            if ad_id in self.seen_ad_ids:
+                self.counters.incr("duplicates")
+                continue
+            ad_data = parse_collated_result(result)
+            if not ad_data:
+                self.counters.incr("failed")
+                continue
+            self.seen_ad_ids.add(ad_id)
+            self.counters.incr("parsed")
+            self._emit(ad_data)
+
+    def _run(self) -> None:
+        while True:
+            response_obj = self._queue.get()
+            try:
+                if response_obj is _STOP:
+                    return
+                if not self.done:
+                    with metrics.stage("pipeline_parse"):
+                        self._process(response_obj)
+            except Exception as e:
+                self.counters.incr("failed")
+                print(f"Error parsing response: {e}")
+            finally:
+                self._queue.task_done()
+
+    def close(self) -> None:
+        """Drain the queue, stop the worker and close the sinks"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
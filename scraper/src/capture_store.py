@@ -0,0 +1,41 @@
+"""
+Append-only NDJSON storage for captured GraphQL responses
+
+The NDJSON file holds the current run; pass an ArchiveWriter
+(capture_archive.py) to also keep every response in the compressed,
+indexed archive that accumulates across runs.
+"""
+from typing import Any, Dict, Optional
+from json_backend import get_backend
+
+
+class CaptureWriter:
+    """Appends each captured GraphQL response as one JSON line"""
+
+    def __init__(self, file_path: str, append: bool = False, archive: Optional[Any] = None):
+        self.file_path = file_path
+        self.archive = archive
+        self.count = 0
+        self.bytes_written = 0
+        self._json = get_backend()
+        self._file = open(file_path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, url: str, data: Dict[str, Any]) -> None:
+        """Append one response and flush it so it survives a crash"""
+        line = self._json.dumps({"url": url, "data": data})
+        self._file.write(line + "\n")
+        self._file.flush()
+        self.count += 1
+        self.bytes_written += len(line) + 1
+        if self.archive is not None:
+            self.archive.write(url, data)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
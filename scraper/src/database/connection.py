@@ -1,7 +1,27 @@
-"""Database connection setup"""
+"""Database connection setup
+
+The engine is configured from a profile selected with DB_PROFILE:
+
+- default: general use (scripts, the scraper importing its own output)
+- worker: one of many concurrent scrape-and-import processes; small pools
+  so N workers do not open N * 15 connections at once
+- bulk: a single large import (batched importer, COPY loader); few
+  connections, large executemany pages
+
+DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE and
+DB_POOL_PRE_PING override single settings of the selected profile.
+SQLite connections always use WAL journaling, synchronous=NORMAL and a busy
+timeout, so concurrent readers and a writer do not fail with "database is
+locked".
+"""
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, Dict, Iterator, List
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,11 +29,142 @@ load_dotenv()
 # Database URL from environment or default to SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./ads_scraper.db"
 
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {
+        "pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": True,
+        "insertmanyvalues_page_size": 1000, "executemany_batch_page_size": 100,
+        "sqlite_busy_timeout_ms": 30000,
+    },
+    "worker": {
+        "pool_size": 2, "max_overflow": 2, "pool_timeout": 60, "pool_recycle": 900, "pool_pre_ping": True,
+        "insertmanyvalues_page_size": 1000, "executemany_batch_page_size": 100,
+        "sqlite_busy_timeout_ms": 60000,
+    },
+    "bulk": {
+        "pool_size": 2, "max_overflow": 0, "pool_timeout": 120, "pool_recycle": 3600, "pool_pre_ping": False,
+        "insertmanyvalues_page_size": 5000, "executemany_batch_page_size": 1000,
+        "sqlite_busy_timeout_ms": 120000,
+    },
+}
+
+# Environment overrides of single profile settings
+PROFILE_OVERRIDES = {
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", float),
+    "DB_POOL_RECYCLE": ("pool_recycle", int),
+    "DB_POOL_PRE_PING": ("pool_pre_ping", lambda value: value.lower() in ("1", "true", "yes")),
+}
+
+
+def load_profile(name: str = None) -> Dict[str, Any]:
+    """Settings of the profile named by DB_PROFILE (or name), with env overrides applied"""
+    name = name or os.getenv("DB_PROFILE") or "default"
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {name!r} (expected one of: {', '.join(PROFILES)})")
+    profile = dict(PROFILES[name], name=name)
+    for variable, (key, convert) in PROFILE_OVERRIDES.items():
+        if os.getenv(variable):
+            profile[key] = convert(os.getenv(variable))
+    return profile
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records checkout counts and times, waits for a free connection and timeouts"""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._metrics_lock = threading.Lock()
+        self.reset_metrics()
+
+    def reset_metrics(self) -> None:
+        with self._metrics_lock:
+            self._metrics = {
+                "checkouts": 0, "checkout_seconds": 0.0, "max_checkout_seconds": 0.0,
+                "waits": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                "timeouts": 0, "peak_checked_out": 0,
+            }
+
+    def connect(self):
+        # At capacity the checkout blocks until another thread returns a connection
+        saturated = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._metrics_lock:
+                self._metrics["timeouts"] += 1
+            raise
+        elapsed = time.perf_counter() - started
+
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics["checkouts"] += 1
+            metrics["checkout_seconds"] += elapsed
+            metrics["max_checkout_seconds"] = max(metrics["max_checkout_seconds"], elapsed)
+            if saturated:
+                metrics["waits"] += 1
+                metrics["wait_seconds"] += elapsed
+                metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], elapsed)
+            metrics["peak_checked_out"] = max(metrics["peak_checked_out"], self.checkedout())
+        return connection
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        checkouts = metrics["checkouts"]
+        metrics["avg_checkout_ms"] = metrics["checkout_seconds"] * 1000 / checkouts if checkouts else 0.0
+        metrics.update(pool_size=self.size(), max_overflow=self._max_overflow,
+                       checked_out=self.checkedout(), overflow=self.overflow())
+        return metrics
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_options(url, profile: Dict[str, Any]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"insertmanyvalues_page_size": profile["insertmanyvalues_page_size"]}
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        options["connect_args"] = {"check_same_thread": False,
+                                   "timeout": profile["sqlite_busy_timeout_ms"] / 1000}
+        # In-memory databases live in a single connection; keep SQLAlchemy's default pool
+        if _is_memory_sqlite(url):
+            return options
+    elif url.get_driver_name() == "psycopg2":
+        # Batch the executemany() of UPDATE/DELETE too (INSERTs already use insertmanyvalues)
+        options["executemany_mode"] = "values_plus_batch"
+        options["executemany_batch_page_size"] = profile["executemany_batch_page_size"]
+
+    options.update(
+        poolclass=MeteredQueuePool,
+        pool_size=profile["pool_size"],
+        max_overflow=profile["max_overflow"],
+        pool_timeout=profile["pool_timeout"],
+        pool_recycle=profile["pool_recycle"],
+        pool_pre_ping=profile["pool_pre_ping"],
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={PROFILE['sqlite_busy_timeout_ms']}")
+    finally:
+        cursor.close()
+
+
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+PROFILE = load_profile()
+_url = make_url(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **_engine_options(_url, PROFILE))
+if _url.get_backend_name() == "sqlite":
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,6 +173,40 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def pool_metrics() -> Dict[str, Any]:
+    """Checkout/wait metrics of the engine's pool (empty for pools without metering)"""
+    pool = engine.pool
+    if not isinstance(pool, MeteredQueuePool):
+        return {}
+    return dict(pool.metrics(), profile=PROFILE["name"])
+
+
+def format_pool_metrics(metrics: Dict[str, Any]) -> str:
+    """One-line summary of pool_metrics() for logs"""
+    if not metrics:
+        return "pool metrics unavailable"
+    return (f"profile={metrics['profile']} size={metrics['pool_size']}+{metrics['max_overflow']} "
+            f"checkouts={metrics['checkouts']} avg_checkout={metrics['avg_checkout_ms']:.1f}ms "
+            f"waits={metrics['waits']} wait={metrics['wait_seconds']:.2f}s max_wait={metrics['max_wait_seconds']:.2f}s "
+            f"timeouts={metrics['timeouts']} peak_checked_out={metrics['peak_checked_out']}")
+
+
+# Bound parameters allowed per statement: SQLite's SQLITE_MAX_VARIABLE_NUMBER (999 in builds
+# before 3.32, which are still shipped) and the 16-bit count of PostgreSQL's wire protocol
+SQLITE_MAX_VARIABLE_NUMBER = 999
+POSTGRESQL_MAX_PARAMETERS = 65535
+
+
+def values_chunks(conn, rows: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """Split rows for multi-row INSERT ... VALUES statements that stay under the dialect's parameter limit"""
+    if not rows:
+        return
+    limit = POSTGRESQL_MAX_PARAMETERS if conn.dialect.name == "postgresql" else SQLITE_MAX_VARIABLE_NUMBER
+    size = max(1, limit // len(rows[0]))
+    for offset in range(0, len(rows), size):
+        yield rows[offset:offset + size]
+
+
 def get_db():
     """Get database session"""
     db = SessionLocal()
@@ -33,5 +218,9 @@ def get_db():
 
 def init_db():
     """Initialize database - create all tables"""
-    from .models import Ad, AdVersion, AdPlatform
+    from .models import Ad, AdVersion, AdPlatform, AdDailyStat, AdPageStat, AdEvent, ScrapeJob, CreativeBucket
+    from .search import create_search_index
     Base.metadata.create_all(bind=engine)
+    # Full-text search structures are dialect-specific, so they are not part of the models
+    with engine.begin() as conn:
+        create_search_index(conn)
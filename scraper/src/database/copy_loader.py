@@ -0,0 +1,475 @@
+"""
+PostgreSQL COPY loader for very large imports (e.g. backfills of archived captures)
+
+Parsed ads are streamed into temporary staging tables with
+COPY FROM STDIN (CSV) and merged into ads / ad_versions / ad_platforms with
+set-based SQL, all in one transaction:
+
+1. duplicates within the load keep the last occurrence of an ad_id
+2. ads whose content fingerprint did not change are dropped from staging
+   (after storing their re-signed media URLs)
+3. lifecycle events (events.py) are diffed against the stored state
+4. ads are upserted; only versions whose fingerprint changed are rewritten
+   (with their near-duplicate index buckets, creative_index.py); platforms
+   of changed ads are replaced
+5. the statistics rollups are rebuilt
+
+With defer_indexes the secondary indexes of the target tables are dropped
+before the merge and recreated after it (inside the same transaction).
+
+Usage (from scraper/src):
+    py database/import_ads.py scraped_ads.json --copy
+    py database/import_ads.py parsed_ads/ads-00000-of-00008.jsonl --copy --defer-indexes
+"""
+import io
+import json
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import text
+
+from .connection import engine
+from .fingerprints import ad_fingerprint, version_fingerprint
+from .ids import UUID7_SQL
+from .import_ads import parse_asset_type, parse_date, parse_status
+from . import creative_index, rollups
+from instrumentation import metrics
+
+ROWS_PER_CHUNK = 1000
+
+# Indexes the merge needs (ON CONFLICT target, primary keys) are never deferred
+REQUIRED_INDEXES = ("ix_ads_ad_id",)
+DEFERRABLE_TABLES = ("ads", "ad_versions", "ad_platforms")
+
+STAGING_DDL = (
+    """CREATE TEMP TABLE stage_ads (
+        seq bigint, ad_id text, status text, start_date date, end_date date,
+        page_name text, page_profile_uri text, content_hash text
+    ) ON COMMIT DROP""",
+    """CREATE TEMP TABLE stage_versions (
+        seq bigint, version_number integer, ad_copy text, title text, image_url text,
+        video_url text, asset_type text, link_url text, link_description text,
+        cta_text text, cta_type text, caption text, content_hash text, minhash text
+    ) ON COMMIT DROP""",
+    """CREATE TEMP TABLE stage_platforms (seq bigint, platform text) ON COMMIT DROP""",
+    """CREATE TEMP TABLE stage_buckets (
+        seq bigint, version_number integer, band integer, bucket bigint
+    ) ON COMMIT DROP""",
+)
+
+MERGE_SQL = (
+    # Keep the last occurrence of each ad_id
+    ("dedupe", """
+        CREATE INDEX ON stage_ads (ad_id, seq);
+        DELETE FROM stage_ads s USING stage_ads t WHERE s.ad_id = t.ad_id AND s.seq < t.seq;
+        CREATE INDEX ON stage_ads (seq);
+        CREATE INDEX ON stage_versions (seq);
+        CREATE INDEX ON stage_platforms (seq);
+        CREATE INDEX ON stage_buckets (seq);
+        ANALYZE stage_ads; ANALYZE stage_versions; ANALYZE stage_platforms; ANALYZE stage_buckets
+    """),
+    # Unchanged ads are left alone, except for their re-signed media URLs (fingerprints leave the signatures out)
+    ("skip_unchanged", """
+        UPDATE ad_versions v SET image_url = sv.image_url, video_url = sv.video_url
+        FROM stage_ads s, ads a, stage_versions sv
+        WHERE a.ad_id = s.ad_id AND a.content_hash = s.content_hash AND sv.seq = s.seq
+          AND v.ad_id = a.id AND v.version_number = sv.version_number
+          AND (v.image_url IS DISTINCT FROM sv.image_url OR v.video_url IS DISTINCT FROM sv.video_url);
+        DELETE FROM stage_ads s USING ads a WHERE a.ad_id = s.ad_id AND a.content_hash = s.content_hash
+    """),
+    # Lifecycle events of existing ads, diffed against their state before the merge (see events.py)
+    ("events", """
+        CREATE TEMP TABLE stage_new ON COMMIT DROP AS
+            SELECT s.seq FROM stage_ads s WHERE NOT EXISTS (SELECT 1 FROM ads a WHERE a.ad_id = s.ad_id);
+        INSERT INTO ad_events (ad_pk, ad_id, event_type, details, occurred_at)
+        SELECT a.id, a.ad_id,
+               CASE WHEN s.status = 'INACTIVE' THEN 'ad_stopped' ELSE 'ad_started' END,
+               CASE WHEN s.status = 'INACTIVE' THEN json_build_object('end_date', s.end_date)
+                    ELSE json_build_object('start_date', s.start_date, 'restarted', true) END,
+               now()
+        FROM stage_ads s JOIN ads a ON a.ad_id = s.ad_id
+        WHERE a.status::text <> s.status
+        ORDER BY s.seq;
+        INSERT INTO ad_events (ad_pk, ad_id, event_type, version_number, details, occurred_at)
+        SELECT a.id, a.ad_id,
+               CASE WHEN d.old_number IS NULL THEN 'version_added'
+                    WHEN d.new_number IS NULL THEN 'version_removed' ELSE 'version_changed' END,
+               coalesce(d.new_number, d.old_number),
+               CASE WHEN d.old_number IS NULL THEN json_build_object('content_hash', d.new_hash)
+                    WHEN d.new_number IS NULL THEN json_build_object('previous_hash', d.old_hash)
+                    ELSE json_build_object('content_hash', d.new_hash, 'previous_hash', d.old_hash) END,
+               now()
+        FROM stage_ads s
+        JOIN ads a ON a.ad_id = s.ad_id
+        JOIN LATERAL (
+            SELECT sv.version_number AS new_number, sv.content_hash AS new_hash,
+                   v.version_number AS old_number, v.content_hash AS old_hash
+            FROM (SELECT version_number, content_hash FROM stage_versions WHERE seq = s.seq) sv
+            FULL JOIN (SELECT version_number, content_hash FROM ad_versions WHERE ad_id = a.id) v
+              ON v.version_number = sv.version_number
+        ) d ON true
+        WHERE d.old_number IS NULL OR d.new_number IS NULL
+           OR (d.old_hash IS NOT NULL AND d.old_hash <> d.new_hash)
+        ORDER BY s.seq, coalesce(d.new_number, d.old_number);
+        INSERT INTO ad_events (ad_pk, ad_id, event_type, platform, occurred_at)
+        SELECT a.id, a.ad_id, CASE WHEN d.old_platform IS NULL THEN 'platform_added' ELSE 'platform_removed' END,
+               coalesce(d.new_platform, d.old_platform), now()
+        FROM stage_ads s
+        JOIN ads a ON a.ad_id = s.ad_id
+        JOIN LATERAL (
+            SELECT sp.platform AS new_platform, p.platform AS old_platform
+            FROM (SELECT DISTINCT platform FROM stage_platforms WHERE seq = s.seq) sp
+            FULL JOIN (SELECT DISTINCT platform FROM ad_platforms WHERE ad_id = a.id) p ON p.platform = sp.platform
+        ) d ON true
+        WHERE d.old_platform IS NULL OR d.new_platform IS NULL
+        ORDER BY s.seq, d.old_platform IS NOT NULL, coalesce(d.new_platform, d.old_platform)
+    """),
+    ("ads", f"""
+        INSERT INTO ads (id, ad_id, status, start_date, end_date, page_name, page_profile_uri,
+                         content_hash, created_at, updated_at)
+        SELECT {UUID7_SQL}, s.ad_id, s.status::adstatus, s.start_date, s.end_date,
+               s.page_name, s.page_profile_uri, s.content_hash, now(), now()
+        FROM stage_ads s
+        ON CONFLICT (ad_id) DO UPDATE SET
+            status = excluded.status, start_date = excluded.start_date, end_date = excluded.end_date,
+            page_name = excluded.page_name, page_profile_uri = excluded.page_profile_uri,
+            content_hash = excluded.content_hash, updated_at = now()
+    """),
+    # Versions whose number/fingerprint no longer match are removed (their buckets cascade), missing ones inserted
+    ("ad_versions", f"""
+        DELETE FROM ad_versions v USING ads a, stage_ads s
+        WHERE v.ad_id = a.id AND a.ad_id = s.ad_id
+          AND NOT EXISTS (
+              SELECT 1 FROM stage_versions sv
+              WHERE sv.seq = s.seq AND sv.version_number = v.version_number
+                AND sv.content_hash = v.content_hash
+          );
+        INSERT INTO ad_versions (id, ad_id, version_number, ad_copy, title, image_url, video_url,
+                                 asset_type, link_url, link_description, cta_text, cta_type,
+                                 caption, content_hash, minhash, created_at)
+        SELECT {UUID7_SQL}, a.id, sv.version_number, sv.ad_copy, sv.title, sv.image_url,
+               sv.video_url, sv.asset_type::assettype, sv.link_url, sv.link_description, sv.cta_text,
+               sv.cta_type, sv.caption, sv.content_hash, decode(sv.minhash, 'hex'), now()
+        FROM stage_versions sv
+        JOIN stage_ads s ON s.seq = sv.seq
+        JOIN ads a ON a.ad_id = s.ad_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM ad_versions v WHERE v.ad_id = a.id AND v.version_number = sv.version_number
+        )
+    """),
+    # Buckets of the versions inserted above; rewritten versions' old buckets went with them, unchanged
+    # versions keep theirs
+    ("creative_index", """
+        INSERT INTO creative_lsh_buckets (band, bucket, version_id)
+        SELECT sb.band, sb.bucket, v.id
+        FROM stage_buckets sb
+        JOIN stage_ads s ON s.seq = sb.seq
+        JOIN ads a ON a.ad_id = s.ad_id
+        JOIN ad_versions v ON v.ad_id = a.id AND v.version_number = sb.version_number
+        WHERE v.minhash IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """),
+    # ad_started (and ad_stopped if already inactive) for the ads inserted above
+    ("new_ad_events", """
+        INSERT INTO ad_events (ad_pk, ad_id, event_type, details, occurred_at)
+        SELECT a.id, a.ad_id, 'ad_started',
+               json_build_object(
+                   'start_date', s.start_date,
+                   'versions', (SELECT count(*) FROM stage_versions sv WHERE sv.seq = s.seq),
+                   'platforms', (SELECT coalesce(json_agg(DISTINCT sp.platform ORDER BY sp.platform), '[]'::json)
+                                 FROM stage_platforms sp WHERE sp.seq = s.seq)),
+               now()
+        FROM stage_new n JOIN stage_ads s ON s.seq = n.seq JOIN ads a ON a.ad_id = s.ad_id
+        ORDER BY s.seq;
+        INSERT INTO ad_events (ad_pk, ad_id, event_type, details, occurred_at)
+        SELECT a.id, a.ad_id, 'ad_stopped', json_build_object('end_date', s.end_date), now()
+        FROM stage_new n JOIN stage_ads s ON s.seq = n.seq JOIN ads a ON a.ad_id = s.ad_id
+        WHERE s.status = 'INACTIVE'
+        ORDER BY s.seq
+    """),
+    ("ad_platforms", f"""
+        DELETE FROM ad_platforms p USING ads a, stage_ads s WHERE p.ad_id = a.id AND a.ad_id = s.ad_id;
+        INSERT INTO ad_platforms (id, ad_id, platform, created_at)
+        SELECT {UUID7_SQL}, a.id, sp.platform, now()
+        FROM stage_platforms sp
+        JOIN stage_ads s ON s.seq = sp.seq
+        JOIN ads a ON a.ad_id = s.ad_id
+    """),
+)
+
+
+def iter_ads_file(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield ads from scraped_ads.json, or stream them from a JSON lines file (batch_parse shards)"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        if file_path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f).get("ads", [])
+
+
+def _csv_field(value: Any) -> str:
+    # Unquoted empty is NULL in COPY CSV, so every non-NULL value is quoted;
+    # PostgreSQL text cannot hold NUL characters
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""').replace("\x00", "") + '"'
+
+
+def _csv_line(values: Iterable[Any]) -> str:
+    return ",".join(_csv_field(value) for value in values) + "\n"
+
+
+def stage_rows(ad_data: Dict[str, Any], seq: int) -> Tuple[List[Any], List[List[Any]], List[List[Any]],
+                                                            List[List[Any]]]:
+    """Staging rows (ad, versions, platforms, index buckets) for one ad; raises on data the tables would reject"""
+    status = parse_status(ad_data["status"])
+    start_date = parse_date(ad_data["start_date"])
+    if start_date is None:
+        raise ValueError(f"invalid start_date {ad_data['start_date']!r}")
+    if not ad_data.get("page_name"):
+        raise ValueError("missing page_name")
+
+    versions = []
+    buckets = []
+    version_hashes = []
+    for number, version_data in enumerate(ad_data.get("versions", []), start=1):
+        content_hash = version_fingerprint(version_data)
+        version_hashes.append(content_hash)
+        asset_type = parse_asset_type(version_data.get("asset_type"))
+        signature = creative_index.minhash_signature(version_data.get("ad_copy"), version_data.get("title"),
+                                                     version_data.get("link_url"))
+        if signature:
+            buckets.extend([seq, number, band, bucket] for band, bucket in creative_index.band_buckets(signature))
+        versions.append([
+            seq, number, version_data.get("ad_copy"), version_data.get("title"),
+            version_data.get("image_url"), version_data.get("video_url"),
+            asset_type.name if asset_type else None, version_data.get("link_url"),
+            version_data.get("link_description"), version_data.get("cta_text"),
+            version_data.get("cta_type"), version_data.get("caption"), content_hash,
+            signature.hex() if signature else None,
+        ])
+
+    ad_row = [
+        seq, str(ad_data["ad_id"]), status.name, start_date, parse_date(ad_data.get("end_date")),
+        ad_data.get("page_name"), ad_data.get("page_profile_uri"),
+        ad_fingerprint(ad_data, version_hashes),
+    ]
+    platforms = [[seq, platform] for platform in dict.fromkeys(ad_data.get("platforms") or [])]
+    return ad_row, versions, platforms, buckets
+
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of text chunks (for psycopg2's copy_expert)"""
+
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk.encode("utf-8")
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _copy(cursor, table: str, chunks: Iterator[str]) -> None:
+    """COPY CSV chunks into a table with psycopg2 (copy_expert) or psycopg 3 (copy)"""
+    sql = f"COPY {table} FROM STDIN WITH (FORMAT csv)"
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(sql, _ChunkReader(chunks))
+    else:
+        with cursor.copy(sql) as copy:
+            for chunk in chunks:
+                copy.write(chunk)
+
+
+def _spool(ads_data: Iterable[Dict[str, Any]], counts: Dict[str, int]):
+    """
+    Convert ads to CSV; ad rows are streamed, version/platform/bucket rows spooled to temp files
+
+    COPY fills one table at a time, so while ads stream into stage_ads the
+    version, platform and bucket rows are written to temporary files for the
+    following COPYs.
+    """
+    versions_file = tempfile.TemporaryFile("w+", encoding="utf-8")
+    platforms_file = tempfile.TemporaryFile("w+", encoding="utf-8")
+    buckets_file = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+    def ad_chunks() -> Iterator[str]:
+        lines = []
+        for seq, ad_data in enumerate(ads_data):
+            try:
+                ad_row, versions, platforms, buckets = stage_rows(ad_data, seq)
+            except Exception as e:
+                counts["errors"] += 1
+                print(f"[ERROR] Error importing ad {ad_data.get('ad_id', 'unknown')}: {e}")
+                continue
+            lines.append(_csv_line(ad_row))
+            versions_file.writelines(_csv_line(row) for row in versions)
+            platforms_file.writelines(_csv_line(row) for row in platforms)
+            buckets_file.writelines(_csv_line(row) for row in buckets)
+            counts["ads"] += 1
+            counts["versions"] += len(versions)
+            counts["platforms"] += len(platforms)
+            if len(lines) >= ROWS_PER_CHUNK:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+
+    def file_chunks(f) -> Iterator[str]:
+        f.seek(0)
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                f.close()
+                return
+            yield chunk
+
+    return (ad_chunks(), lambda: file_chunks(versions_file), lambda: file_chunks(platforms_file),
+            lambda: file_chunks(buckets_file))
+
+
+def _drop_secondary_indexes(conn) -> List[str]:
+    """Drop deferrable indexes of the target tables; returns their definitions"""
+    rows = conn.execute(text("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        LEFT JOIN pg_constraint c ON c.conname = i.indexname
+        WHERE i.schemaname = current_schema() AND i.tablename = ANY(:tables) AND c.conname IS NULL
+    """), {"tables": list(DEFERRABLE_TABLES)}).all()
+    definitions = []
+    for name, definition in rows:
+        if name in REQUIRED_INDEXES:
+            continue
+        conn.execute(text(f'DROP INDEX "{name}"'))
+        definitions.append(definition)
+    return definitions
+
+
+def copy_import(ads_data: Iterable[Dict[str, Any]], defer_indexes: bool = False) -> Dict[str, Any]:
+    """
+    Import ads through COPY into staging tables and a set-based merge (PostgreSQL only)
+
+    Args:
+        ads_data: Iterable of parsed ads (dicts or ParsedAd records); consumed once
+        defer_indexes: Drop secondary indexes during the merge and rebuild them after
+
+    Returns:
+        Row counts and per-phase timings
+    """
+    if engine.dialect.name != "postgresql":
+        raise ValueError(f"The COPY loader requires PostgreSQL (DATABASE_URL uses {engine.dialect.name})")
+
+    counts = {"ads": 0, "versions": 0, "platforms": 0, "errors": 0}
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        for ddl in STAGING_DDL:
+            conn.execute(text(ddl))
+
+        phase = time.perf_counter()
+        ad_chunks, version_chunks, platform_chunks, bucket_chunks = _spool(ads_data, counts)
+        cursor = conn.connection.cursor()
+        try:
+            _copy(cursor, "stage_ads", ad_chunks)
+            _copy(cursor, "stage_versions", version_chunks())
+            _copy(cursor, "stage_platforms", platform_chunks())
+            _copy(cursor, "stage_buckets", bucket_chunks())
+        finally:
+            cursor.close()
+        timings["copy"] = time.perf_counter() - phase
+        staged_rows = counts["ads"] + counts["versions"] + counts["platforms"]
+        print(f"[COPY] staged {counts['ads']} ads, {counts['versions']} versions, {counts['platforms']} platforms "
+              f"in {timings['copy']:.2f}s - {staged_rows / timings['copy'] if timings['copy'] else 0:.0f} rows/s")
+
+        deferred: List[str] = []
+        if defer_indexes:
+            deferred = _drop_secondary_indexes(conn)
+            print(f"[COPY] deferred {len(deferred)} indexes")
+
+        last_event_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM ad_events")).scalar()
+        for name, sql in MERGE_SQL:
+            if name == "ads":
+                # stage_ads now holds the changed and new ads only
+                changed = conn.execute(text("SELECT count(*) FROM stage_ads")).scalar()
+                new = conn.execute(text(
+                    "SELECT count(*) FROM stage_ads s WHERE NOT EXISTS (SELECT 1 FROM ads a WHERE a.ad_id = s.ad_id)"
+                )).scalar()
+            phase = time.perf_counter()
+            for statement in sql.split(";"):
+                if statement.strip():
+                    conn.execute(text(statement))
+            timings[name] = time.perf_counter() - phase
+            if name == "dedupe":
+                unique = conn.execute(text("SELECT count(*) FROM stage_ads")).scalar()
+        events = conn.execute(text("SELECT count(*) FROM ad_events WHERE id > :id"), {"id": last_event_id}).scalar()
+
+        if deferred:
+            phase = time.perf_counter()
+            for definition in deferred:
+                conn.execute(text(definition))
+            timings["indexes"] = time.perf_counter() - phase
+
+        phase = time.perf_counter()
+        rollups.rebuild(conn)
+        timings["rollups"] = time.perf_counter() - phase
+
+    elapsed = time.perf_counter() - started
+    for name, seconds in timings.items():
+        metrics.add_time(f"copy_{name}", seconds)
+    metrics.incr("ads_written", changed)
+    metrics.incr("ads_unchanged", unique - changed)
+    metrics.incr("import_errors", counts["errors"])
+    metrics.incr("events_written", events)
+    merge_seconds = sum(timings[name] for name, _ in MERGE_SQL)
+    print(f"[COPY] merged {changed} changed/new ads ({events} lifecycle events) in {merge_seconds:.2f}s"
+          + (f", rebuilt indexes in {timings['indexes']:.2f}s" if "indexes" in timings else "")
+          + f", rollups in {timings['rollups']:.2f}s")
+    print(f"Import throughput: {staged_rows / elapsed if elapsed else 0:.0f} rows/s "
+          f"({counts['ads'] / elapsed if elapsed else 0:.0f} ads/s) over {elapsed:.2f}s")
+
+    return {
+        "imported": new,
+        "updated": changed - new,
+        "unchanged": unique - changed,
+        "errors": counts["errors"],
+        "events": events,
+        "ads": counts["ads"],
+        "versions": counts["versions"],
+        "platforms": counts["platforms"],
+        "seconds": elapsed,
+        "timings": timings,
+    }
+
+
+def import_ads_copy(file_path: str, defer_indexes: bool = False) -> Dict[str, Any]:
+    """Import a scraped_ads.json or JSON lines file with the COPY loader"""
+    from .connection import init_db
+
+    print("Initializing database...")
+    init_db()
+    print(f"Streaming ads from {file_path} into staging tables...")
+    result = copy_import(iter_ads_file(file_path), defer_indexes=defer_indexes)
+
+    print(f"\n{'='*60}")
+    print(f"Import Summary (COPY):")
+    print(f"  New ads: {result['imported']}")
+    print(f"  Changed ads: {result['updated']}")
+    print(f"  Unchanged ads (skipped): {result['unchanged']}")
+    print(f"  Errors: {result['errors']}")
+    print(f"  Lifecycle events: {result['events']}")
+    print(f"  Total processed: {result['ads'] + result['errors']}")
+    print(f"{'='*60}")
+    return result
@@ -0,0 +1,336 @@
+"""
+Near-duplicate creative index (MinHash + LSH) over ad versions
+
+Every version gets a MinHash signature of its ad_copy, title and link_url
+(ad_versions.minhash): word bigrams of the normalized text plus the link's
+host and path, hashed with NUM_PERM multiply-shift permutations. The
+signature is split into BANDS bands of ROWS values; each band is hashed
+into a bucket row in creative_lsh_buckets. Versions sharing a bucket are
+candidates, and candidates whose estimated Jaccard similarity (share of
+equal signature values) reaches the threshold are near duplicates.
+
+Lookups only touch the buckets of one version, and page clustering groups
+candidates per bucket in memory, so neither compares all pairs.
+
+The importers keep the index up to date for the versions they write; index
+versions imported before it existed (or after changing the parameters
+below) with:
+    py database/creative_index.py --rebuild
+
+Query it (from scraper/src):
+    py database/creative_index.py --version <ad_versions.id>
+    py database/creative_index.py --page "Page Name" --threshold 0.8
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import struct
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from sqlalchemy import bindparam, delete, select, tuple_
+
+# Add parent directory to path for imports when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database.connection import init_db, engine
+    from database.models import Ad, AdVersion, CreativeBucket
+else:
+    from .connection import init_db, engine
+    from .models import Ad, AdVersion, CreativeBucket
+
+# Changing any of these requires --rebuild
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # Candidate probability 1-(1-J^4)^16: 0.99 at J=0.7, 0.12 at J=0.3
+SEED = 20261017
+DEFAULT_THRESHOLD = 0.7
+REBUILD_BATCH_SIZE = 1000
+
+_MASK64 = (1 << 64) - 1
+_rng = random.Random(SEED)
+# (a, b) of h -> (a*h + b) mod 2^64, a odd; the high 32 bits are kept
+_PERMUTATIONS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f"<{NUM_PERM}I")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Identical creatives are common (one copy across many ads), so signatures are memoized
+_cache: Dict[Tuple[str, str], Optional[bytes]] = {}
+_CACHE_SIZE = 50000
+
+
+def shingles(ad_copy: Optional[str], title: Optional[str], link_url: Optional[str]) -> set:
+    """Word bigrams of the copy and title, plus the link's host and path"""
+    words = _WORD.findall(f"{title or ''} {ad_copy or ''}".lower())
+    result = {f"{a} {b}" for a, b in zip(words, words[1:])} if len(words) > 1 else set(words)
+    if link_url:
+        parsed = urlparse(link_url.strip().lower())
+        host = parsed.hostname or ""
+        host = host[4:] if host.startswith("www.") else host
+        if host or parsed.path:
+            result.add(f"link:{host}{parsed.path.rstrip('/')}")
+    return result
+
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash_signature(ad_copy: Optional[str], title: Optional[str], link_url: Optional[str]) -> Optional[bytes]:
+    """Packed MinHash signature of a version, or None if it has no text or link"""
+    key = (f"{title or ''}\x00{ad_copy or ''}", link_url or "")
+    if key in _cache:
+        return _cache[key]
+
+    hashes = [_hash(shingle) for shingle in shingles(ad_copy, title, link_url)]
+    signature = None
+    if hashes:
+        signature = _SIGNATURE.pack(*(
+            min((a * h + b) & _MASK64 for h in hashes) >> 32 for a, b in _PERMUTATIONS
+        ))
+    if len(_cache) >= _CACHE_SIZE:
+        _cache.clear()
+    _cache[key] = signature
+    return signature
+
+
+def band_buckets(signature: bytes) -> List[Tuple[int, int]]:
+    """(band, bucket) pairs of a signature; buckets are signed 64-bit hashes of the band's values"""
+    width = ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * width:(band + 1) * width],
+                                              digest_size=8).digest(), "little", signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def similarity(signature_a: bytes, signature_b: bytes) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    values_a = _SIGNATURE.unpack(signature_a)
+    values_b = _SIGNATURE.unpack(signature_b)
+    return sum(1 for x, y in zip(values_a, values_b) if x == y) / NUM_PERM
+
+
+def add_signatures(version_rows: List[Dict[str, Any]]) -> None:
+    """Set the "minhash" of version rows about to be inserted"""
+    for row in version_rows:
+        row["minhash"] = minhash_signature(row.get("ad_copy"), row.get("title"), row.get("link_url"))
+
+
+def bucket_rows(version_rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """creative_lsh_buckets rows of versions with a signature"""
+    return [
+        {"band": band, "bucket": bucket, "version_id": row["id"]}
+        for row in version_rows if row.get("minhash")
+        for band, bucket in band_buckets(row["minhash"])
+    ]
+
+
+def index_versions(conn, version_rows: List[Dict[str, Any]]) -> int:
+    """Insert the bucket rows of newly inserted versions (signatures set by add_signatures)"""
+    rows = bucket_rows(version_rows)
+    if rows:
+        conn.execute(CreativeBucket.__table__.insert(), rows)
+    return len(rows)
+
+
+def remove_versions(conn, version_ids: List[str]) -> None:
+    """Drop the bucket rows of versions that are being deleted"""
+    if version_ids:
+        table = CreativeBucket.__table__
+        conn.execute(delete(table).where(table.c.version_id.in_(version_ids)))
+
+
+def near_duplicates(conn, version_id: str, threshold: float = DEFAULT_THRESHOLD,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Near-duplicate creatives of one version
+
+    Args:
+        conn: Connection to read with
+        version_id: ad_versions.id
+        threshold: Minimum estimated Jaccard similarity
+        limit: Return at most this many (most similar first)
+
+    Returns:
+        Dicts with version_id, ad_id (Library ID), page_name, similarity;
+        empty if the version has no signature
+    """
+    versions = AdVersion.__table__
+    buckets = CreativeBucket.__table__
+    ads = Ad.__table__
+
+    signature = conn.execute(select(versions.c.minhash).where(versions.c.id == version_id)).scalar()
+    if not signature:
+        return []
+
+    candidates = (
+        select(buckets.c.version_id)
+        .where(tuple_(buckets.c.band, buckets.c.bucket).in_(band_buckets(signature)),
+               buckets.c.version_id != version_id)
+        .distinct()
+        .subquery()
+    )
+    rows = conn.execute(
+        select(versions.c.id, versions.c.minhash, ads.c.ad_id, ads.c.page_name)
+        .select_from(candidates.join(versions, versions.c.id == candidates.c.version_id)
+                     .join(ads, ads.c.id == versions.c.ad_id))
+    ).all()
+
+    matches = []
+    for row in rows:
+        score = similarity(signature, row.minhash)
+        if score >= threshold:
+            matches.append({"version_id": row.id, "ad_id": row.ad_id, "page_name": row.page_name,
+                            "similarity": score})
+    matches.sort(key=lambda match: (-match["similarity"], match["ad_id"]))
+    return matches[:limit] if limit else matches
+
+
+def _link(find, parent: Dict[str, str], signatures: Dict[str, bytes], member: str, version_id: str,
+          threshold: float) -> bool:
+    """Join version_id to member's cluster if already in it or similar enough"""
+    if find(member) == find(version_id):
+        return True
+    if similarity(signatures[member], signatures[version_id]) >= threshold:
+        parent[find(version_id)] = find(member)
+        return True
+    return False
+
+
+def cluster_signatures(signatures: Dict[str, bytes], threshold: float = DEFAULT_THRESHOLD) -> List[List[str]]:
+    """
+    Group versions into near-duplicate clusters (connected components of similar pairs)
+
+    Only pairs sharing an LSH bucket are compared.
+
+    Returns:
+        Clusters of two or more version ids, largest first
+    """
+    parent = {version_id: version_id for version_id in signatures}
+
+    def find(version_id: str) -> str:
+        while parent[version_id] != version_id:
+            parent[version_id] = parent[parent[version_id]]
+            version_id = parent[version_id]
+        return version_id
+
+    by_bucket: Dict[Tuple[int, int], List[str]] = {}
+    for version_id, signature in signatures.items():
+        for key in band_buckets(signature):
+            by_bucket.setdefault(key, []).append(version_id)
+
+    for members in by_bucket.values():
+        if len(members) < 2:
+            continue
+        # Compare each member with one representative per cluster seen in this bucket, not with every
+        # member: buckets of identical creatives can hold thousands of versions. Only members unlike
+        # every representative are compared with the rest of the bucket.
+        representatives: List[str] = []
+        seen_representatives = set()
+        for position, version_id in enumerate(members):
+            if any(_link(find, parent, signatures, other, version_id, threshold) for other in representatives):
+                continue
+            if not any(_link(find, parent, signatures, other, version_id, threshold)
+                       for other in members[:position] if other not in seen_representatives):
+                representatives.append(version_id)
+                seen_representatives.add(version_id)
+
+    clusters: Dict[str, List[str]] = {}
+    for version_id in signatures:
+        clusters.setdefault(find(version_id), []).append(version_id)
+    return sorted((sorted(members) for members in clusters.values() if len(members) > 1),
+                  key=lambda members: (-len(members), members[0]))
+
+
+def cluster_page(conn, page_name: str, threshold: float = DEFAULT_THRESHOLD) -> List[List[str]]:
+    """Near-duplicate clusters among all versions of one page (see cluster_signatures)"""
+    versions = AdVersion.__table__
+    ads = Ad.__table__
+    rows = conn.execute(
+        select(versions.c.id, versions.c.minhash)
+        .select_from(versions.join(ads, ads.c.id == versions.c.ad_id))
+        .where(ads.c.page_name == page_name, versions.c.minhash.isnot(None))
+    )
+    return cluster_signatures({row.id: row.minhash for row in rows}, threshold)
+
+
+def rebuild(conn, only_missing: bool = True, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """
+    (Re)compute signatures and buckets
+
+    Args:
+        conn: Connection in a transaction
+        only_missing: Only versions without a signature; False recomputes all of them
+        batch_size: Versions per round trip
+
+    Returns:
+        Number of versions indexed
+    """
+    versions = AdVersion.__table__
+    buckets = CreativeBucket.__table__
+    if not only_missing:
+        conn.execute(delete(buckets))
+
+    indexed = 0
+    after_id = ""
+    while True:
+        query = select(versions.c.id, versions.c.ad_copy, versions.c.title, versions.c.link_url) \
+            .where(versions.c.id > after_id).order_by(versions.c.id).limit(batch_size)
+        if only_missing:
+            query = query.where(versions.c.minhash.is_(None))
+        rows = [dict(row) for row in conn.execute(query).mappings()]
+        if not rows:
+            return indexed
+        after_id = rows[-1]["id"]
+
+        add_signatures(rows)
+        signed = [{"version_id": row["id"], "signature": row["minhash"]} for row in rows if row["minhash"]]
+        remove_versions(conn, [row["id"] for row in rows])
+        if signed:
+            conn.execute(
+                versions.update().where(versions.c.id == bindparam("version_id"))
+                .values(minhash=bindparam("signature")),
+                signed,
+            )
+        index_versions(conn, rows)
+        indexed += len(rows)
+        print(f"[INDEX] {indexed} versions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate creative index")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--version", help="Show the near duplicates of this ad_versions.id")
+    action.add_argument("--page", help="Cluster all versions of this page")
+    action.add_argument("--rebuild", action="store_true", help="Index versions without a signature")
+    parser.add_argument("--all", action="store_true", help="With --rebuild: recompute every signature")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    init_db()
+    if args.rebuild:
+        with engine.begin() as conn:
+            indexed = rebuild(conn, only_missing=not args.all)
+        print(f"Indexed {indexed} versions")
+        return
+
+    with engine.connect() as conn:
+        if args.version:
+            matches = near_duplicates(conn, args.version, args.threshold, args.limit)
+            for match in matches:
+                print(f"{match['similarity']:.2f}  {match['version_id']}  {match['ad_id']}  {match['page_name']}")
+            print(f"{len(matches)} near duplicates")
+        else:
+            clusters = cluster_page(conn, args.page, args.threshold)
+            for number, members in enumerate(clusters[:args.limit], start=1):
+                print(f"Cluster {number}: {len(members)} versions - {', '.join(members[:5])}"
+                      + (" ..." if len(members) > 5 else ""))
+            print(f"{len(clusters)} clusters of near-duplicate versions")
+
+
+if __name__ == "__main__":
+    main()
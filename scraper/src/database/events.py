@@ -0,0 +1,179 @@
+"""
+Change-data capture of ad lifecycle events
+
+While writing a batch, the importer diffs the incoming ads against their
+stored state (which it reads anyway for the rollups and version rewrites)
+and appends compact events to ad_events, in the same transaction:
+
+- ad_started: first import of an ad, or an inactive ad active again
+- ad_stopped: an active ad went inactive (or was first seen inactive)
+- version_added / version_changed / version_removed: by version number and
+  content fingerprint
+- platform_added / platform_removed
+
+Unchanged ads produce no events. Consumers read the log by increasing id
+(everything after the last id they processed) or by type and time.
+
+List events (from scraper/src):
+    py database/events.py --type ad_stopped --since 2026-10-17
+    py database/events.py --after-id 12000 --limit 500
+    py database/events.py --summary
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select, func
+
+# Add parent directory to path for imports when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database.connection import init_db, engine
+    from database.models import AdEvent, AdEventType, AdStatus
+else:
+    from .connection import init_db, engine
+    from .models import AdEvent, AdEventType, AdStatus
+
+
+def _iso(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def compute_events(items: List[Dict[str, Any]], old_states: Dict[str, Any],
+                   old_versions: Dict[str, Dict[int, Any]]) -> List[Dict[str, Any]]:
+    """
+    Events for a batch of changed or new ads
+
+    Args:
+        items: Prepared ads of the batch (import_ads.prepare_ad)
+        old_states: Stored rollup state per existing ad pk (rollups.load_ad_states)
+        old_versions: Stored version_number -> (id, content_hash) per existing ad pk
+
+    Returns:
+        ad_events rows, in the order they happened per ad
+    """
+    events: List[Dict[str, Any]] = []
+    for item in items:
+        ad_row = item["ad_row"]
+
+        def add(event_type: AdEventType, version_number: Optional[int] = None,
+                platform: Optional[str] = None, details: Optional[Dict[str, Any]] = None) -> None:
+            events.append({"ad_pk": ad_row["id"], "ad_id": ad_row["ad_id"], "event_type": event_type,
+                           "version_number": version_number, "platform": platform, "details": details})
+
+        platforms = {row["platform"] for row in item["platform_rows"]}
+        old_state = old_states.get(ad_row["id"])
+        if old_state is None:
+            add(AdEventType.AD_STARTED, details={"start_date": _iso(ad_row["start_date"]),
+                                                 "versions": len(item["version_rows"]),
+                                                 "platforms": sorted(platforms)})
+            if ad_row["status"] == AdStatus.INACTIVE:
+                add(AdEventType.AD_STOPPED, details={"end_date": _iso(ad_row["end_date"])})
+            continue
+
+        old_status, _, _, old_platforms = old_state
+        if old_status != ad_row["status"]:
+            if ad_row["status"] == AdStatus.INACTIVE:
+                add(AdEventType.AD_STOPPED, details={"end_date": _iso(ad_row["end_date"])})
+            else:
+                add(AdEventType.AD_STARTED, details={"start_date": _iso(ad_row["start_date"]), "restarted": True})
+
+        stored = old_versions.get(ad_row["id"], {})
+        new_hashes = {row["version_number"]: row["content_hash"] for row in item["version_rows"]}
+        for number, content_hash in sorted(new_hashes.items()):
+            old = stored.get(number)
+            if old is None:
+                add(AdEventType.VERSION_ADDED, number, details={"content_hash": content_hash})
+            elif old.content_hash is not None and old.content_hash != content_hash:
+                # Versions imported before fingerprints existed have no hash to compare with
+                add(AdEventType.VERSION_CHANGED, number,
+                    details={"content_hash": content_hash, "previous_hash": old.content_hash})
+        for number in sorted(set(stored) - set(new_hashes)):
+            add(AdEventType.VERSION_REMOVED, number, details={"previous_hash": stored[number].content_hash})
+
+        for platform in sorted(platforms - old_platforms):
+            add(AdEventType.PLATFORM_ADDED, platform=platform)
+        for platform in sorted(old_platforms - platforms):
+            add(AdEventType.PLATFORM_REMOVED, platform=platform)
+    return events
+
+
+def write_events(conn, events: List[Dict[str, Any]]) -> int:
+    """Append events in the caller's transaction; returns the number written"""
+    if events:
+        conn.execute(AdEvent.__table__.insert(), events)
+    return len(events)
+
+
+def read_events(conn, after_id: int = 0, event_types: Optional[List[str]] = None,
+                since: Optional[datetime] = None, until: Optional[datetime] = None,
+                limit: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Read events in id order
+
+    Args:
+        conn: Connection to read with
+        after_id: Only events with a larger id (the last id a consumer processed)
+        event_types: Only these types (e.g. ["ad_stopped"])
+        since / until: Only events recorded in [since, until)
+        limit: Maximum number of events returned
+
+    Returns:
+        Event dicts with the event type as its string value
+    """
+    table = AdEvent.__table__
+    query = select(table).where(table.c.id > after_id)
+    if event_types:
+        query = query.where(table.c.event_type.in_([AdEventType(t) for t in event_types]))
+    if since:
+        query = query.where(table.c.occurred_at >= since)
+    if until:
+        query = query.where(table.c.occurred_at < until)
+    rows = conn.execute(query.order_by(table.c.id).limit(limit)).mappings().all()
+    return [dict(row, event_type=row["event_type"].value) for row in rows]
+
+
+def summarize_events(conn, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Event counts per day and type"""
+    table = AdEvent.__table__
+    day = func.date(table.c.occurred_at).label("day")
+    query = select(day, table.c.event_type, func.count().label("events")).group_by(day, table.c.event_type)
+    if since:
+        query = query.where(table.c.occurred_at >= since)
+    rows = conn.execute(query.order_by(day, table.c.event_type)).all()
+    return [{"day": str(row.day), "event_type": row.event_type.value, "events": row.events} for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List ad lifecycle events")
+    parser.add_argument("--type", dest="types", action="append", choices=[t.value for t in AdEventType],
+                        help="Only this event type (repeatable)")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Recorded at or after (YYYY-MM-DD[ HH:MM])")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Recorded before")
+    parser.add_argument("--after-id", type=int, default=0, help="Only events after this id")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--summary", action="store_true", help="Counts per day and type instead")
+    args = parser.parse_args()
+
+    init_db()
+    with engine.connect() as conn:
+        if args.summary:
+            for row in summarize_events(conn, args.since):
+                print(f"{row['day']}  {row['event_type']:<17} {row['events']:>8}")
+            return
+        events = read_events(conn, args.after_id, args.types, args.since, args.until, args.limit)
+
+    for event in events:
+        target = (f" v{event['version_number']}" if event["version_number"] is not None else "") + \
+                 (f" {event['platform']}" if event["platform"] else "")
+        details = f" {json.dumps(event['details'])}" if event["details"] else ""
+        print(f"{event['id']:>8}  {event['occurred_at']:%Y-%m-%d %H:%M:%S}  {event['ad_id']:<20} "
+              f"{event['event_type']:<17}{target}{details}")
+    if events:
+        print(f"\n{len(events)} events; continue with --after-id {events[-1]['id']}")
+
+
+if __name__ == "__main__":
+    main()
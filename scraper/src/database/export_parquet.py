@@ -0,0 +1,317 @@
+"""
+Columnar export of ads, versions and platforms to Parquet (for analytics)
+
+Writes three Hive-partitioned Parquet datasets under the output directory:
+
+    <out>/ads/start_month=2026-01/page_name=<page>/part-<run>-0.parquet
+    <out>/ad_versions/start_month=.../page_name=.../...
+    <out>/ad_platforms/start_month=.../page_name=.../...
+
+Rows are streamed from the database in chunks (server-side cursors on
+PostgreSQL), so memory stays flat however large the tables are. Status,
+platform, asset type and CTA columns are dictionary-encoded. Versions and
+platforms carry their ad's start_date, page_name and updated_at, so each
+dataset can be read on its own.
+
+Incremental exports (--incremental) only write ads updated since the
+watermark of the previous export (and their versions and platforms, which
+the importers rewrite together with the ad), as new files next to the
+existing ones. Each run starts OVERLAP before the watermark: updated_at is
+set when a write starts, so an import that commits after an export read
+the watermark can carry older timestamps than it, and other ads can share
+the watermark's timestamp. Ads in the overlap are exported again. An ad
+exported again supersedes its earlier rows: keep the rows with the latest
+updated_at / ad_updated_at per ad, and drop exact duplicates.
+
+The parser output (scraped_ads.json or batch_parse .jsonl shards) can be
+exported the same way without a database (--from-file).
+
+Requires pyarrow (pip install pyarrow).
+
+Usage (from scraper/src):
+    py database/export_parquet.py exports/
+    py database/export_parquet.py exports/ --incremental
+    py database/export_parquet.py exports/ --incremental --overlap-minutes 60
+    py database/export_parquet.py exports/ --from-file parsed_ads/ads-00000-of-00008.jsonl
+"""
+import argparse
+import enum
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import select, func
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_dataset
+except ImportError:
+    pa = None
+
+# Add parent directory to path for imports when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database.connection import init_db, engine
+    from database.copy_loader import iter_ads_file
+    from database.import_ads import prepare_ad
+    from database.models import Ad, AdVersion, AdPlatform
+    from instrumentation import instrumented_run, metrics
+else:
+    from .connection import init_db, engine
+    from .copy_loader import iter_ads_file
+    from .import_ads import prepare_ad
+    from .models import Ad, AdVersion, AdPlatform
+    from instrumentation import metrics
+
+CHUNK_SIZE = 50000
+# Re-exported before the watermark; longer than any import transaction takes to commit
+OVERLAP = timedelta(minutes=10)
+STATE_FILE = "_export_state.json"
+PARTITION_COLUMNS = ("start_month", "page_name")
+
+# Dataset columns (besides the partition columns) and their Arrow types
+_STRING = "string"
+_CATEGORY = "category"  # Dictionary-encoded string
+_COLUMN_TYPES = {
+    "ads": [
+        ("id", _STRING), ("ad_id", _STRING), ("status", _CATEGORY), ("start_date", "date"),
+        ("end_date", "date"), ("page_profile_uri", _STRING), ("content_hash", _STRING),
+        ("created_at", "timestamp"), ("updated_at", "timestamp"),
+    ],
+    "ad_versions": [
+        ("id", _STRING), ("ad_id", _STRING), ("version_number", "int"), ("ad_copy", _STRING),
+        ("title", _STRING), ("image_url", _STRING), ("video_url", _STRING), ("asset_type", _CATEGORY),
+        ("link_url", _STRING), ("link_description", _STRING), ("cta_text", _CATEGORY),
+        ("cta_type", _CATEGORY), ("caption", _STRING), ("content_hash", _STRING),
+        ("media_path", _STRING), ("video_path", _STRING), ("created_at", "timestamp"),
+        ("start_date", "date"), ("ad_updated_at", "timestamp"),
+    ],
+    "ad_platforms": [
+        ("id", _STRING), ("ad_id", _STRING), ("platform", _CATEGORY), ("created_at", "timestamp"),
+        ("start_date", "date"), ("ad_updated_at", "timestamp"),
+    ],
+}
+
+
+def _arrow_type(kind: str):
+    return {
+        _STRING: pa.string(),
+        _CATEGORY: pa.dictionary(pa.int32(), pa.string()),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us"),
+        "int": pa.int32(),
+    }[kind]
+
+
+def dataset_schema(table: str):
+    """Arrow schema of a dataset, partition columns last"""
+    fields = [pa.field(name, _arrow_type(kind)) for name, kind in _COLUMN_TYPES[table]]
+    fields += [pa.field(name, pa.string()) for name in PARTITION_COLUMNS]
+    return pa.schema(fields)
+
+
+def _value(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def to_record_batch(table: str, rows: List[Dict[str, Any]]):
+    """RecordBatch of row dicts holding the dataset columns plus start_date and page_name"""
+    schema = dataset_schema(table)
+    columns = []
+    for field in schema:
+        if field.name == "start_month":
+            values = [row["start_date"].strftime("%Y-%m") if row["start_date"] else None for row in rows]
+        else:
+            values = [_value(row.get(field.name)) for row in rows]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _queries(since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+    """Export query per dataset, restricted to ads with since <= updated_at <= until"""
+    ads = Ad.__table__
+    versions = AdVersion.__table__
+    platforms = AdPlatform.__table__
+    ad_columns = [ads.c.start_date, ads.c.page_name, ads.c.updated_at.label("ad_updated_at")]
+
+    def child_columns(table, names):
+        return [table.c[name] for name in names if name not in ("start_date", "ad_updated_at")]
+
+    queries = {
+        "ads": select(*[ads.c[name] for name, _ in _COLUMN_TYPES["ads"]], ads.c.page_name),
+        "ad_versions": select(*child_columns(versions, [name for name, _ in _COLUMN_TYPES["ad_versions"]]),
+                              *ad_columns).join(ads, ads.c.id == versions.c.ad_id),
+        "ad_platforms": select(*child_columns(platforms, [name for name, _ in _COLUMN_TYPES["ad_platforms"]]),
+                               *ad_columns).join(ads, ads.c.id == platforms.c.ad_id),
+    }
+    for name, query in queries.items():
+        if since is not None:
+            query = query.where(ads.c.updated_at >= since)
+        if until is not None:
+            query = query.where(ads.c.updated_at <= until)
+        queries[name] = query
+    return queries
+
+
+def _db_batches(table: str, query, chunk_size: int, counts: Dict[str, int]) -> Iterator[Any]:
+    """Stream a query's rows as RecordBatches, chunk_size rows at a time"""
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_size).execute(query)
+        for rows in result.mappings().partitions():
+            counts[table] += len(rows)
+            yield to_record_batch(table, rows)
+
+
+def _file_batches(table: str, file_path: str, chunk_size: int, counts: Dict[str, int]) -> Iterator[Any]:
+    """
+    Stream one dataset of parser output as RecordBatches (one pass over the file per dataset)
+
+    Ad row ids are derived from the Library ID, so all three datasets join on them.
+    """
+    rows: List[Dict[str, Any]] = []
+    for ad_data in iter_ads_file(file_path):
+        try:
+            ad_pk = str(uuid.uuid5(uuid.NAMESPACE_URL, f"facebook-ad:{ad_data['ad_id']}"))
+            item = prepare_ad(ad_data, {"id": ad_pk, "content_hash": None})
+        except Exception as e:
+            if table == "ads":
+                counts["errors"] += 1
+                print(f"[ERROR] Error exporting ad {ad_data.get('ad_id', 'unknown')}: {e}")
+            continue
+        ad_row = item["ad_row"]
+        if table == "ads":
+            rows.append(ad_row)
+        else:
+            parent = {"start_date": ad_row["start_date"], "page_name": ad_row["page_name"]}
+            child_rows = item["version_rows"] if table == "ad_versions" else item["platform_rows"]
+            rows.extend(dict(row, **parent) for row in child_rows)
+        if len(rows) >= chunk_size:
+            counts[table] += len(rows)
+            yield to_record_batch(table, rows)
+            rows = []
+    if rows:
+        counts[table] += len(rows)
+        yield to_record_batch(table, rows)
+
+
+def write_dataset(out_dir: str, table: str, batches: Iterable[Any], run_id: str) -> None:
+    """Append RecordBatches to a Hive-partitioned dataset; each run writes its own files"""
+    dictionary_columns = [name for name, kind in _COLUMN_TYPES[table] if kind == _CATEGORY]
+    parquet = pa_dataset.ParquetFileFormat()
+    pa_dataset.write_dataset(
+        batches,
+        os.path.join(out_dir, table),
+        schema=dataset_schema(table),
+        format=parquet,
+        file_options=parquet.make_write_options(compression="zstd", use_dictionary=dictionary_columns),
+        partitioning=pa_dataset.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]),
+                                             flavor="hive"),
+        basename_template=f"part-{run_id}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_partitions=1 << 20,
+    )
+
+
+def load_state(out_dir: str) -> Dict[str, Any]:
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(out_dir: str, state: Dict[str, Any]) -> None:
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def export_parquet(out_dir: str, incremental: bool = False, from_file: Optional[str] = None,
+                   chunk_size: int = CHUNK_SIZE, overlap: timedelta = OVERLAP) -> Dict[str, Any]:
+    """
+    Export ads, ad_versions and ad_platforms as Hive-partitioned Parquet datasets
+
+    Args:
+        out_dir: Output directory (one subdirectory per dataset)
+        incremental: Only ads updated since the stored watermark (minus overlap), appended to the
+            existing datasets; otherwise the datasets are replaced
+        from_file: Export parser output (scraped_ads.json or .jsonl) instead of the database
+        chunk_size: Rows per fetch and per record batch
+        overlap: How far before the watermark an incremental export starts
+
+    Returns:
+        Rows written per dataset, the new watermark and the elapsed seconds
+    """
+    if pa is None:
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir)
+    since = None
+    if incremental and state.get("watermark"):
+        since = datetime.fromisoformat(state["watermark"]) - overlap
+    if not incremental:
+        for table in _COLUMN_TYPES:
+            shutil.rmtree(os.path.join(out_dir, table), ignore_errors=True)
+
+    # Runs within the same second must not overwrite each other's files
+    run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    counts = {table: 0 for table in _COLUMN_TYPES}
+    counts["errors"] = 0
+    started = time.perf_counter()
+
+    if from_file:
+        until = None
+        sources = {table: _file_batches(table, from_file, chunk_size, counts) for table in _COLUMN_TYPES}
+    else:
+        init_db()
+        with engine.connect() as conn:
+            # Fixed upper bound, so all three datasets cover the same ads and the next run starts here
+            until = conn.execute(select(func.max(Ad.__table__.c.updated_at))).scalar()
+        queries = _queries(since, until)
+        sources = {table: _db_batches(table, query, chunk_size, counts) for table, query in queries.items()}
+
+    for table, batches in sources.items():
+        phase = time.perf_counter()
+        with metrics.stage(f"export_{table}"):
+            write_dataset(out_dir, table, batches, run_id)
+        seconds = time.perf_counter() - phase
+        print(f"[EXPORT] {table}: {counts[table]} rows in {seconds:.2f}s - "
+              f"{counts[table] / seconds if seconds else 0:.0f} rows/s")
+        metrics.incr(f"exported_{table}", counts[table])
+
+    watermark = state.get("watermark") if incremental else None
+    if until is not None and (watermark is None or until > datetime.fromisoformat(watermark)):
+        watermark = until.isoformat()
+    if not from_file:
+        save_state(out_dir, {"watermark": watermark, "last_run": run_id,
+                             "rows": {table: counts[table] for table in _COLUMN_TYPES}})
+
+    return dict(counts, watermark=watermark, seconds=time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export ads, versions and platforms to partitioned Parquet")
+    parser.add_argument("out_dir", help="Output directory")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only ads updated since the last export, added to the existing datasets")
+    parser.add_argument("--overlap-minutes", type=float, default=OVERLAP.total_seconds() / 60,
+                        help=f"Re-export ads updated this long before the watermark (default: {OVERLAP.total_seconds() / 60:.0f})")
+    parser.add_argument("--from-file", help="Export parser output (scraped_ads.json or .jsonl) instead of the database")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Rows per fetch (default: {CHUNK_SIZE})")
+    args = parser.parse_args()
+
+    try:
+        with instrumented_run("export_parquet", out_dir=args.out_dir, incremental=args.incremental):
+            result = export_parquet(args.out_dir, args.incremental, args.from_file, args.chunk_size,
+                                    timedelta(minutes=args.overlap_minutes))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Exported {result['ads']} ads, {result['ad_versions']} versions, {result['ad_platforms']} platforms "
+          f"in {result['seconds']:.2f}s" + (f" (watermark {result['watermark']})" if result["watermark"] else ""))
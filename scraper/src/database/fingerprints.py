@@ -0,0 +1,52 @@
+"""Content fingerprints used to skip unchanged ads on re-import"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Version fields that make up a version's content
+VERSION_FIELDS = (
+    "ad_copy", "title", "image_url", "video_url", "asset_type", "link_url",
+    "link_description", "cta_text", "cta_type", "caption",
+)
+# Signed CDN links: re-scrapes hand out the same asset with new signature and expiry parameters
+MEDIA_URL_FIELDS = ("image_url", "video_url")
+# Query parameters that select a different rendition of the same asset (the rest are signatures/tracking)
+VARIANT_PARAMS = ("stp",)
+
+
+def _digest(payload: Any) -> str:
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def media_url_key(url: Optional[str]) -> Optional[str]:
+    """Host and path of a media URL plus its rendition parameters, without signatures"""
+    if not url:
+        return url
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    variant = "&".join(f"{name}={query[name][0]}" for name in VARIANT_PARAMS if name in query)
+    return f"{parsed.hostname}{parsed.path}" + (f"?{variant}" if variant else "")
+
+
+def version_fingerprint(version_data: Dict[str, Any]) -> str:
+    """sha256 of a parsed version's content fields (media URLs without their signatures)"""
+    return _digest([
+        media_url_key(version_data.get(field)) if field in MEDIA_URL_FIELDS else version_data.get(field)
+        for field in VERSION_FIELDS
+    ])
+
+
+def ad_fingerprint(ad_data: Dict[str, Any], version_hashes: List[str]) -> str:
+    """sha256 of an ad's status, dates, page, platforms and ordered version fingerprints"""
+    status = ad_data.get("status")
+    return _digest({
+        "status": status.upper() if isinstance(status, str) else status,
+        "start_date": ad_data.get("start_date"),
+        "end_date": ad_data.get("end_date"),
+        "page_name": ad_data.get("page_name"),
+        "page_profile_uri": ad_data.get("page_profile_uri"),
+        "platforms": sorted(set(ad_data.get("platforms") or [])),
+        "versions": version_hashes,
+    })
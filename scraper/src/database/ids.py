@@ -0,0 +1,55 @@
+"""
+Time-ordered primary keys (UUIDv7, RFC 9562)
+
+A UUIDv7 starts with the 48-bit Unix time in milliseconds, so ids created
+later sort later, both as UUIDs and as the 36-character strings the tables
+store. New rows land at the right edge of the primary key B-tree instead of
+random pages (uuid4), and ids double as a creation-order tiebreaker for
+keyset pagination. Within one millisecond a 12-bit counter keeps the ids of
+this process increasing; the remaining 62 bits are random.
+
+Existing uuid4 ids stay valid: both are UUID strings of the same length.
+"""
+import os
+import threading
+import time
+import uuid
+
+# PostgreSQL expression with the same layout, for ids generated in SQL (copy_loader.py).
+# Overwrites the first 6 bytes of a random UUID with the millisecond timestamp and turns
+# the version nibble from 4 (0100) into 7 (0111).
+UUID7_SQL = (
+    "encode(set_bit(set_bit(overlay(uuid_send(gen_random_uuid()) placing "
+    "substring(int8send(floor(extract(epoch from clock_timestamp()) * 1000)::bigint) from 3) "
+    "from 1 for 6), 52, 1), 53, 1), 'hex')::uuid::text"
+)
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """New UUIDv7; increasing within this process, even within one millisecond"""
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1000000
+        if ms > _last_ms:
+            _last_ms = ms
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF  # Leave room to count up
+        else:
+            # Same millisecond (or the clock went back): count on, borrowing the next millisecond on overflow
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
+
+
+def new_id() -> str:
+    """New primary key value (UUIDv7 string)"""
+    return str(uuid7())
@@ -1,19 +1,40 @@
 """Script to import ads from scraped_ads.json into database"""
+import argparse
 import json
 import sys
 import os
+import time
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+from typing import List, Dict, Any, Optional
+from sqlalchemy import bindparam, or_, select, delete, update, func
+from sqlalchemy.dialects import postgresql, sqlite
 
 # Add parent directory to path for imports when running as script
 if __name__ == "__main__":
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from database.connection import SessionLocal, init_db, engine
+    from database.connection import init_db, engine, pool_metrics, format_pool_metrics, values_chunks
+    from database.fingerprints import ad_fingerprint, version_fingerprint
+    from database.ids import new_id
     from database.models import Ad, AdVersion, AdPlatform, AdStatus, AssetType
+    from database import creative_index, events, rollups, search
+    from instrumentation import instrumented_run, metrics
 else:
-    from .connection import SessionLocal, init_db, engine
+    from .connection import init_db, engine, pool_metrics, format_pool_metrics, values_chunks
+    from .fingerprints import ad_fingerprint, version_fingerprint
+    from .ids import new_id
     from .models import Ad, AdVersion, AdPlatform, AdStatus, AssetType
+    from . import creative_index, events, rollups, search
+    from instrumentation import metrics
+
+
+DEFAULT_BATCH_SIZE = 500
+
+# Columns overwritten when an existing ad is upserted
+AD_UPDATE_COLUMNS = ("status", "start_date", "end_date", "page_name", "page_profile_uri", "content_hash")
+
+
+class AdConflictError(Exception):
+    """An ad read as new was inserted by another import before this batch's upsert"""
 
 
 def parse_date(date_str):
@@ -26,134 +47,439 @@ def parse_date(date_str):
         return None
 
 
-def import_ads_from_json(json_file_path: str):
-    """Import ads from JSON file into database"""
-    
-    # Initialize database (create tables)
-    print("Initializing database...")
-    init_db()
-    
-    # Load JSON file
+def parse_status(status):
+    """Convert scraped status ("active"/"inactive") to AdStatus"""
+    # Convert status to uppercase to match enum values
+    status_value = status.upper() if isinstance(status, str) else status
+    return AdStatus(status_value)
+
+
+def parse_asset_type(asset_type):
+    """Convert scraped asset type to AssetType, ignoring unknown values"""
+    if not asset_type:
+        return None
+    try:
+        return AssetType(asset_type)
+    except:
+        return None
+
+
+def load_ads_json(json_file_path: str) -> List[Dict[str, Any]]:
+    """Load the list of ads from a scraped_ads.json file"""
     print(f"Loading ads from {json_file_path}...")
     with open(json_file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
-    
+
     ads_data = data.get("ads", [])
     print(f"Found {len(ads_data)} ads to import")
-    
-    db: Session = SessionLocal()
-    
+    return ads_data
+
+
+def build_ad_row(ad_data: Dict[str, Any], ad_pk: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Build an `ads` row from parsed ad data (raises on invalid data)"""
+    return {
+        "id": ad_pk,
+        "ad_id": str(ad_data["ad_id"]),
+        "status": parse_status(ad_data["status"]),
+        "start_date": parse_date(ad_data["start_date"]),
+        "end_date": parse_date(ad_data.get("end_date")),
+        "page_name": ad_data.get("page_name"),
+        "page_profile_uri": ad_data.get("page_profile_uri"),
+        "content_hash": content_hash,
+    }
+
+
+def build_version_rows(ad_pk: str, versions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build `ad_versions` rows (with content fingerprints) for one ad"""
+    return [
+        {
+            "id": new_id(),
+            "ad_id": ad_pk,
+            "version_number": idx,
+            "ad_copy": version_data.get("ad_copy"),
+            "title": version_data.get("title"),
+            "image_url": version_data.get("image_url"),
+            "video_url": version_data.get("video_url"),
+            "asset_type": parse_asset_type(version_data.get("asset_type")),
+            "link_url": version_data.get("link_url"),
+            "link_description": version_data.get("link_description"),
+            "cta_text": version_data.get("cta_text"),
+            "cta_type": version_data.get("cta_type"),
+            "caption": version_data.get("caption"),
+            "content_hash": version_fingerprint(version_data),
+        }
+        for idx, version_data in enumerate(versions, start=1)
+    ]
+
+
+def build_platform_rows(ad_pk: str, platforms: List[str]) -> List[Dict[str, Any]]:
+    """Build `ad_platforms` rows for one ad"""
+    return [
+        {"id": new_id(), "ad_id": ad_pk, "platform": platform}
+        for platform in platforms
+    ]
+
+
+def prepare_ad(ad_data: Dict[str, Any], existing: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build all rows for one ad and decide whether it changed since the last import"""
+    ad_pk = existing["id"] if existing else new_id()
+    version_rows = build_version_rows(ad_pk, ad_data.get("versions", []))
+    content_hash = ad_fingerprint(ad_data, [row["content_hash"] for row in version_rows])
+    return {
+        "ad_id": str(ad_data["ad_id"]),
+        "existing": existing is not None,
+        "unchanged": existing is not None and existing["content_hash"] == content_hash,
+        "ad_row": build_ad_row(ad_data, ad_pk, content_hash),
+        "version_rows": version_rows,
+        "platform_rows": build_platform_rows(ad_pk, ad_data.get("platforms", [])),
+    }
+
+
+def _set_ad_pk(item: Dict[str, Any], ad_pk: str) -> None:
+    """Point a prepared ad's rows at its primary key"""
+    item["ad_row"]["id"] = ad_pk
+    for row in item["version_rows"] + item["platform_rows"]:
+        row["ad_id"] = ad_pk
+
+
+def _upsert_ads(conn, items: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Insert or update `ads` rows in multi-row statements where the dialect allows it (one per
+    chunk of rows under the parameter limit)
+
+    Returns:
+        Library ID -> primary key of the stored rows (RETURNING where the dialect allows it)
+    """
+    ad_rows = [item["ad_row"] for item in items]
+    if not ad_rows:
+        return {}
+
+    table = Ad.__table__
+    dialect = conn.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        ad_pks = {}
+        for rows in values_chunks(conn, ad_rows):
+            stmt = insert(table).values(rows)
+            set_ = {col: stmt.excluded[col] for col in AD_UPDATE_COLUMNS}
+            set_["updated_at"] = func.now()
+            stmt = stmt.on_conflict_do_update(index_elements=[table.c.ad_id], set_=set_)
+            ad_pks.update(conn.execute(stmt.returning(table.c.ad_id, table.c.id)).all())
+        return ad_pks
+
+    # Generic fallback: split into plain INSERTs and per-row UPDATEs
+    new_rows = [item["ad_row"] for item in items if not item["existing"]]
+    if new_rows:
+        conn.execute(table.insert(), new_rows)
+    for item in items:
+        if item["existing"]:
+            row = item["ad_row"]
+            values = {col: row[col] for col in AD_UPDATE_COLUMNS}
+            values["updated_at"] = func.now()
+            conn.execute(update(table).where(table.c.id == row["id"]).values(**values))
+    return {row["ad_id"]: row["id"] for row in ad_rows}
+
+
+def _load_existing_versions(conn, ad_pks: List[str]) -> Dict[str, Dict[int, Any]]:
+    """Load version_number -> (id, content_hash) of existing ads in one query"""
+    if not ad_pks:
+        return {}
+    table = AdVersion.__table__
+    rows = conn.execute(
+        select(table.c.ad_id, table.c.version_number, table.c.id, table.c.content_hash)
+        .where(table.c.ad_id.in_(ad_pks))
+    )
+    versions: Dict[str, Dict[int, Any]] = {}
+    for row in rows:
+        versions.setdefault(row.ad_id, {})[row.version_number] = row
+    return versions
+
+
+def _refresh_media_urls(conn, version_rows: List[Dict[str, Any]]) -> None:
+    """
+    Store the current media URLs of versions whose content did not change
+
+    Fingerprints leave out the CDN signatures (fingerprints.media_url_key), so
+    a version whose links were only re-signed is not rewritten, but the links
+    stored with it expire. Only the URL columns of rows holding other links
+    are updated: no new version, event, rollup change or updated_at.
+    """
+    if not version_rows:
+        return
+    table = AdVersion.__table__
+    conn.execute(
+        update(table)
+        .where(table.c.ad_id == bindparam("ad_pk"), table.c.version_number == bindparam("number"),
+               or_(table.c.image_url.is_distinct_from(bindparam("image")),
+                   table.c.video_url.is_distinct_from(bindparam("video"))))
+        .values(image_url=bindparam("image"), video_url=bindparam("video")),
+        [{"ad_pk": row["ad_id"], "number": row["version_number"], "image": row["image_url"],
+          "video": row["video_url"]} for row in version_rows],
+    )
+
+
+def _write_batch(conn, items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Write a batch of changed or new ads, their rollup deltas, lifecycle events, near-duplicate
+    and full-text index entries; unchanged versions are left in place
+
+    Which ads exist is read again in this transaction (prepare_ad ran on a read taken before
+    it), with the rows locked on PostgreSQL, and the rows of every ad are pointed at the
+    primary key the upsert returns. Raises AdConflictError if another import inserted one of
+    the new ads in between; the caller retries the ads one by one.
+
+    Returns:
+        Number of version, platform and event rows written
+    """
+    stored = _load_existing_ads(conn, [item["ad_id"] for item in items], lock=True)
+    for item in items:
+        item["existing"] = item["ad_id"] in stored
+        if item["existing"]:
+            _set_ad_pk(item, stored[item["ad_id"]]["id"])
+    existing_pks = [item["ad_row"]["id"] for item in items if item["existing"]]
+    old_states = rollups.load_ad_states(conn, existing_pks)
+
+    ad_pks = _upsert_ads(conn, items)
+    for item in items:
+        if ad_pks[item["ad_id"]] != item["ad_row"]["id"]:
+            raise AdConflictError(f"ad {item['ad_id']} was inserted by another import")
+
+    existing_versions = _load_existing_versions(conn, existing_pks)
+
+    # Only versions whose content changed (or that disappeared) are rewritten
+    stale_version_ids = []
+    version_rows = []
+    kept_rows = []
+    for item in items:
+        old_versions = existing_versions.get(item["ad_row"]["id"], {})
+        new_numbers = set()
+        for row in item["version_rows"]:
+            new_numbers.add(row["version_number"])
+            old = old_versions.get(row["version_number"])
+            if old is not None and old.content_hash == row["content_hash"]:
+                kept_rows.append(row)
+                continue
+            if old is not None:
+                stale_version_ids.append(old.id)
+            version_rows.append(row)
+        stale_version_ids.extend(old.id for number, old in old_versions.items() if number not in new_numbers)
+
+    # Diff against the stored state before it is overwritten
+    event_count = events.write_events(conn, events.compute_events(items, old_states, existing_versions))
+
+    if stale_version_ids:
+        creative_index.remove_versions(conn, stale_version_ids)
+        search.remove_versions(conn, stale_version_ids)
+        conn.execute(delete(AdVersion.__table__).where(AdVersion.__table__.c.id.in_(stale_version_ids)))
+    if existing_pks:
+        conn.execute(delete(AdPlatform.__table__).where(AdPlatform.__table__.c.ad_id.in_(existing_pks)))
+
+    platform_rows = [row for item in items for row in item["platform_rows"]]
+    if version_rows:
+        creative_index.add_signatures(version_rows)
+        conn.execute(AdVersion.__table__.insert(), version_rows)
+        creative_index.index_versions(conn, version_rows)
+        search.index_versions(conn, [row["id"] for row in version_rows])
+    if platform_rows:
+        conn.execute(AdPlatform.__table__.insert(), platform_rows)
+    _refresh_media_urls(conn, kept_rows)
+
+    # Keep the statistics rollups in step, in the same transaction
+    rollups.apply_deltas(conn, *rollups.compute_deltas(
+        (old_states.get(item["ad_row"]["id"]),
+         rollups.ad_state(item["ad_row"], item["platform_rows"]))
+        for item in items
+    ))
+    return {"versions": len(version_rows), "platforms": len(platform_rows), "events": event_count}
+
+
+def _load_existing_ads(conn, ad_ids: List[str], lock: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Load id and content_hash of the batch's existing ads in one query (FOR UPDATE with lock)"""
+    if not ad_ids:
+        return {}
+    table = Ad.__table__
+    query = select(table.c.ad_id, table.c.id, table.c.content_hash).where(table.c.ad_id.in_(ad_ids))
+    if lock:
+        # Sorted so concurrent importers lock rows in the same order
+        query = query.order_by(table.c.ad_id).with_for_update()
+    rows = conn.execute(query)
+    return {row.ad_id: {"id": row.id, "content_hash": row.content_hash} for row in rows}
+
+
+def import_ads_bulk(ads_data: List[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Import ads in set-based batches (one transaction per batch)
+
+    Each batch loads the existing ads' ids and fingerprints in one query and
+    skips ads whose fingerprint did not change, so their rows and updated_at
+    stay untouched; only re-signed media URLs are stored (_refresh_media_urls).
+    Changed and new ads are upserted in multi-row statements, with only the
+    versions whose content changed rewritten; their ids are resolved again
+    inside the write transaction (_write_batch). If a batch fails, it is
+    retried one ad at a time so a single bad ad does not sink the batch.
+
+    Args:
+        ads_data: Parsed ads - dicts loaded from JSON, or ParsedAd records
+            straight from the parser (both support ad["field"] / ad.get())
+        batch_size: Number of ads written per transaction
+
+    Returns:
+        Counts of new, updated, unchanged and failed ads, and of lifecycle events recorded
+    """
     imported_count = 0
     updated_count = 0
+    unchanged_count = 0
     error_count = 0
-    
-    try:
-        for ad_data in ads_data:
+    event_count = 0
+    started = time.perf_counter()
+
+    for batch_number, offset in enumerate(range(0, len(ads_data), batch_size), start=1):
+        batch = ads_data[offset:offset + batch_size]
+        batch_started = time.perf_counter()
+        batch_errors = 0
+
+        # Keep the last occurrence of an ad_id within the batch
+        unique = {}
+        for ad_data in batch:
             try:
-                # Check if ad already exists
-                existing_ad = db.query(Ad).filter(Ad.ad_id == ad_data["ad_id"]).first()
-                
-                if existing_ad:
-                    # Update existing ad
-                    # Convert status to uppercase to match enum values
-                    status_value = ad_data["status"].upper() if isinstance(ad_data["status"], str) else ad_data["status"]
-                    existing_ad.status = AdStatus(status_value)
-                    existing_ad.start_date = parse_date(ad_data["start_date"])
-                    existing_ad.end_date = parse_date(ad_data.get("end_date"))
-                    existing_ad.page_name = ad_data.get("page_name")
-                    existing_ad.page_profile_uri = ad_data.get("page_profile_uri")
-                    existing_ad.updated_at = datetime.now()
-                    
-                    # Delete existing versions and platforms (will be recreated)
-                    db.query(AdVersion).filter(AdVersion.ad_id == existing_ad.id).delete()
-                    db.query(AdPlatform).filter(AdPlatform.ad_id == existing_ad.id).delete()
-                    
-                    ad = existing_ad
-                    updated_count += 1
-                else:
-                    # Create new ad
-                    # Convert status to uppercase to match enum values
-                    status_value = ad_data["status"].upper() if isinstance(ad_data["status"], str) else ad_data["status"]
-                    ad = Ad(
-                        ad_id=ad_data["ad_id"],
-                        status=AdStatus(status_value),
-                        start_date=parse_date(ad_data["start_date"]),
-                        end_date=parse_date(ad_data.get("end_date")),
-                        page_name=ad_data.get("page_name"),
-                        page_profile_uri=ad_data.get("page_profile_uri")
-                    )
-                    db.add(ad)
-                    db.flush()  # Get the ID
-                    imported_count += 1
-                
-                # Import platforms
-                platforms = ad_data.get("platforms", [])
-                for platform in platforms:
-                    platform_entry = AdPlatform(
-                        ad_id=ad.id,
-                        platform=platform
-                    )
-                    db.add(platform_entry)
-                
-                # Import versions
-                versions = ad_data.get("versions", [])
-                for idx, version_data in enumerate(versions, start=1):
-                    asset_type = None
-                    if version_data.get("asset_type"):
-                        try:
-                            asset_type = AssetType(version_data["asset_type"])
-                        except:
-                            pass
-                    
-                    version = AdVersion(
-                        ad_id=ad.id,
-                        version_number=idx,
-                        ad_copy=version_data.get("ad_copy"),
-                        title=version_data.get("title"),
-                        image_url=version_data.get("image_url"),
-                        video_url=version_data.get("video_url"),
-                        asset_type=asset_type,
-                        link_url=version_data.get("link_url"),
-                        link_description=version_data.get("link_description"),
-                        cta_text=version_data.get("cta_text"),
-                        cta_type=version_data.get("cta_type"),
-                        caption=version_data.get("caption")
-                    )
-                    db.add(version)
-                
-                db.commit()
-                print(f"[OK] Imported ad {ad.ad_id} ({len(versions)} versions, {len(platforms)} platforms)")
-                
-            except IntegrityError as e:
-                db.rollback()
-                error_count += 1
-                print(f"[ERROR] Error importing ad {ad_data.get('ad_id', 'unknown')}: {e}")
+                unique[str(ad_data["ad_id"])] = ad_data
             except Exception as e:
-                db.rollback()
-                error_count += 1
+                batch_errors += 1
                 print(f"[ERROR] Error importing ad {ad_data.get('ad_id', 'unknown')}: {e}")
-        
-        print(f"\n{'='*60}")
-        print(f"Import Summary:")
-        print(f"  New ads: {imported_count}")
-        print(f"  Updated ads: {updated_count}")
-        print(f"  Errors: {error_count}")
-        print(f"  Total processed: {len(ads_data)}")
-        print(f"{'='*60}")
-        
-    finally:
-        db.close()
+
+        with metrics.stage("load_existing"), engine.connect() as conn:
+            existing_ads = _load_existing_ads(conn, list(unique))
+
+        prepared = []
+        unchanged = []
+        prepare_started = time.perf_counter()
+        for ad_id, ad_data in unique.items():
+            try:
+                item = prepare_ad(ad_data, existing_ads.get(ad_id))
+            except Exception as e:
+                batch_errors += 1
+                print(f"[ERROR] Error importing ad {ad_id}: {e}")
+                continue
+            if item["unchanged"]:
+                unchanged.append(item)
+            else:
+                prepared.append(item)
+        metrics.add_time("prepare", time.perf_counter() - prepare_started)
+        batch_unchanged = len(unchanged)
+
+        if unchanged:
+            try:
+                with metrics.stage("refresh_urls"), engine.begin() as conn:
+                    _refresh_media_urls(conn, [row for item in unchanged for row in item["version_rows"]])
+            except Exception as e:
+                print(f"[WARN] Batch {batch_number}: media URLs of unchanged ads not refreshed "
+                      f"({e.__class__.__name__}: {e})")
+
+        written = []
+        rows = {"versions": 0, "platforms": 0, "events": 0}
+        try:
+            with metrics.stage("write_batch"), engine.begin() as conn:
+                rows = _write_batch(conn, prepared)
+            written = prepared
+        except Exception as e:
+            print(f"[WARN] Batch {batch_number} failed ({e.__class__.__name__}), retrying ads one by one")
+            metrics.incr("batch_retries")
+            for item in prepared:
+                try:
+                    with metrics.stage("write_ad"), engine.begin() as conn:
+                        ad_rows = _write_batch(conn, [item])
+                    written.append(item)
+                    for key in rows:
+                        rows[key] += ad_rows[key]
+                except Exception as e:
+                    batch_errors += 1
+                    print(f"[ERROR] Error importing ad {item['ad_id']}: {e}")
+
+        metrics.incr("ads_written", len(written))
+        metrics.incr("versions_written", rows["versions"])
+        metrics.incr("platforms_written", rows["platforms"])
+        metrics.incr("events_written", rows["events"])
+        metrics.incr("ads_unchanged", batch_unchanged)
+        metrics.incr("import_errors", batch_errors)
+
+        batch_new = sum(1 for item in written if not item["existing"])
+        imported_count += batch_new
+        updated_count += len(written) - batch_new
+        unchanged_count += batch_unchanged
+        error_count += batch_errors
+        event_count += rows["events"]
+
+        elapsed = time.perf_counter() - batch_started
+        processed = len(written) + batch_unchanged
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        print(
+            f"[BATCH {batch_number}] {processed} ads ({batch_new} new, "
+            f"{len(written) - batch_new} changed, {batch_unchanged} unchanged, {batch_errors} errors) "
+            f"in {elapsed:.2f}s - {rate:.0f} ads/s"
+        )
+
+    elapsed = time.perf_counter() - started
+    if ads_data and elapsed > 0:
+        print(f"Import throughput: {len(ads_data) / elapsed:.0f} ads/s over {elapsed:.2f}s")
+
+    return {"imported": imported_count, "updated": updated_count,
+            "unchanged": unchanged_count, "errors": error_count, "events": event_count}
+
+
+def import_ads_from_json(json_file_path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Import ads from JSON file into database"""
+
+    # Initialize database (create tables)
+    print("Initializing database...")
+    init_db()
+
+    # Load JSON file
+    with metrics.stage("load_json"):
+        ads_data = load_ads_json(json_file_path)
+
+    counts = import_ads_bulk(ads_data, batch_size=batch_size)
+
+    print(f"\n{'='*60}")
+    print(f"Import Summary:")
+    print(f"  New ads: {counts['imported']}")
+    print(f"  Changed ads: {counts['updated']}")
+    print(f"  Unchanged ads (skipped): {counts['unchanged']}")
+    print(f"  Errors: {counts['errors']}")
+    print(f"  Lifecycle events: {counts['events']}")
+    print(f"  Total processed: {len(ads_data)}")
+    print(f"  Connection pool: {format_pool_metrics(pool_metrics())}")
+    print(f"{'='*60}")
+
+    return counts
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python import_ads.py <path_to_scraped_ads.json>")
-        print("Example: python import_ads.py scraped_ads.json")
-        sys.exit(1)
-    
-    json_file = sys.argv[1]
-    if not os.path.exists(json_file):
-        print(f"Error: File '{json_file}' not found!")
+    parser = argparse.ArgumentParser(
+        description="Import ads from scraped_ads.json into the database",
+        epilog="Example: python import_ads.py scraped_ads.json --batch-size 1000",
+    )
+    parser.add_argument("json_file", help="Path to scraped_ads.json")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Ads per transaction (default: {DEFAULT_BATCH_SIZE}; 1 commits every ad)")
+    parser.add_argument("--copy", action="store_true",
+                        help="PostgreSQL only: load through COPY into staging tables (also accepts .jsonl files)")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="With --copy: drop secondary indexes during the merge and rebuild them after")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.json_file):
+        print(f"Error: File '{args.json_file}' not found!")
         sys.exit(1)
-    
-    import_ads_from_json(json_file)
+
+    if args.copy:
+        from database.copy_loader import import_ads_copy
+        try:
+            with instrumented_run("import_copy", input=args.json_file):
+                import_ads_copy(args.json_file, defer_indexes=args.defer_indexes)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    else:
+        with instrumented_run("import", input=args.json_file, batch_size=args.batch_size):
+            import_ads_from_json(args.json_file, batch_size=args.batch_size)
@@ -12,7 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirna
 
 # Import Base and models
 from database.connection import Base
-from database.models import Ad, AdVersion, AdPlatform
+from database.models import Ad, AdVersion, AdPlatform, AdDailyStat, AdPageStat, AdEvent, ScrapeJob, CreativeBucket
 
 # this is the Alembic Config object
 config = context.config
@@ -29,12 +29,24 @@ if database_url:
 # add your model's MetaData object here
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate away from structures that have no model: full-text search (migration 0009)
+    and the monthly partitions of ad_events (partitions.py)"""
+    if type_ == "table" and (name.startswith("ad_versions_fts") or (reflected and name.startswith("ad_events_"))):
+        return False
+    if name in ("search_vector", "ix_ad_versions_search_vector", "ix_ads_page_name_trgm"):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -53,7 +65,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
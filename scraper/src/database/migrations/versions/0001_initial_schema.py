@@ -0,0 +1,86 @@
+"""initial schema: ads, ad_versions, ad_platforms
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+Databases created earlier with init_db() already have these tables; mark
+them as migrated with `alembic stamp 0001` before upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ads',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('ad_id', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.Enum('ACTIVE', 'INACTIVE', name='adstatus'), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('page_name', sa.String(length=255), nullable=False),
+        sa.Column('page_profile_uri', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_ads_ad_id', 'ads', ['ad_id'], unique=True)
+    op.create_index('ix_ads_status', 'ads', ['status'])
+    op.create_index('ix_ads_start_date', 'ads', ['start_date'])
+    op.create_index('ix_ads_end_date', 'ads', ['end_date'])
+
+    op.create_table(
+        'ad_versions',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('ad_id', sa.String(length=36), nullable=False),
+        sa.Column('version_number', sa.Integer(), nullable=False),
+        sa.Column('ad_copy', sa.Text(), nullable=True),
+        sa.Column('title', sa.String(length=500), nullable=True),
+        sa.Column('image_url', sa.Text(), nullable=True),
+        sa.Column('video_url', sa.Text(), nullable=True),
+        sa.Column('asset_type', sa.Enum('IMAGE', 'VIDEO', name='assettype'), nullable=True),
+        sa.Column('link_url', sa.Text(), nullable=True),
+        sa.Column('link_description', sa.Text(), nullable=True),
+        sa.Column('cta_text', sa.String(length=100), nullable=True),
+        sa.Column('cta_type', sa.String(length=50), nullable=True),
+        sa.Column('caption', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ad_id'], ['ads.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_ad_versions_ad_id', 'ad_versions', ['ad_id'])
+
+    op.create_table(
+        'ad_platforms',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('ad_id', sa.String(length=36), nullable=False),
+        sa.Column('platform', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ad_id'], ['ads.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_ad_platforms_ad_id', 'ad_platforms', ['ad_id'])
+    op.create_index('ix_ad_platforms_platform', 'ad_platforms', ['platform'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ad_platforms_platform', table_name='ad_platforms')
+    op.drop_index('ix_ad_platforms_ad_id', table_name='ad_platforms')
+    op.drop_table('ad_platforms')
+    op.drop_index('ix_ad_versions_ad_id', table_name='ad_versions')
+    op.drop_table('ad_versions')
+    op.drop_index('ix_ads_end_date', table_name='ads')
+    op.drop_index('ix_ads_start_date', table_name='ads')
+    op.drop_index('ix_ads_status', table_name='ads')
+    op.drop_index('ix_ads_ad_id', table_name='ads')
+    op.drop_table('ads')
+    sa.Enum(name='assettype').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='adstatus').drop(op.get_bind(), checkfirst=True)
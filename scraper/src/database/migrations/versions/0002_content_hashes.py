@@ -0,0 +1,29 @@
+"""add content fingerprints to ads and ad_versions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows keep NULL hashes and are rewritten once on their next import
+    op.add_column('ads', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('ad_versions', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('ad_versions') as batch_op:
+        batch_op.drop_column('content_hash')
+    with op.batch_alter_table('ads') as batch_op:
+        batch_op.drop_column('content_hash')
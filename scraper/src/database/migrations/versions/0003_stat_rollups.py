@@ -0,0 +1,60 @@
+"""add ad_daily_stats and ad_page_stats rollup tables
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 12:00:00.000000
+
+The rollups are backfilled from the existing ads; afterwards the importer
+maintains them (see database/rollups.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# Reuse the adstatus type created by 0001 instead of creating it again
+adstatus = postgresql.ENUM('ACTIVE', 'INACTIVE', name='adstatus', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ad_daily_stats',
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('status', adstatus, nullable=False),
+        sa.Column('platform', sa.String(length=50), nullable=False),
+        sa.Column('ad_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('start_date', 'status', 'platform'),
+    )
+    op.create_table(
+        'ad_page_stats',
+        sa.Column('page_name', sa.String(length=255), nullable=False),
+        sa.Column('status', adstatus, nullable=False),
+        sa.Column('ad_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('page_name', 'status'),
+    )
+
+    op.execute("""
+        INSERT INTO ad_daily_stats (start_date, status, platform, ad_count)
+        SELECT start_date, status, '*', COUNT(*) FROM ads GROUP BY start_date, status
+    """)
+    op.execute("""
+        INSERT INTO ad_daily_stats (start_date, status, platform, ad_count)
+        SELECT a.start_date, a.status, p.platform, COUNT(DISTINCT a.id)
+        FROM ads a JOIN ad_platforms p ON p.ad_id = a.id
+        GROUP BY a.start_date, a.status, p.platform
+    """)
+    op.execute("""
+        INSERT INTO ad_page_stats (page_name, status, ad_count)
+        SELECT page_name, status, COUNT(*) FROM ads GROUP BY page_name, status
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('ad_page_stats')
+    op.drop_table('ad_daily_stats')
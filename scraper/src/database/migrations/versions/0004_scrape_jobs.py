@@ -0,0 +1,46 @@
+"""add scrape_jobs table for the scheduler
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scrape_jobs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('target', sa.String(length=500), nullable=False),
+        sa.Column('interval_minutes', sa.Integer(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('max_ads', sa.Integer(), nullable=True),
+        sa.Column('enabled', sa.Boolean(), nullable=False),
+        sa.Column('next_run_at', sa.DateTime(), nullable=True),
+        sa.Column('running_since', sa.DateTime(), nullable=True),
+        sa.Column('last_started_at', sa.DateTime(), nullable=True),
+        sa.Column('last_finished_at', sa.DateTime(), nullable=True),
+        sa.Column('last_status', sa.String(length=20), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('last_ads', sa.Integer(), nullable=True),
+        sa.Column('consecutive_failures', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('target'),
+    )
+    op.create_index('ix_scrape_jobs_next_run_at', 'scrape_jobs', ['next_run_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scrape_jobs_next_run_at', table_name='scrape_jobs')
+    op.drop_table('scrape_jobs')
@@ -0,0 +1,34 @@
+"""add local media columns to ad_versions
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing versions get their media on the next media_downloader.py run
+    op.add_column('ad_versions', sa.Column('media_sha256', sa.String(length=64), nullable=True))
+    op.add_column('ad_versions', sa.Column('media_path', sa.String(length=255), nullable=True))
+    op.add_column('ad_versions', sa.Column('video_sha256', sa.String(length=64), nullable=True))
+    op.add_column('ad_versions', sa.Column('video_path', sa.String(length=255), nullable=True))
+    op.create_index('ix_ad_versions_media_sha256', 'ad_versions', ['media_sha256'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ad_versions_media_sha256', table_name='ad_versions')
+    with op.batch_alter_table('ad_versions') as batch_op:
+        batch_op.drop_column('video_path')
+        batch_op.drop_column('video_sha256')
+        batch_op.drop_column('media_path')
+        batch_op.drop_column('media_sha256')
@@ -0,0 +1,40 @@
+"""add ad_events change log
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Starts empty: events are recorded from the next import on
+    op.create_table(
+        'ad_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('ad_pk', sa.String(length=36), nullable=False),
+        sa.Column('ad_id', sa.String(length=100), nullable=False),
+        sa.Column('event_type', sa.String(length=20), nullable=False),
+        sa.Column('version_number', sa.Integer(), nullable=True),
+        sa.Column('platform', sa.String(length=50), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_ad_events_type_occurred_at', 'ad_events', ['event_type', 'occurred_at'])
+    op.create_index('ix_ad_events_ad_pk_id', 'ad_events', ['ad_pk', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ad_events_ad_pk_id', table_name='ad_events')
+    op.drop_index('ix_ad_events_type_occurred_at', table_name='ad_events')
+    op.drop_table('ad_events')
@@ -0,0 +1,37 @@
+"""add near-duplicate creative index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing versions stay unindexed until: py database/creative_index.py --rebuild
+    op.add_column('ad_versions', sa.Column('minhash', sa.LargeBinary(), nullable=True))
+    op.create_table(
+        'creative_lsh_buckets',
+        sa.Column('band', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('version_id', sa.String(length=36), nullable=False),
+        sa.ForeignKeyConstraint(['version_id'], ['ad_versions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('band', 'bucket', 'version_id'),
+    )
+    op.create_index('ix_creative_lsh_buckets_version_id', 'creative_lsh_buckets', ['version_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_creative_lsh_buckets_version_id', table_name='creative_lsh_buckets')
+    op.drop_table('creative_lsh_buckets')
+    with op.batch_alter_table('ad_versions') as batch_op:
+        batch_op.drop_column('minhash')
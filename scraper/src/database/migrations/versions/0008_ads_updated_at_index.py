@@ -0,0 +1,25 @@
+"""index ads.updated_at for incremental exports
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # export_parquet.py --incremental selects ads updated after its watermark
+    op.create_index('ix_ads_updated_at', 'ads', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ads_updated_at', table_name='ads')
@@ -0,0 +1,50 @@
+"""add full-text search indexes
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Generated column: PostgreSQL computes it for existing rows and keeps it in sync
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("""
+            ALTER TABLE ad_versions ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('simple', coalesce(ad_copy, '')), 'B')
+                || setweight(to_tsvector('simple', coalesce(link_description, '')), 'C')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX ix_ad_versions_search_vector ON ad_versions USING gin (search_vector)")
+        op.execute("CREATE INDEX ix_ads_page_name_trgm ON ads USING gin (page_name gin_trgm_ops)")
+    elif dialect == 'sqlite':
+        # External-content FTS5 index, filled from the existing versions; the importer maintains it
+        op.execute("""
+            CREATE VIRTUAL TABLE ad_versions_fts USING fts5(
+                title, ad_copy, link_description,
+                content='ad_versions', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("INSERT INTO ad_versions_fts (ad_versions_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX ix_ads_page_name_trgm")
+        op.execute("DROP INDEX ix_ad_versions_search_vector")
+        op.execute("ALTER TABLE ad_versions DROP COLUMN search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE ad_versions_fts")
@@ -0,0 +1,42 @@
+"""composite indexes for keyset pagination and platform filters
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Each composite index starts with the column of the single-column index it replaces
+    op.create_index('ix_ads_status_start_date_id', 'ads', ['status', 'start_date', 'id'])
+    op.create_index('ix_ads_start_date_id', 'ads', ['start_date', 'id'])
+    op.drop_index('ix_ads_status', table_name='ads')
+    op.drop_index('ix_ads_start_date', table_name='ads')
+
+    op.create_index('ix_ad_versions_ad_id_version_number', 'ad_versions', ['ad_id', 'version_number'])
+    op.drop_index('ix_ad_versions_ad_id', table_name='ad_versions')
+
+    op.create_index('ix_ad_platforms_platform_ad_id', 'ad_platforms', ['platform', 'ad_id'])
+    op.drop_index('ix_ad_platforms_platform', table_name='ad_platforms')
+
+
+def downgrade() -> None:
+    op.create_index('ix_ad_platforms_platform', 'ad_platforms', ['platform'])
+    op.drop_index('ix_ad_platforms_platform_ad_id', table_name='ad_platforms')
+
+    op.create_index('ix_ad_versions_ad_id', 'ad_versions', ['ad_id'])
+    op.drop_index('ix_ad_versions_ad_id_version_number', table_name='ad_versions')
+
+    op.create_index('ix_ads_start_date', 'ads', ['start_date'])
+    op.create_index('ix_ads_status', 'ads', ['status'])
+    op.drop_index('ix_ads_start_date_id', table_name='ads')
+    op.drop_index('ix_ads_status_start_date_id', table_name='ads')
@@ -1,11 +1,15 @@
 """SQLAlchemy models for ads database"""
-from sqlalchemy import Column, String, Integer, Date, DateTime, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, Date, DateTime, Text, LargeBinary, ForeignKey, Index, JSON, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-import uuid
 from .connection import Base
+from .ids import new_id
 import enum
 
+# `platform` value of the ad_daily_stats rows that count every ad once,
+# regardless of how many platforms it runs on
+ALL_PLATFORMS = "*"
+
 
 class AdStatus(enum.Enum):
     ACTIVE = "ACTIVE"
@@ -17,19 +21,35 @@ class AssetType(enum.Enum):
     VIDEO = "video"
 
 
+class AdEventType(enum.Enum):
+    AD_STARTED = "ad_started"
+    AD_STOPPED = "ad_stopped"
+    VERSION_ADDED = "version_added"
+    VERSION_CHANGED = "version_changed"
+    VERSION_REMOVED = "version_removed"
+    PLATFORM_ADDED = "platform_added"
+    PLATFORM_REMOVED = "platform_removed"
+
+
 class Ad(Base):
     """Main ads table"""
     __tablename__ = "ads"
+    __table_args__ = (
+        # Keyset pagination by start date (pagination.py), with and without a status filter
+        Index("ix_ads_status_start_date_id", "status", "start_date", "id"),
+        Index("ix_ads_start_date_id", "start_date", "id"),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(String(36), primary_key=True, default=new_id)
     ad_id = Column(String(100), unique=True, nullable=False, index=True)  # Facebook Library ID
-    status = Column(SQLEnum(AdStatus), nullable=False, index=True)
-    start_date = Column(Date, nullable=False, index=True)
+    status = Column(SQLEnum(AdStatus), nullable=False)
+    start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=True, index=True)
     page_name = Column(String(255), nullable=False)
     page_profile_uri = Column(String(500), nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 of status, dates, platforms and versions
     created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)  # Export watermark
 
     # Relationships
     versions = relationship("AdVersion", back_populates="ad", cascade="all, delete-orphan")
@@ -42,9 +62,12 @@ class Ad(Base):
 class AdVersion(Base):
     """Ad versions/variations table"""
     __tablename__ = "ad_versions"
+    __table_args__ = (
+        Index("ix_ad_versions_ad_id_version_number", "ad_id", "version_number"),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    ad_id = Column(String(36), ForeignKey("ads.id"), nullable=False, index=True)
+    id = Column(String(36), primary_key=True, default=new_id)
+    ad_id = Column(String(36), ForeignKey("ads.id"), nullable=False)
     version_number = Column(Integer, nullable=False)
     ad_copy = Column(Text, nullable=True)
     title = Column(String(500), nullable=True)
@@ -56,6 +79,13 @@ class AdVersion(Base):
     cta_text = Column(String(100), nullable=True)
     cta_type = Column(String(50), nullable=True)
     caption = Column(String(255), nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 of the version's content fields
+    # Local copies in the content-addressed media store (media_downloader.py); paths are relative to MEDIA_DIR
+    media_sha256 = Column(String(64), nullable=True, index=True)  # sha256 of the downloaded image
+    media_path = Column(String(255), nullable=True)
+    video_sha256 = Column(String(64), nullable=True)
+    video_path = Column(String(255), nullable=True)
+    minhash = Column(LargeBinary, nullable=True)  # Near-duplicate signature of copy, title and link (creative_index.py)
     created_at = Column(DateTime, default=func.now())
 
     # Relationship
@@ -68,10 +98,14 @@ class AdVersion(Base):
 class AdPlatform(Base):
     """Junction table for ad platforms (many-to-many)"""
     __tablename__ = "ad_platforms"
+    __table_args__ = (
+        # Platform filter: ads on a platform, and "is this ad on the platform" probes
+        Index("ix_ad_platforms_platform_ad_id", "platform", "ad_id"),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(String(36), primary_key=True, default=new_id)
     ad_id = Column(String(36), ForeignKey("ads.id"), nullable=False, index=True)
-    platform = Column(String(50), nullable=False, index=True)
+    platform = Column(String(50), nullable=False)
     created_at = Column(DateTime, default=func.now())
 
     # Relationship
@@ -79,3 +113,90 @@ class AdPlatform(Base):
 
     def __repr__(self):
         return f"<AdPlatform(ad_id='{self.ad_id}', platform='{self.platform}')>"
+
+
+class CreativeBucket(Base):
+    """LSH bucket of one band of a version's MinHash signature (see creative_index.py)"""
+    __tablename__ = "creative_lsh_buckets"
+
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)  # Signed 64-bit hash of the band's signature values
+    version_id = Column(String(36), ForeignKey("ad_versions.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    def __repr__(self):
+        return f"<CreativeBucket(band={self.band}, bucket={self.bucket}, version_id='{self.version_id}')>"
+
+
+class AdDailyStat(Base):
+    """Rollup: ads per start date, status and platform (maintained by the importer)"""
+    __tablename__ = "ad_daily_stats"
+
+    start_date = Column(Date, primary_key=True)
+    status = Column(SQLEnum(AdStatus), primary_key=True)
+    platform = Column(String(50), primary_key=True)  # ALL_PLATFORMS for the all-platform totals
+    ad_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AdDailyStat(start_date='{self.start_date}', status='{self.status.value}', platform='{self.platform}', ad_count={self.ad_count})>"
+
+
+class AdPageStat(Base):
+    """Rollup: ads per page and status (maintained by the importer)"""
+    __tablename__ = "ad_page_stats"
+
+    page_name = Column(String(255), primary_key=True)
+    status = Column(SQLEnum(AdStatus), primary_key=True)
+    ad_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AdPageStat(page_name='{self.page_name}', status='{self.status.value}', ad_count={self.ad_count})>"
+
+
+class AdEvent(Base):
+    """Append-only log of ad lifecycle changes, written by the importer (see events.py)"""
+    # On PostgreSQL it can be range-partitioned by occurred_at month (partitions.py)
+    __tablename__ = "ad_events"
+    __table_args__ = (
+        Index("ix_ad_events_type_occurred_at", "event_type", "occurred_at"),
+        Index("ix_ad_events_ad_pk_id", "ad_pk", "id"),
+    )
+
+    # Increasing, so consumers can read everything after the last id they processed
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    ad_pk = Column(String(36), nullable=False)  # ads.id; no foreign key, events outlive deleted ads
+    ad_id = Column(String(100), nullable=False)  # Facebook Library ID
+    # Stored as VARCHAR values, so new event types need no enum migration
+    event_type = Column(SQLEnum(AdEventType, native_enum=False, length=20,
+                                values_callable=lambda types: [t.value for t in types]), nullable=False)
+    version_number = Column(Integer, nullable=True)  # version_* events
+    platform = Column(String(50), nullable=True)  # platform_* events
+    details = Column(JSON, nullable=True)  # Small event-specific payload (dates, content hashes)
+    occurred_at = Column(DateTime, nullable=False, default=func.now())  # Import time
+
+    def __repr__(self):
+        return f"<AdEvent(id={self.id}, ad_id='{self.ad_id}', event_type='{self.event_type.value}')>"
+
+
+class ScrapeJob(Base):
+    """Recurring scrape-and-import job of one advertiser (run by scheduler.py)"""
+    __tablename__ = "scrape_jobs"
+
+    id = Column(String(36), primary_key=True, default=new_id)
+    target = Column(String(500), unique=True, nullable=False)  # Advertiser page ID or Ads Library URL
+    interval_minutes = Column(Integer, nullable=False, default=1440)
+    priority = Column(Integer, nullable=False, default=0)  # Higher runs first when several jobs are due
+    max_ads = Column(Integer, nullable=True)  # None: scrape until the results run out
+    enabled = Column(Boolean, nullable=False, default=True)
+    next_run_at = Column(DateTime, nullable=True, index=True)  # UTC; None runs on the next poll
+    running_since = Column(DateTime, nullable=True)  # Set while a run holds the job
+    last_started_at = Column(DateTime, nullable=True)
+    last_finished_at = Column(DateTime, nullable=True)
+    last_status = Column(String(20), nullable=True)  # ok, failed or skipped
+    last_error = Column(Text, nullable=True)
+    last_ads = Column(Integer, nullable=True)
+    consecutive_failures = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ScrapeJob(target='{self.target}', interval_minutes={self.interval_minutes}, priority={self.priority})>"
@@ -0,0 +1,130 @@
+"""
+Keyset pagination over ads
+
+LIMIT/OFFSET reads and discards every row before the requested page, so
+page n costs O(n * limit). A keyset page instead continues after the last
+row of the previous page: WHERE (start_date, id) < (:start_date, :id),
+which an index on (start_date, id) - or (status, start_date, id) with a
+status filter - answers by seeking to the cursor and reading limit rows.
+The platform filter probes (platform, ad_id) for each row read.
+
+id is the tiebreaker that makes the order total; with UUIDv7 ids (ids.py)
+ads starting on the same day come out newest first.
+
+Page through ads (from scraper/src):
+    py database/pagination.py --status ACTIVE --platform Instagram --limit 50
+    py database/pagination.py --after 2026-03-01 01912a4c-3f2b-7d8e-9e54-73673aab06ca
+"""
+import argparse
+import os
+import sys
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import exists, literal, select, tuple_
+
+# Add parent directory to path for imports when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database.connection import init_db, engine
+    from database.models import Ad, AdPlatform, AdStatus
+else:
+    from .connection import init_db, engine
+    from .models import Ad, AdPlatform, AdStatus
+
+DEFAULT_LIMIT = 50
+
+# (start_date, id) of the last ad of a page
+AdCursor = Tuple[date, str]
+
+
+def after_keys(keys: Sequence[Any], values: Sequence[Any], descending: bool = True):
+    """Row value condition (keys...) < (values...) (> when ascending), typed like the key columns"""
+    bound = tuple_(*(literal(value, type_=key.type) for key, value in zip(keys, values)))
+    return tuple_(*keys) < bound if descending else tuple_(*keys) > bound
+
+
+def keyset_page(conn, query, keys: Sequence[Any], limit: int, after: Optional[Sequence[Any]] = None,
+                descending: bool = True) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, ...]]]:
+    """
+    One page of a select ordered by keys, the last of which must be unique
+
+    Args:
+        conn: Connection to read with
+        query: select() returning at least the key columns
+        keys: Sort columns, most significant first
+        limit: Rows per page
+        after: Cursor returned with the previous page
+        descending: Newest (largest keys) first
+
+    Returns:
+        (rows, cursor): row dicts, and the cursor of the next page or None on the last page
+    """
+    if after is not None:
+        query = query.where(after_keys(keys, after, descending))
+    query = query.order_by(*(key.desc() if descending else key.asc() for key in keys)).limit(limit)
+    rows = [dict(row) for row in conn.execute(query).mappings()]
+    cursor = tuple(rows[-1][key.name] for key in keys) if len(rows) == limit else None
+    return rows, cursor
+
+
+def page_ads(conn, limit: int = DEFAULT_LIMIT, after: Optional[AdCursor] = None, status: Optional[str] = None,
+             platform: Optional[str] = None, start_date_from: Optional[date] = None,
+             start_date_to: Optional[date] = None) -> Tuple[List[Dict[str, Any]], Optional[AdCursor]]:
+    """
+    Ads by start date, latest first, one keyset page at a time
+
+    Args:
+        conn: Connection to read with
+        limit: Ads per page
+        after: Cursor returned with the previous page
+        status: Only ads with this status (ACTIVE / INACTIVE)
+        platform: Only ads running on this platform
+        start_date_from / start_date_to: Only ads starting in [from, to]
+
+    Returns:
+        (ads, cursor): ad dicts with the status as its string value; the cursor of the next
+        page, or None on the last page
+    """
+    table = Ad.__table__
+    query = select(table.c.id, table.c.ad_id, table.c.status, table.c.start_date, table.c.end_date,
+                   table.c.page_name, table.c.page_profile_uri, table.c.updated_at)
+    if status:
+        query = query.where(table.c.status == AdStatus(status.upper()))
+    if platform:
+        platforms = AdPlatform.__table__
+        query = query.where(exists().where(platforms.c.platform == platform, platforms.c.ad_id == table.c.id))
+    if start_date_from:
+        query = query.where(table.c.start_date >= start_date_from)
+    if start_date_to:
+        query = query.where(table.c.start_date <= start_date_to)
+
+    rows, cursor = keyset_page(conn, query, [table.c.start_date, table.c.id], limit, after)
+    return [dict(row, status=row["status"].value) for row in rows], cursor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page through ads by start date (keyset pagination)")
+    parser.add_argument("--status", choices=[s.value for s in AdStatus])
+    parser.add_argument("--platform")
+    parser.add_argument("--from", dest="start_date_from", type=date.fromisoformat, help="Starting on or after")
+    parser.add_argument("--to", dest="start_date_to", type=date.fromisoformat, help="Starting on or before")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--pages", type=int, default=1, help="Pages to fetch")
+    parser.add_argument("--after", nargs=2, metavar=("START_DATE", "ID"), help="Cursor of the previous page")
+    args = parser.parse_args()
+
+    cursor = (date.fromisoformat(args.after[0]), args.after[1]) if args.after else None
+    init_db()
+    with engine.connect() as conn:
+        for _ in range(args.pages):
+            ads, cursor = page_ads(conn, args.limit, cursor, args.status, args.platform,
+                                   args.start_date_from, args.start_date_to)
+            for ad in ads:
+                print(f"{ad['start_date']}  {ad['status']:<8} {ad['ad_id']:<20} {ad['page_name']}")
+            if cursor is None:
+                break
+    print(f"\nNext page: --after {cursor[0]} {cursor[1]}" if cursor else "\nNo more ads")
+
+
+if __name__ == "__main__":
+    main()
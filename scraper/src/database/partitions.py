@@ -0,0 +1,222 @@
+"""
+Monthly range partitions of ad_events (PostgreSQL, optional)
+
+ad_events is append-only and read by id or time range (events.py), so it
+partitions cleanly by occurred_at month: reads with a time range only touch
+their months, and old months are dropped as whole tables instead of with a
+DELETE that bloats the table.
+
+ads and ad_versions stay unpartitioned. PostgreSQL requires the primary key
+and every unique constraint of a partitioned table to include the
+partition key, so a table partitioned by start_date could no longer
+guarantee that ads.id or the Library ID (ad_id) is unique on its own, and
+the foreign keys of ad_versions, ad_platforms and creative_lsh_buckets need
+exactly that. start_date also changes when an ad is re-imported, which
+would move rows between partitions, and ad_versions has no date of its own.
+Their time-ordered access goes through the composite (status, start_date,
+id) indexes and keyset pagination instead (pagination.py).
+
+Converting is a one-off that rewrites the table in one transaction (it
+holds an exclusive lock for the copy). Afterwards create the coming months
+ahead of time, e.g. from a daily cron job; rows outside every month land in
+ad_events_default, so inserts never fail, and are moved out when their
+month is created.
+
+Usage (from scraper/src):
+    py database/partitions.py --convert
+    py database/partitions.py --ensure --months-ahead 3
+    py database/partitions.py --drop-before 2025-01
+    py database/partitions.py                      # list partitions
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+
+# Add parent directory to path for imports when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database.connection import engine
+else:
+    from .connection import engine
+
+TABLE = "ad_events"
+DEFAULT_PARTITION = f"{TABLE}_default"
+DEFAULT_MONTHS_AHEAD = 3
+INDEXES = (
+    ("ix_ad_events_type_occurred_at", "event_type, occurred_at"),
+    ("ix_ad_events_ad_pk_id", "ad_pk, id"),
+)
+_MONTH_PARTITION = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+
+
+def _require_postgresql(conn) -> None:
+    if conn.dialect.name != "postgresql":
+        raise ValueError(f"Partitioning needs PostgreSQL (connected to {conn.dialect.name})")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned(conn) -> bool:
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {"table": TABLE}).scalar())
+
+
+def list_partitions(conn) -> List[Dict[str, Any]]:
+    """Partitions of ad_events with their bounds and estimated row counts"""
+    rows = conn.execute(text("""
+        SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound,
+               greatest(c.reltuples, 0)::bigint AS rows  -- -1 until the partition is analyzed
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+        ORDER BY c.relname
+    """), {"table": TABLE}).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def create_month(conn, month: date) -> None:
+    """Create the partition of one month, moving its rows out of the default partition first"""
+    start, end = month_start(month), add_months(month_start(month), 1)
+    bounds = {"start": start, "end": end}
+    # PostgreSQL refuses to attach a range the default partition already holds rows of
+    moving = conn.execute(text(
+        f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE occurred_at >= :start AND occurred_at < :end"
+    ), bounds).scalar()
+    if moving:
+        conn.execute(text(f"CREATE TEMP TABLE {TABLE}_moving (LIKE {TABLE})"))
+        conn.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE occurred_at >= :start AND occurred_at < :end RETURNING *
+            )
+            INSERT INTO {TABLE}_moving SELECT * FROM moved
+        """), bounds)
+    # DDL takes no bind parameters; the bounds are dates formatted here
+    conn.execute(text(
+        f"CREATE TABLE {partition_name(start)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if moving:
+        conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_moving"))
+        conn.execute(text(f"DROP TABLE {TABLE}_moving"))
+        print(f"[PARTITION] moved {moving} events from {DEFAULT_PARTITION} to {partition_name(start)}")
+
+
+def ensure_partitions(conn, months_ahead: int = DEFAULT_MONTHS_AHEAD, since: Optional[date] = None) -> List[str]:
+    """
+    Create the missing month partitions from since (default: this month) to months_ahead months ahead
+
+    Returns:
+        Names of the partitions created
+    """
+    _require_postgresql(conn)
+    if not is_partitioned(conn):
+        raise ValueError(f"{TABLE} is not partitioned yet (run with --convert)")
+    existing = {partition["name"] for partition in list_partitions(conn)}
+    month = month_start(since or date.today())
+    last = add_months(month_start(date.today()), months_ahead)
+    created = []
+    while month <= last:
+        if partition_name(month) not in existing:
+            create_month(conn, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def convert(conn, months_ahead: int = DEFAULT_MONTHS_AHEAD) -> bool:
+    """
+    Turn ad_events into a table partitioned by occurred_at month, keeping its rows, ids and sequence
+
+    The primary key becomes (id, occurred_at), as PostgreSQL requires; ids still come from
+    the same sequence, so consumers reading by id are unaffected.
+
+    Returns:
+        False if the table was already partitioned
+    """
+    _require_postgresql(conn)
+    if is_partitioned(conn):
+        return False
+
+    old = f"{TABLE}_unpartitioned"
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": TABLE}).scalar()
+    conn.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {old}"))
+    # Constraint and index names are unique per schema; free them for the new table
+    conn.execute(text(f"ALTER TABLE {old} RENAME CONSTRAINT {TABLE}_pkey TO {old}_pkey"))
+    for name, _ in INDEXES:
+        conn.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_unpartitioned"))
+
+    conn.execute(text(f"""
+        CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS, PRIMARY KEY (id, occurred_at))
+        PARTITION BY RANGE (occurred_at)
+    """))
+    for name, columns in INDEXES:
+        conn.execute(text(f"CREATE INDEX {name} ON {TABLE} ({columns})"))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+    first: Optional[datetime] = conn.execute(text(f"SELECT min(occurred_at) FROM {old}")).scalar()
+    created = ensure_partitions(conn, months_ahead, since=first.date() if first else None)
+    moved = conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {old}")).rowcount
+    if sequence:
+        # The sequence belongs to the old table's column and would be dropped with it
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+    conn.execute(text(f"DROP TABLE {old}"))
+    print(f"[PARTITION] converted {TABLE}: {moved} events in {len(created)} monthly partitions")
+    return True
+
+
+def drop_before(conn, month: date) -> List[str]:
+    """Drop the month partitions (and their events) older than month; returns their names"""
+    _require_postgresql(conn)
+    dropped = []
+    for partition in list_partitions(conn):
+        match = _MONTH_PARTITION.match(partition["name"])
+        if match and date(int(match.group(1)), int(match.group(2)), 1) < month_start(month):
+            conn.execute(text(f"DROP TABLE {partition['name']}"))
+            dropped.append(partition["name"])
+    return dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of ad_events (PostgreSQL)")
+    parser.add_argument("--convert", action="store_true", help="Partition ad_events (one-off)")
+    parser.add_argument("--ensure", action="store_true", help="Create the partitions of the coming months")
+    parser.add_argument("--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD)
+    parser.add_argument("--drop-before", type=lambda value: date.fromisoformat(value + "-01"), metavar="YYYY-MM",
+                        help="Drop the partitions (and events) of the months before this one")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        _require_postgresql(conn)
+        if args.convert and not convert(conn, args.months_ahead):
+            print(f"{TABLE} is already partitioned")
+        if args.ensure:
+            created = ensure_partitions(conn, args.months_ahead)
+            print(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+        if args.drop_before:
+            dropped = drop_before(conn, args.drop_before)
+            print(f"Dropped {len(dropped)} partitions" + (f": {', '.join(dropped)}" if dropped else ""))
+        if is_partitioned(conn):
+            for partition in list_partitions(conn):
+                print(f"{partition['name']:<28} {partition['rows']:>10}  {partition['bound']}")
+        else:
+            print(f"{TABLE} is not partitioned")
+
+
+if __name__ == "__main__":
+    main()
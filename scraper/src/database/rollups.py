@@ -0,0 +1,210 @@
+"""
+Pre-aggregated statistics maintained alongside the ads tables
+
+ad_daily_stats counts ads per start date, status and platform (plus an
+ALL_PLATFORMS row counting every ad once); ad_page_stats counts ads per
+page and status. The importer keeps them up to date incrementally, in the
+same transaction as the ads it writes: the old contribution of every
+rewritten ad is subtracted and the new one added.
+
+Rebuild them from the ads tables (e.g. after a backfill or a manual edit):
+    py database/rollups.py
+    py database/rollups.py --verify
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+from sqlalchemy import select, delete, update, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Add parent directory to path for imports when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database.connection import init_db, engine, values_chunks
+    from database.models import Ad, AdPlatform, AdDailyStat, AdPageStat, ALL_PLATFORMS
+else:
+    from .connection import init_db, engine, values_chunks
+    from .models import Ad, AdPlatform, AdDailyStat, AdPageStat, ALL_PLATFORMS
+
+
+# (status, start_date, page_name, platforms) of one ad
+AdState = Tuple[Any, Any, str, frozenset]
+
+
+def ad_state(ad_row: Dict[str, Any], platform_rows: List[Dict[str, Any]]) -> AdState:
+    """The rollup-relevant state of an ad about to be written"""
+    return (ad_row["status"], ad_row["start_date"], ad_row["page_name"],
+            frozenset(row["platform"] for row in platform_rows))
+
+
+def load_ad_states(conn, ad_pks: List[str]) -> Dict[str, AdState]:
+    """Current rollup-relevant state of existing ads (read before they are rewritten)"""
+    if not ad_pks:
+        return {}
+    ads = Ad.__table__
+    platforms = AdPlatform.__table__
+
+    platforms_by_ad: Dict[str, set] = {}
+    for row in conn.execute(select(platforms.c.ad_id, platforms.c.platform).where(platforms.c.ad_id.in_(ad_pks))):
+        platforms_by_ad.setdefault(row.ad_id, set()).add(row.platform)
+
+    rows = conn.execute(
+        select(ads.c.id, ads.c.status, ads.c.start_date, ads.c.page_name).where(ads.c.id.in_(ad_pks))
+    )
+    return {
+        row.id: (row.status, row.start_date, row.page_name, frozenset(platforms_by_ad.get(row.id, ())))
+        for row in rows
+    }
+
+
+def _add_state(daily: Counter, pages: Counter, state: AdState, sign: int) -> None:
+    status, start_date, page_name, platforms = state
+    daily[(start_date, status, ALL_PLATFORMS)] += sign
+    for platform in platforms:
+        daily[(start_date, status, platform)] += sign
+    pages[(page_name, status)] += sign
+
+
+def compute_deltas(changes: Iterable[Tuple[Any, AdState]]) -> Tuple[Counter, Counter]:
+    """
+    Rollup deltas for a set of written ads
+
+    Args:
+        changes: (old state or None for new ads, new state) pairs
+
+    Returns:
+        (daily deltas keyed by (start_date, status, platform),
+         page deltas keyed by (page_name, status)), without zero entries
+    """
+    daily: Counter = Counter()
+    pages: Counter = Counter()
+    for old_state, new_state in changes:
+        if old_state == new_state:
+            continue
+        if old_state is not None:
+            _add_state(daily, pages, old_state, -1)
+        _add_state(daily, pages, new_state, 1)
+    return (Counter({key: n for key, n in daily.items() if n}),
+            Counter({key: n for key, n in pages.items() if n}))
+
+
+def _apply(conn, model, key_columns: Tuple[str, ...], deltas: Counter) -> None:
+    """Add deltas to ad_count, inserting missing rows and dropping rows that reach zero"""
+    if not deltas:
+        return
+
+    table = model.__table__
+    # Sorted so concurrent importers lock rows in the same order
+    rows = [dict(zip(key_columns, key), ad_count=n) for key, n in sorted(deltas.items(), key=str)]
+    dialect = conn.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        for chunk in values_chunks(conn, rows):
+            stmt = insert(table).values(chunk)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c[col] for col in key_columns],
+                set_={"ad_count": table.c.ad_count + stmt.excluded.ad_count},
+            ))
+    else:
+        # Generic fallback: UPDATE each key, INSERT the ones that did not exist
+        for row in rows:
+            condition = [table.c[col] == row[col] for col in key_columns]
+            result = conn.execute(update(table).where(*condition).values(ad_count=table.c.ad_count + row["ad_count"]))
+            if result.rowcount == 0:
+                conn.execute(table.insert(), [row])
+
+    if any(n < 0 for n in deltas.values()):
+        conn.execute(delete(table).where(table.c.ad_count <= 0))
+
+
+def apply_deltas(conn, daily: Counter, pages: Counter) -> None:
+    """Apply rollup deltas in the caller's transaction"""
+    _apply(conn, AdDailyStat, ("start_date", "status", "platform"), daily)
+    _apply(conn, AdPageStat, ("page_name", "status"), pages)
+
+
+def _daily_queries():
+    ads = Ad.__table__
+    platforms = AdPlatform.__table__
+    all_platforms = (
+        select(ads.c.start_date, ads.c.status, literal(ALL_PLATFORMS).label("platform"),
+               func.count().label("ad_count"))
+        .group_by(ads.c.start_date, ads.c.status)
+    )
+    per_platform = (
+        select(ads.c.start_date, ads.c.status, platforms.c.platform,
+               func.count(ads.c.id.distinct()).label("ad_count"))
+        .select_from(ads.join(platforms, platforms.c.ad_id == ads.c.id))
+        .group_by(ads.c.start_date, ads.c.status, platforms.c.platform)
+    )
+    return all_platforms, per_platform
+
+
+def _page_query():
+    ads = Ad.__table__
+    return (
+        select(ads.c.page_name, ads.c.status, func.count().label("ad_count"))
+        .group_by(ads.c.page_name, ads.c.status)
+    )
+
+
+def rebuild(conn) -> Dict[str, int]:
+    """Recompute both rollup tables from the ads tables (set-based, in the caller's transaction)"""
+    daily = AdDailyStat.__table__
+    pages = AdPageStat.__table__
+    columns = ["start_date", "status", "platform", "ad_count"]
+
+    conn.execute(delete(daily))
+    conn.execute(delete(pages))
+    for query in _daily_queries():
+        conn.execute(daily.insert().from_select(columns, query))
+    conn.execute(pages.insert().from_select(["page_name", "status", "ad_count"], _page_query()))
+
+    return {
+        "daily_rows": conn.execute(select(func.count()).select_from(daily)).scalar(),
+        "page_rows": conn.execute(select(func.count()).select_from(pages)).scalar(),
+    }
+
+
+def verify(conn) -> List[str]:
+    """Compare the rollup tables with a fresh aggregation; returns the mismatches"""
+    expected_daily = {}
+    for query in _daily_queries():
+        for row in conn.execute(query):
+            expected_daily[(row.start_date, row.status, row.platform)] = row.ad_count
+    expected_pages = {(row.page_name, row.status): row.ad_count for row in conn.execute(_page_query())}
+
+    daily = AdDailyStat.__table__
+    pages = AdPageStat.__table__
+    actual_daily = {(row.start_date, row.status, row.platform): row.ad_count for row in conn.execute(select(daily))}
+    actual_pages = {(row.page_name, row.status): row.ad_count for row in conn.execute(select(pages))}
+
+    mismatches = []
+    for name, expected, actual in (("ad_daily_stats", expected_daily, actual_daily),
+                                   ("ad_page_stats", expected_pages, actual_pages)):
+        for key in sorted(set(expected) | set(actual), key=str):
+            if expected.get(key, 0) != actual.get(key, 0):
+                mismatches.append(f"{name} {key}: expected {expected.get(key, 0)}, found {actual.get(key, 0)}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or verify the ad statistics rollup tables")
+    parser.add_argument("--verify", action="store_true", help="Only compare the rollups with the ads tables")
+    args = parser.parse_args()
+
+    init_db()
+    if args.verify:
+        with engine.connect() as conn:
+            mismatches = verify(conn)
+        for line in mismatches[:50]:
+            print(line)
+        print(f"{len(mismatches)} mismatching rollup rows" if mismatches else "Rollups are up to date")
+        sys.exit(1 if mismatches else 0)
+
+    with engine.begin() as conn:
+        counts = rebuild(conn)
+    print(f"Rebuilt rollups: {counts['daily_rows']} daily rows, {counts['page_rows']} page rows")
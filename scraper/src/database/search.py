@@ -0,0 +1,247 @@
+"""
+Full-text search over ad versions (ad_copy, title, link_description)
+
+PostgreSQL: ad_versions.search_vector is a generated tsvector column
+(title weighted A, copy B, link description C) with a GIN index, so it is
+always in sync; page names get a trigram index (pg_trgm), which also serves
+the dashboard's page_name ILIKE '%...%' filter.
+
+SQLite: ad_versions_fts is an FTS5 index over the same columns, with
+ad_versions as its external content (keyed by rowid). The importer adds
+the rows of the versions it inserts and removes those it deletes, in the
+same transaction. ad_versions has a text primary key, so its rowids are
+implicit and VACUUM may renumber them, which leaves the index pointing at
+the wrong versions: vacuum the database with --vacuum (VACUUM, then a
+rebuild of the index), or run --rebuild after any other VACUUM.
+
+Both are created by migration 0009 (and by init_db for new databases).
+Searches match every word of the query and return ads ranked by their
+best-matching version, paged with a keyset cursor (rank, ads.id) instead of
+OFFSET.
+
+Search (from scraper/src):
+    py database/search.py "summer sale"
+    py database/search.py "summer sale" --page-name shoes --limit 50
+    py database/search.py --rebuild
+    py database/search.py --vacuum      # SQLite: VACUUM and rebuild the index
+    py database/search.py --check       # SQLite: compare the index with ad_versions
+"""
+import argparse
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import exc, text
+
+# Add parent directory to path for imports when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database.connection import init_db, engine
+else:
+    from .connection import init_db, engine
+
+FTS_TABLE = "ad_versions_fts"
+TS_CONFIG = "simple"  # No stemming or stop words: ad copy comes in many languages
+DEFAULT_LIMIT = 20
+
+POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"""ALTER TABLE ad_versions ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('{TS_CONFIG}', coalesce(ad_copy, '')), 'B')
+        || setweight(to_tsvector('{TS_CONFIG}', coalesce(link_description, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_ad_versions_search_vector ON ad_versions USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_ads_page_name_trgm ON ads USING gin (page_name gin_trgm_ops)",
+)
+SQLITE_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, ad_copy, link_description,
+        content='ad_versions', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+    )""",
+)
+
+# Per-dialect best rank per matching ad (higher is better)
+_MATCHES_SQL = {
+    "postgresql": f"""
+        -- float8 like the cursor's rank parameter; a float4 rank never equals it, dropping ties
+        SELECT v.ad_id AS ad_pk, max(ts_rank_cd(v.search_vector, q.query))::float8 AS rank
+        FROM ad_versions v, plainto_tsquery('{TS_CONFIG}', :query) q(query)
+        WHERE v.search_vector @@ q.query
+        GROUP BY v.ad_id
+    """,
+    "sqlite": f"""
+        WITH hits AS MATERIALIZED (  -- bm25() is not allowed inside an aggregate
+            SELECT rowid, -bm25({FTS_TABLE}, 4.0, 2.0, 1.0) AS rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query
+        )
+        SELECT v.ad_id AS ad_pk, max(h.rank) AS rank
+        FROM hits h JOIN ad_versions v ON v.rowid = h.rowid
+        GROUP BY v.ad_id
+    """,
+}
+_SEARCH_SQL = """
+    WITH matches AS ({matches})
+    SELECT a.id, a.ad_id, a.page_name, m.rank
+    FROM matches m JOIN ads a ON a.id = m.ad_pk
+    WHERE {filters}
+    ORDER BY m.rank DESC, a.id DESC
+    LIMIT :limit
+"""
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def create_search_index(conn) -> None:
+    """Create the dialect's search structures if missing (no-op on other databases)"""
+    dialect = conn.dialect.name
+    created = dialect == "sqlite" and conn.execute(
+        text("SELECT count(*) FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+    ).scalar() == 0
+    for statement in {"postgresql": POSTGRES_DDL, "sqlite": SQLITE_DDL}.get(dialect, ()):
+        conn.execute(text(statement))
+    if created:
+        # Index the versions already stored (PostgreSQL fills the generated column itself)
+        conn.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def _fts_rows(conn, command: str, version_ids: List[str]) -> None:
+    # External-content FTS5 tables are updated with the indexed values, including for deletes
+    if conn.dialect.name != "sqlite" or not version_ids:
+        return
+    columns = f"{FTS_TABLE}, " if command else ""
+    values = "'delete', " if command else ""
+    for start in range(0, len(version_ids), 500):
+        chunk = version_ids[start:start + 500]
+        params = {f"id{i}": version_id for i, version_id in enumerate(chunk)}
+        conn.execute(text(
+            f"INSERT INTO {FTS_TABLE} ({columns}rowid, title, ad_copy, link_description) "
+            f"SELECT {values}rowid, title, ad_copy, link_description FROM ad_versions "
+            f"WHERE id IN ({', '.join(':' + name for name in params)})"
+        ), params)
+
+
+def index_versions(conn, version_ids: List[str]) -> None:
+    """Add newly inserted versions to the SQLite index (PostgreSQL's column is generated)"""
+    _fts_rows(conn, "", version_ids)
+
+
+def remove_versions(conn, version_ids: List[str]) -> None:
+    """Drop versions that are about to be deleted from the SQLite index"""
+    _fts_rows(conn, "delete", version_ids)
+
+
+def rebuild(conn) -> None:
+    """Rebuild the SQLite index from ad_versions (PostgreSQL needs nothing)"""
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def vacuum() -> None:
+    """VACUUM a SQLite database and rebuild the index, whose rowids VACUUM may have renumbered"""
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.dialect.name != "sqlite":
+            raise ValueError(f"--vacuum is for SQLite databases (connected to {conn.dialect.name})")
+        conn.execute(text("VACUUM"))
+    with engine.begin() as conn:
+        rebuild(conn)
+
+
+def check(conn) -> bool:
+    """Whether the SQLite index matches ad_versions (always True on PostgreSQL)"""
+    if conn.dialect.name != "sqlite":
+        return True
+    try:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('integrity-check', 1)"))
+    except exc.DatabaseError:
+        return False
+    return True
+
+
+def fts5_query(query: str) -> str:
+    """Every word of the query as a quoted FTS5 term (all must match), like plainto_tsquery"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in _WORD.findall(query))
+
+
+def search_ads(conn, query: str, limit: int = DEFAULT_LIMIT, after: Optional[Tuple[float, str]] = None,
+               page_name: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[float, str]]]:
+    """
+    Ads whose versions match every word of a query, best match first
+
+    Args:
+        conn: Connection to read with
+        query: Search words (matched against title, ad_copy and link_description)
+        limit: Ads per page
+        after: Cursor returned with the previous page
+        page_name: Only ads whose page name contains this (case-insensitive)
+
+    Returns:
+        (ads, cursor): dicts with id, ad_id (Library ID), page_name and rank; the cursor of the
+        next page, or None on the last page
+    """
+    dialect = conn.dialect.name
+    if dialect not in _MATCHES_SQL:
+        raise ValueError(f"Full-text search is not supported on {dialect}")
+    search_query = fts5_query(query) if dialect == "sqlite" else query
+    if not search_query.strip():
+        return [], None
+
+    filters = ["1 = 1"]
+    params: Dict[str, Any] = {"query": search_query, "limit": limit}
+    if after is not None:
+        filters.append("(m.rank < :after_rank OR (m.rank = :after_rank AND a.id < :after_id))")
+        params.update(after_rank=after[0], after_id=after[1])
+    if page_name:
+        # ILIKE uses the trigram index; SQLite's LIKE is case-insensitive already
+        filters.append("a.page_name LIKE :page_name ESCAPE '\\'" if dialect == "sqlite" else "a.page_name ILIKE :page_name")
+        escaped = page_name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params["page_name"] = f"%{escaped}%"
+
+    sql = _SEARCH_SQL.format(matches=_MATCHES_SQL[dialect], filters=" AND ".join(filters))
+    rows = conn.execute(text(sql), params).all()
+    ads = [{"id": row.id, "ad_id": row.ad_id, "page_name": row.page_name, "rank": float(row.rank)} for row in rows]
+    cursor = (ads[-1]["rank"], ads[-1]["id"]) if len(ads) == limit else None
+    return ads, cursor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over ad copy")
+    parser.add_argument("query", nargs="?", help="Search words")
+    parser.add_argument("--page-name", help="Only pages whose name contains this")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--pages", type=int, default=1, help="Result pages to fetch")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the SQLite index")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM a SQLite database and rebuild the index")
+    parser.add_argument("--check", action="store_true", help="Check the SQLite index against ad_versions")
+    args = parser.parse_args()
+
+    init_db()
+    if args.vacuum:
+        vacuum()
+        print("Database vacuumed, search index rebuilt")
+        return
+    if args.rebuild:
+        with engine.begin() as conn:
+            rebuild(conn)
+        print("Search index rebuilt")
+        return
+    if args.check:
+        with engine.begin() as conn:
+            ok = check(conn)
+        print("Search index is in sync" if ok else "Search index is out of sync; run --rebuild")
+        sys.exit(0 if ok else 1)
+    if not args.query:
+        parser.error("a query is required")
+
+    cursor = None
+    with engine.connect() as conn:
+        for page in range(1, args.pages + 1):
+            ads, cursor = search_ads(conn, args.query, args.limit, cursor, args.page_name)
+            for ad in ads:
+                print(f"{ad['rank']:>8.3f}  {ad['ad_id']:<20} {ad['page_name']}")
+            if cursor is None:
+                break
+    print(f"Next page after: rank={cursor[0]} id={cursor[1]}" if cursor else "No more results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Local stand-ins for Facebook Ads Library used for offline runs"""
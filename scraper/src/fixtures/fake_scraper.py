@@ -0,0 +1,61 @@
+"""
+Fake scraper backend for exercising scheduler.py without a browser
+
+Each scrape sleeps for a while, optionally fails, and writes synthetic ads
+(fixtures/synthetic.py, ad IDs unique per target) to scraped_ads.json in the
+job's output directory, like the real backends do. Records every call, so
+overlap and rate limiting can be checked afterwards.
+
+Try the scheduler with it:
+    py scheduler.py add 111 --interval 1
+    py scheduler.py run --backend fake --once
+"""
+import os
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from fixtures.synthetic import generate_responses
+from graphql_parser import iter_collated_results, parse_graphql_responses
+from scrape_graphql import build_target_url, save_scraped_ads
+
+
+class FakeScraperBackend:
+    """Scraper backend producing synthetic ads after a random delay"""
+
+    name = "fake"
+
+    def __init__(self, delay: float = 0.5, failure_rate: float = 0.0, pages: int = 2, seed: Optional[int] = None):
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.pages = pages
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: List[Dict[str, Any]] = []
+
+    def scrape(self, target: str, output_dir: str, max_ads: Optional[int] = None) -> str:
+        """Write scraped_ads.json for a target into output_dir; returns its path"""
+        with self._lock:
+            delay = self.delay * self._rng.uniform(0.5, 1.5)
+            fail = self._rng.random() < self.failure_rate
+            call = {"target": target, "started": time.monotonic(), "finished": None, "failed": fail}
+            self.calls.append(call)
+
+        time.sleep(delay)
+        call["finished"] = time.monotonic()
+        if fail:
+            raise RuntimeError(f"fake scrape of {target} failed")
+
+        # Ads are the same on every run of a target and prefixed with its ID, so targets never share ads
+        page_id = str(zlib.crc32(build_target_url(target).encode("utf-8")))
+        responses = list(generate_responses(pages=self.pages, edges=10, duplicate_rate=0.05,
+                                            malformed_rate=0.0, seed=int(page_id), page_id=page_id))
+        for response_obj in responses:
+            for result in iter_collated_results(response_obj):
+                result["ad_archive_id"] = f"{page_id}{result['ad_archive_id']}"
+        ads = parse_graphql_responses(responses, max_ads=max_ads if max_ads else 10 ** 9)
+        output_file = os.path.join(output_dir, "scraped_ads.json")
+        save_scraped_ads(ads, output_file)
+        return output_file
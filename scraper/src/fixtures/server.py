@@ -0,0 +1,323 @@
+"""
+Local HTTP server that imitates the Ads Library page and its GraphQL endpoint
+
+The page renders ads from canned GraphQL responses and requests the next
+page (by cursor) when scrolled to the bottom, like the real infinite scroll.
+With assets=True the page also loads what the real one does besides the
+GraphQL XHRs: a stylesheet with a web font, an image per ad, a video every
+few ads and a tracking script from a third-party host ("localhost" while the
+page is served from 127.0.0.1). Bytes served are counted per kind. Media
+files are also served without assets=True, for the media downloader.
+Run it standalone with: py -m fixtures.server [--assets]
+"""
+import copy
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from graphql_parser import get_search_results, iter_graphql_responses
+
+DEFAULT_CAPTURE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "graphql_responses.json")
+
+DEFAULT_PAGE_ID = "15087023444"
+
+# Session token embedded in the page and required on GraphQL requests,
+# standing in for Facebook's lsd/fb_dtsg form fields
+FIXTURE_LSD = "fixture-lsd-token"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>Ad Library (fixture)</title>__HEAD__</head>
+<body>
+<div id="ads"></div>
+<div id="status">loading</div>
+<script>
+const PAGE_ID = __PAGE_ID__;
+const LSD = __LSD__;
+const ASSETS = __ASSETS__;
+let rendered = 0;
+let cursor = null;
+let loading = false;
+let done = false;
+
+async function loadMore() {
+  if (loading || done) return;
+  loading = true;
+  const body = new URLSearchParams({
+    doc_id: "fixture",
+    lsd: LSD,
+    variables: JSON.stringify({ cursor: cursor, viewAllPageID: PAGE_ID }),
+  });
+  const resp = await fetch("/api/graphql/", { method: "POST", body: body });
+  const payload = await resp.json();
+  const connection = payload.data.ad_library_main.search_results_connection;
+  const container = document.getElementById("ads");
+  for (const edge of connection.edges) {
+    for (const result of edge.node.collated_results) {
+      const div = document.createElement("div");
+      div.style.height = "400px";
+      div.textContent = "Library ID: " + result.ad_archive_id;
+      if (ASSETS) {
+        const img = document.createElement("img");
+        img.src = "/media/" + result.ad_archive_id + ".jpg";
+        div.appendChild(img);
+        if (rendered % 5 === 0) {
+          const video = document.createElement("video");
+          video.src = "/media/" + result.ad_archive_id + ".mp4";
+          video.preload = "auto";
+          div.appendChild(video);
+        }
+      }
+      rendered++;
+      container.appendChild(div);
+    }
+  }
+  cursor = connection.page_info.end_cursor;
+  done = !connection.page_info.has_next_page;
+  document.getElementById("status").textContent = done ? "done" : "more";
+  loading = false;
+}
+
+window.addEventListener("scroll", () => {
+  if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 200) loadMore();
+});
+loadMore();
+</script>
+</body>
+</html>
+"""
+
+
+ASSETS_HEAD = """
+<link rel="stylesheet" href="/static/app.css">
+<script src="__THIRD_PARTY__/tracker.js"></script>
+"""
+
+STYLESHEET = """
+@font-face { font-family: "Fixture"; src: url("/static/fixture.woff2") format("woff2"); }
+body { font-family: "Fixture", sans-serif; }
+img { width: 300px; height: 300px; }
+""" + "".join(f".ad-{i} {{ margin: {i % 7}px; color: #{i:06x}; }}\n" for i in range(2000))
+
+# Stands in for analytics/tracking scripts: some work on load and a beacon per second
+TRACKER_SCRIPT = """
+(function () {
+  const origin = new URL(document.currentScript.src).origin;
+  let x = 0;
+  for (let i = 0; i < 3000000; i++) { x = (x + i * 7) % 1000003; }
+  setInterval(function () { new Image().src = origin + "/beacon?x=" + x + "&t=" + Date.now(); }, 1000);
+})();
+"""
+
+# Sizes of the generated media (bytes)
+IMAGE_BYTES = 60 * 1024
+VIDEO_BYTES = 512 * 1024
+FONT_BYTES = 40 * 1024
+
+STATIC_FILES = {
+    "/static/app.css": ("text/css", "stylesheet", STYLESHEET.encode("utf-8")),
+    "/static/fixture.woff2": ("font/woff2", "font", bytes(FONT_BYTES)),
+    "/tracker.js": ("application/javascript", "third_party", TRACKER_SCRIPT.encode("utf-8")),
+    "/beacon": ("image/gif", "third_party", b"GIF89a"),
+}
+
+
+def media_body(path: str, size: int) -> bytes:
+    """Generated media file; the content depends only on the file name (not its directory or query string)"""
+    name = path.rsplit("/", 1)[-1].encode("utf-8")
+    return name + bytes(size - len(name))
+
+
+def load_result_pages(capture_file: str = DEFAULT_CAPTURE_FILE) -> List[Dict[str, Any]]:
+    """Load the captured responses that contain search results"""
+    return [
+        response_obj["data"]
+        for response_obj in iter_graphql_responses(capture_file)
+        if get_search_results(response_obj).get("edges")
+    ]
+
+
+class FixtureServer:
+    """Serves the fixture Ads Library page and canned GraphQL pages on localhost"""
+
+    def __init__(self, capture_file: str = DEFAULT_CAPTURE_FILE, host: str = "127.0.0.1",
+                 port: int = 0, latency: float = 0.0, assets: bool = False):
+        self.pages = load_result_pages(capture_file)
+        self.latency = latency
+        self.assets = assets
+        self.graphql_requests = 0
+        self.bytes_served: Dict[str, int] = {}
+        self._failures: List[int] = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def third_party_url(self) -> str:
+        """Same server under another host name, so the browser treats it as a third party"""
+        return f"http://localhost:{self._httpd.server_address[1]}"
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.graphql_requests = 0
+            self.bytes_served = {}
+
+    def fail_graphql(self, count: int = 1, status: int = 503) -> None:
+        """Answer the next count GraphQL requests with an error status (e.g. to exercise retries)"""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def _count_bytes(self, kind: str, size: int) -> None:
+        with self._lock:
+            self.bytes_served[kind] = self.bytes_served.get(kind, 0) + size
+
+    def library_url(self, page_id: str = DEFAULT_PAGE_ID) -> str:
+        """URL of the fixture Ads Library page for an advertiser"""
+        return f"{self.base_url}/ads/library/?view_all_page_id={page_id}"
+
+    def media_url(self, name: str, ext: str = "jpg", token: str = "") -> str:
+        """URL of a generated media file; token stands in for the expiring signature of CDN links"""
+        return f"{self.base_url}/media/{name}.{ext}" + (f"?oh={token}" if token else "")
+
+    def graphql_page(self, page_id: str, cursor: Optional[str]) -> Dict[str, Any]:
+        """Build the GraphQL response for a cursor, with ad IDs unique per page ID"""
+        index = int(cursor) if cursor else 0
+        if index >= len(self.pages):
+            payload = {"data": {"ad_library_main": {"search_results_connection": {
+                "edges": [], "page_info": {"end_cursor": None, "has_next_page": False}}}}}
+            return payload
+
+        payload = copy.deepcopy(self.pages[index])
+        connection = payload["data"]["ad_library_main"]["search_results_connection"]
+        if page_id != DEFAULT_PAGE_ID:
+            for edge in connection.get("edges", []):
+                for result in edge.get("node", {}).get("collated_results", []):
+                    result["ad_archive_id"] = f"{page_id}{result.get('ad_archive_id')}"
+        has_next_page = index + 1 < len(self.pages)
+        connection["page_info"] = {
+            "end_cursor": str(index + 1) if has_next_page else None,
+            "has_next_page": has_next_page,
+        }
+        return payload
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive between requests, like a real server
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this Nagle holds the body for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, content_type: str, body: bytes, kind: str = "other"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                server._count_bytes(kind, len(body))
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path.rstrip("/") == "/ads/library":
+                    page_id = parse_qs(parsed.query).get("view_all_page_id", [DEFAULT_PAGE_ID])[0]
+                    head = ASSETS_HEAD.replace("__THIRD_PARTY__", server.third_party_url) if server.assets else ""
+                    html = (PAGE_TEMPLATE.replace("__PAGE_ID__", json.dumps(page_id))
+                            .replace("__LSD__", json.dumps(FIXTURE_LSD))
+                            .replace("__ASSETS__", json.dumps(server.assets))
+                            .replace("__HEAD__", head))
+                    self._send(200, "text/html; charset=utf-8", html.encode("utf-8"), "document")
+                elif parsed.path in STATIC_FILES:
+                    content_type, kind, body = STATIC_FILES[parsed.path]
+                    self._send(200, content_type, body, kind)
+                elif parsed.path.startswith("/media/"):
+                    if parsed.path.endswith(".mp4"):
+                        self._send(200, "video/mp4", media_body(parsed.path, VIDEO_BYTES), "media")
+                    else:
+                        self._send(200, "image/jpeg", media_body(parsed.path, IMAGE_BYTES), "image")
+                else:
+                    self._send(404, "text/plain", b"not found")
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/api/graphql/":
+                    self._send(404, "text/plain", b"not found")
+                    return
+
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                if form.get("lsd", [None])[0] != FIXTURE_LSD:
+                    self._send(403, "text/plain", b"missing session token")
+                    return
+                try:
+                    variables = json.loads(form.get("variables", ["{}"])[0])
+                except ValueError:
+                    self._send(400, "text/plain", b"bad variables")
+                    return
+
+                with server._lock:
+                    server.graphql_requests += 1
+                    failure = server._failures.pop(0) if server._failures else None
+                if failure:
+                    self._send(failure, "text/plain", b"injected failure")
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+
+                page_id = str(variables.get("viewAllPageID") or DEFAULT_PAGE_ID)
+                payload = server.graphql_page(page_id, variables.get("cursor"))
+                self._send(200, "application/json", json.dumps(payload).encode("utf-8"), "graphql")
+
+        return Handler
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until interrupted"""
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a local Ads Library fixture")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--capture-file", default=DEFAULT_CAPTURE_FILE)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each GraphQL response")
+    parser.add_argument("--assets", action="store_true",
+                        help="Also serve images, video, CSS, a font and a third-party tracker")
+    args = parser.parse_args()
+
+    fixture = FixtureServer(args.capture_file, port=args.port, latency=args.latency, assets=args.assets)
+    print(f"Serving fixture Ads Library at {fixture.library_url()}")
+    try:
+        fixture.serve_forever()
+    except KeyboardInterrupt:
+        fixture.stop()
@@ -0,0 +1,253 @@
+"""
+Synthetic ad_library_main GraphQL responses for benchmarks
+
+Responses mirror the shape of real captures (the same keys on results,
+snapshots and cards, long CDN URLs, non-ASCII copy) so JSON decoding and
+parsing cost is comparable. Generation is deterministic for a given seed.
+
+Write a capture file with: py -m fixtures.synthetic out.ndjson --pages 50
+"""
+import argparse
+import random
+from typing import Any, Dict, Iterator, List, Optional
+
+GRAPHQL_URL = "https://www.facebook.com/api/graphql/"
+CDN_URL = "https://scontent.ftlv5-1.fna.fbcdn.net/v/t39.35426-6/{name}_n.jpg?stp=dst-jpg_s600x600_tt6&_nc_cat=111&ccb=1-7&_nc_sid=c53f8f&_nc_ohc={token}&_nc_zt=14&_nc_ht=scontent.ftlv5-1.fna&oh=00_{token}&oe=696B89EA"
+VIDEO_URL = "https://video.ftlv5-1.fna.fbcdn.net/o1/v/t2/f2/m69/{name}.mp4?strext=1&_nc_cat=104&_nc_sid=8bf8fe&_nc_ht=video.ftlv5-1.fna.fbcdn.net&oh=00_{token}&oe=696B6A4E"
+
+PLATFORMS = ["FACEBOOK", "INSTAGRAM", "MESSENGER", "AUDIENCE_NETWORK", "THREADS"]
+CTA_TYPES = [("SHOP_NOW", "Shop Now"), ("LEARN_MORE", "Learn More"), ("SIGN_UP", "Sign Up"), ("ORDER_NOW", "לקנייה")]
+WORDS = ["gear", "run", "train", "fresh", "drop", "style", "נעליים", "comfort", "new", "sale", "air", "max"]
+
+# Kinds of malformed records the parser has to tolerate
+MALFORMED_KINDS = ("missing_id", "no_cards", "bad_timestamp", "null_fields")
+
+DEFAULTS = {
+    "pages": 20,
+    "edges": 30,
+    "results_per_edge": 1,
+    "cards_per_ad": 3,
+    "duplicate_rate": 0.1,
+    "malformed_rate": 0.05,
+}
+
+
+def _token(rng: random.Random, length: int = 24) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-") for _ in range(length))
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_card(rng: random.Random) -> Dict[str, Any]:
+    """One card (ad version) with the keys of a real snapshot card"""
+    is_video = rng.random() < 0.3
+    cta_type, cta_text = rng.choice(CTA_TYPES)
+    name = f"{rng.randrange(10**17, 10**18)}_{rng.randrange(10**15, 10**16)}"
+    image_url = CDN_URL.format(name=name, token=_token(rng))
+    return {
+        "body": _sentence(rng, rng.randint(6, 30)),
+        "cta_type": cta_type,
+        "caption": "example.com",
+        "link_description": _sentence(rng, rng.randint(4, 12)),
+        "link_url": f"https://www.example.com/t/{_token(rng, 12)}?dplnk=member",
+        "title": _sentence(rng, rng.randint(2, 6)),
+        "cta_text": cta_text,
+        "video_hd_url": VIDEO_URL.format(name=name, token=_token(rng)) if is_video else None,
+        "video_preview_image_url": image_url if is_video else None,
+        "video_sd_url": VIDEO_URL.format(name=name + "_sd", token=_token(rng)) if is_video else None,
+        "watermarked_video_hd_url": None,
+        "watermarked_video_sd_url": None,
+        "image_crops": [],
+        "original_image_url": None if is_video else image_url,
+        "resized_image_url": None if is_video else image_url,
+        "watermarked_resized_image_url": "",
+    }
+
+
+def make_result(rng: random.Random, ad_id: str, page_id: str, cards_per_ad: int,
+                malformed: Optional[str] = None) -> Dict[str, Any]:
+    """One collated result; `malformed` picks a defect from MALFORMED_KINDS"""
+    start = rng.randrange(1704067200, 1767225600)
+    cards = [make_card(rng) for _ in range(cards_per_ad)]
+    result = {
+        "ad_archive_id": ad_id,
+        "collation_count": None,
+        "collation_id": None,
+        "page_id": page_id,
+        "snapshot": {
+            "branded_content": None,
+            "page_id": page_id,
+            "page_is_deleted": False,
+            "page_profile_uri": f"https://www.facebook.com/page{page_id}/",
+            "root_reshared_post": None,
+            "byline": None,
+            "disclaimer_label": None,
+            "page_name": f"Page {page_id}",
+            "page_profile_picture_url": CDN_URL.format(name=page_id, token=_token(rng)),
+            "event": None,
+            "caption": "EXAMPLE.COM",
+            "cta_text": cards[0]["cta_text"] if cards else None,
+            "cards": cards,
+            "body": {"text": "{{product.brand}}"},
+            "cta_type": cards[0]["cta_type"] if cards else None,
+            "display_format": "DCO" if cards_per_ad > 1 else "IMAGE",
+            "link_description": None,
+            "link_url": None,
+            "images": [],
+            "page_categories": ["Sportswear Store"],
+            "page_like_count": rng.randrange(1000, 40000000),
+            "title": None,
+            "videos": [],
+            "is_reshared": False,
+            "extra_links": [],
+            "extra_texts": [],
+            "extra_images": [],
+            "extra_videos": [],
+            "country_iso_code": None,
+            "brazil_tax_id": None,
+            "additional_info": None,
+            "ec_certificates": [],
+        },
+        "is_active": rng.random() < 0.7,
+        "has_user_reported": False,
+        "report_count": None,
+        "menu_items": [],
+        "state_media_run_label": None,
+        "page_is_deleted": False,
+        "page_name": f"Page {page_id}",
+        "impressions_with_index": {"impressions_text": None, "impressions_index": -1},
+        "gated_type": "ELIGIBLE",
+        "categories": ["UNKNOWN"],
+        "is_aaa_eligible": False,
+        "contains_digital_created_media": False,
+        "reach_estimate": None,
+        "currency": "",
+        "spend": None,
+        "end_date": start + rng.randrange(0, 90) * 86400,
+        "publisher_platform": rng.sample(PLATFORMS, rng.randint(1, 4)),
+        "start_date": start,
+        "contains_sensitive_content": False,
+        "total_active_time": None,
+        "regional_regulation_data": {"finserv": {"is_deemed_finserv": False}},
+        "hide_data_status": "NONE",
+        "fev_info": None,
+        "ad_id": None,
+        "targeted_or_reached_countries": [],
+    }
+
+    if malformed == "missing_id":
+        result["ad_archive_id"] = None
+    elif malformed == "no_cards":
+        result["snapshot"]["cards"] = []
+    elif malformed == "bad_timestamp":
+        # Out of datetime's range, and a string, but still valid 64-bit JSON
+        result["start_date"] = 2**62
+        result["end_date"] = "not-a-timestamp"
+    elif malformed == "null_fields":
+        result["publisher_platform"] = [None, "FACEBOOK", ""]
+        result["snapshot"]["page_name"] = None
+        for card in result["snapshot"]["cards"]:
+            card["body"] = None
+            card["title"] = None
+    return result
+
+
+def generate_responses(pages: int = DEFAULTS["pages"], edges: int = DEFAULTS["edges"],
+                       results_per_edge: int = DEFAULTS["results_per_edge"],
+                       cards_per_ad: int = DEFAULTS["cards_per_ad"],
+                       duplicate_rate: float = DEFAULTS["duplicate_rate"],
+                       malformed_rate: float = DEFAULTS["malformed_rate"],
+                       seed: int = 0, page_id: str = "15087023444") -> Iterator[Dict[str, Any]]:
+    """
+    Yield captured responses ({"url", "data"}) for a paginated ad_library_main search
+
+    Args:
+        pages: Number of GraphQL responses
+        edges: Edges per response
+        results_per_edge: collated_results per edge
+        cards_per_ad: Cards (versions) per ad
+        duplicate_rate: Share of results repeating an ad_id already emitted
+        malformed_rate: Share of results with one of MALFORMED_KINDS
+        seed: Random seed; the same arguments always give the same responses
+        page_id: Advertiser page the ads belong to
+    """
+    rng = random.Random(seed)
+    emitted: List[str] = []
+    next_id = 10**16
+
+    for page in range(pages):
+        response_edges = []
+        for _ in range(edges):
+            results = []
+            for _ in range(results_per_edge):
+                if emitted and rng.random() < duplicate_rate:
+                    ad_id = rng.choice(emitted)
+                else:
+                    next_id += rng.randrange(1, 10**6)
+                    ad_id = str(next_id)
+                    emitted.append(ad_id)
+                malformed = rng.choice(MALFORMED_KINDS) if rng.random() < malformed_rate else None
+                results.append(make_result(rng, ad_id, page_id, cards_per_ad, malformed))
+            response_edges.append({"node": {"collated_results": results}})
+
+        yield {
+            "url": GRAPHQL_URL,
+            "data": {
+                "data": {
+                    "ad_library_main": {
+                        "search_results_connection": {
+                            "edges": response_edges,
+                            "page_info": {
+                                "end_cursor": _token(rng, 64) if page < pages - 1 else None,
+                                "has_next_page": page < pages - 1,
+                            },
+                        }
+                    }
+                }
+            },
+        }
+
+
+def write_capture(file_path: str, **options) -> int:
+    """Write generated responses as an NDJSON capture file; returns the response count"""
+    from capture_store import CaptureWriter
+
+    with CaptureWriter(file_path) as writer:
+        for response_obj in generate_responses(**options):
+            writer.write(response_obj["url"], response_obj["data"])
+        return writer.count
+
+
+def add_generator_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the generator knobs to an argument parser"""
+    parser.add_argument("--pages", type=int, default=DEFAULTS["pages"], help="GraphQL responses")
+    parser.add_argument("--edges", type=int, default=DEFAULTS["edges"], help="Edges per response")
+    parser.add_argument("--results-per-edge", type=int, default=DEFAULTS["results_per_edge"])
+    parser.add_argument("--cards-per-ad", type=int, default=DEFAULTS["cards_per_ad"])
+    parser.add_argument("--duplicate-rate", type=float, default=DEFAULTS["duplicate_rate"])
+    parser.add_argument("--malformed-rate", type=float, default=DEFAULTS["malformed_rate"])
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def generator_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "pages": args.pages,
+        "edges": args.edges,
+        "results_per_edge": args.results_per_edge,
+        "cards_per_ad": args.cards_per_ad,
+        "duplicate_rate": args.duplicate_rate,
+        "malformed_rate": args.malformed_rate,
+        "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic GraphQL capture file")
+    parser.add_argument("output", help="NDJSON capture file to write")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    count = write_capture(args.output, **generator_options(args))
+    print(f"Wrote {count} responses to {args.output}")
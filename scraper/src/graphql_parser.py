@@ -1,16 +1,28 @@
 """
 Parser to extract ad data from Facebook Ads Library GraphQL responses
 """
-import json
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+from ad_records import ParsedAd, ParsedVersion, STATUS_ACTIVE, STATUS_INACTIVE, intern_value
+from json_backend import CAPTURED_EDGES_POINTER, get_backend
+from instrumentation import metrics
+
+# Platform codes to readable names
+PLATFORM_NAMES = {
+    "FACEBOOK": "Facebook",
+    "INSTAGRAM": "Instagram",
+    "MESSENGER": "Messenger",
+    "WHATSAPP": "WhatsApp",
+    "AUDIENCE_NETWORK": "Audience Network"
+}
 
 
 def parse_timestamp(timestamp: Optional[int]) -> Optional[str]:
     """Convert Unix timestamp to ISO date string"""
     if timestamp:
         try:
-            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+            return intern_value(datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d"))
         except:
             return str(timestamp)
     return None
@@ -18,14 +30,7 @@ def parse_timestamp(timestamp: Optional[int]) -> Optional[str]:
 
 def parse_platforms(platforms: List[str]) -> List[str]:
     """Convert platform codes to readable names"""
-    platform_map = {
-        "FACEBOOK": "Facebook",
-        "INSTAGRAM": "Instagram",
-        "MESSENGER": "Messenger",
-        "WHATSAPP": "WhatsApp",
-        "AUDIENCE_NETWORK": "Audience Network"
-    }
-    return [platform_map.get(p.upper(), p) for p in platforms if p]
+    return [PLATFORM_NAMES.get(p.upper()) or intern_value(p) for p in platforms if p]
 
 
 def extract_ad_assets(snapshot: Dict[str, Any]) -> Dict[str, Optional[str]]:
@@ -61,7 +66,7 @@ def extract_ad_assets(snapshot: Dict[str, Any]) -> Dict[str, Optional[str]]:
     return assets
 
 
-def parse_card(card: Dict[str, Any]) -> Dict[str, Any]:
+def parse_card(card: Dict[str, Any]) -> ParsedVersion:
     """Parse a single card (ad version) into structured data"""
     # Extract assets for this card
     image_url = None
@@ -81,21 +86,22 @@ def parse_card(card: Dict[str, Any]) -> Dict[str, Any]:
         image_url = card["original_image_url"]
         asset_type = "image"
     
-    return {
-        "ad_copy": card.get("body", ""),
-        "title": card.get("title"),
-        "image_url": image_url,
-        "video_url": video_url,
-        "asset_type": asset_type,
-        "link_url": card.get("link_url"),
-        "link_description": card.get("link_description"),
-        "cta_text": card.get("cta_text"),
-        "cta_type": card.get("cta_type"),
-        "caption": card.get("caption"),
-    }
+    # Positional arguments in ad_records.VERSION_FIELDS order (faster than keywords)
+    return ParsedVersion(
+        card.get("body", ""),                           # ad_copy
+        card.get("title"),                              # title
+        image_url,
+        video_url,
+        asset_type,
+        card.get("link_url"),                           # link_url
+        intern_value(card.get("link_description")),     # link_description
+        intern_value(card.get("cta_text")),             # cta_text
+        intern_value(card.get("cta_type")),             # cta_type
+        intern_value(card.get("caption")),              # caption
+    )
 
 
-def parse_collated_result(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def parse_collated_result(result: Dict[str, Any]) -> Optional[ParsedAd]:
     """Parse a single collated result into structured ad data with all versions"""
     try:
         ad_id = result.get("ad_archive_id")
@@ -113,24 +119,17 @@ def parse_collated_result(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         end_date_ts = result.get("end_date")
         publisher_platforms = result.get("publisher_platform", [])
         
-        # Parse all cards (versions)
-        versions = []
-        for card in cards:
-            version_data = parse_card(card)
-            versions.append(version_data)
-        
-        # Build ad data with all versions
-        ad_data = {
-            "ad_id": str(ad_id),
-            "status": "active" if is_active else "inactive",
-            "platforms": parse_platforms(publisher_platforms),
-            "start_date": parse_timestamp(start_date_ts),
-            "end_date": parse_timestamp(end_date_ts),
-            "page_name": snapshot.get("page_name"),
-            "page_profile_uri": snapshot.get("page_profile_uri"),
-            "versions": versions,  # All versions/cards for this ad
-            "version_count": len(versions),  # Number of versions
-        }
+        # Parse all cards (versions) and build the ad record
+        ad_data = ParsedAd(
+            str(ad_id),
+            STATUS_ACTIVE if is_active else STATUS_INACTIVE,
+            tuple(parse_platforms(publisher_platforms)),
+            parse_timestamp(start_date_ts),
+            parse_timestamp(end_date_ts),
+            intern_value(snapshot.get("page_name")),
+            intern_value(snapshot.get("page_profile_uri")),
+            tuple([parse_card(card) for card in cards]),
+        )
         
         return ad_data
         
@@ -139,59 +138,214 @@ def parse_collated_result(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         return None
 
 
-def parse_graphql_responses(responses: List[Dict[str, Any]], max_ads: int = 50) -> List[Dict[str, Any]]:
+def get_search_results(response_obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the search_results_connection of a captured response (or {})"""
+    data = response_obj.get("data") or {}
+    inner_data = data.get("data") or {}
+    ad_library = inner_data.get("ad_library_main") or {}
+    return ad_library.get("search_results_connection") or {}
+
+
+def iter_collated_results(response_obj: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield the raw collated results contained in a captured response"""
+    for edge in get_search_results(response_obj).get("edges", []):
+        node = edge.get("node", {})
+        for result in node.get("collated_results", []):
+            yield result
+
+
+def _iter_unique_ads(result_groups: Iterable[Iterable[Any]], max_ads: Optional[int]) -> Iterator[ParsedAd]:
+    """Parse groups of collated results (one group per response), skipping duplicates"""
+    if max_ads is not None and max_ads <= 0:
+        return
+
+    seen_ad_ids = set()
+    count = 0
+    # Totals are handed to the metrics registry once, when the generator finishes
+    responses = results_seen = duplicates = 0
+    parse_seconds = 0.0
+
+    try:
+        for results in result_groups:
+            responses += 1
+            try:
+                for result in results:
+                    results_seen += 1
+                    started = time.perf_counter()
+                    ad_data = parse_collated_result(result)
+                    parse_seconds += time.perf_counter() - started
+
+                    if ad_data:
+                        ad_id = ad_data.ad_id
+
+                        # Skip duplicates
+                        if ad_id not in seen_ad_ids:
+                            seen_ad_ids.add(ad_id)
+                            yield ad_data
+                            count += 1
+
+                            if max_ads is not None and count >= max_ads:
+                                return
+                        else:
+                            duplicates += 1
+
+            except Exception as e:
+                print(f"Error parsing response: {e}")
+                metrics.incr("parse_errors")
+                continue
+    finally:
+        metrics.add_time("parse", parse_seconds, calls=results_seen)
+        metrics.incr("responses_parsed", responses)
+        metrics.incr("ads_parsed", count)
+        metrics.incr("duplicates", duplicates)
+        metrics.incr("invalid_results", results_seen - count - duplicates)
+
+
+def iter_ads(responses: Iterable[Dict[str, Any]], max_ads: Optional[int] = None) -> Iterator[ParsedAd]:
+    """
+    Parse GraphQL responses lazily, yielding unique ads as they are found
+
+    Args:
+        responses: Iterable of GraphQL response objects with 'url' and 'data' keys
+        max_ads: Stop after this many ads (None for no limit)
+
+    Yields:
+        ParsedAd records, skipping duplicate ad IDs
+    """
+    return _iter_unique_ads((iter_collated_results(r) for r in responses), max_ads)
+
+
+def parse_graphql_responses(responses: Iterable[Dict[str, Any]], max_ads: int = 50) -> List[ParsedAd]:
     """
     Parse GraphQL responses and extract ad data
     
     Args:
-        responses: List of GraphQL response objects with 'url' and 'data' keys
+        responses: List (or any iterable) of GraphQL response objects with 'url' and 'data' keys
         max_ads: Maximum number of ads to extract
         
     Returns:
-        List of parsed ad dictionaries
+        List of ParsedAd records (see ad_records.to_json for JSON output)
     """
-    ads = []
-    seen_ad_ids = set()
-    
-    for response_obj in responses:
-        try:
-            data = response_obj.get("data", {})
-            inner_data = data.get("data", {})
-            ad_library = inner_data.get("ad_library_main", {})
-            search_results = ad_library.get("search_results_connection", {})
-            edges = search_results.get("edges", [])
-            
-            for edge in edges:
-                node = edge.get("node", {})
-                collated_results = node.get("collated_results", [])
-                
-                for result in collated_results:
+    return list(iter_ads(responses, max_ads))
+
+
+def _is_legacy_capture(f) -> bool:
+    """True if a binary capture file holds a single JSON array (legacy format)"""
+    while True:
+        char = f.read(1)
+        if not char or not char.isspace():
+            f.seek(0)
+            return char == b"["
+
+
+def iter_graphql_responses(file_path: str, backend: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield captured GraphQL responses from a capture file one at a time
+
+    Reads the NDJSON capture format (one response object per line) with
+    constant memory. Legacy files holding a single JSON array are still
+    accepted, but are loaded in one go. Capture archives (.zca, see
+    capture_archive.py) are read frame by frame, oldest capture first.
+    """
+    if file_path.endswith(".zca"):
+        from capture_archive import CaptureArchive
+        with CaptureArchive(file_path) as archive:
+            yield from archive.iter_responses()
+        return
+
+    json_backend = get_backend(backend)
+    with open(file_path, "rb") as f:
+        if _is_legacy_capture(f):
+            # Legacy format: one indented JSON array of responses
+            with metrics.stage("json_decode"):
+                responses = json_backend.loads(f.read())
+            yield from responses
+            return
+
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            metrics.incr("bytes_read", len(line))
+            try:
+                with metrics.stage("json_decode"):
+                    response_obj = json_backend.loads(line)
+            except Exception as e:
+                print(f"Error decoding line {line_number} of {file_path}: {e}")
+                metrics.incr("decode_errors")
+                continue
+            yield response_obj
+
+
+def iter_ads_from_file(file_path: str, max_ads: Optional[int] = None,
+                       backend: Optional[str] = None) -> Iterator[ParsedAd]:
+    """
+    Parse unique ads from a capture file, one response at a time
+
+    For NDJSON captures each line is handed to the JSON backend, which jumps
+    straight to collated_results (lazily, with simdjson) instead of building
+    the whole response tree first.
+    """
+    if file_path.endswith(".zca"):
+        yield from iter_ads_from_archive(file_path, max_ads=max_ads, backend=backend)
+        return
+
+    json_backend = get_backend(backend)
+    with open(file_path, "rb") as f:
+        if _is_legacy_capture(f):
+            yield from iter_ads(json_backend.loads(f.read()), max_ads)
+            return
+
+        def result_groups():
+            for line in f:
+                line = line.strip()
+                if line:
+                    # Decoding happens lazily as the results are iterated and is not timed separately
+                    metrics.incr("bytes_read", len(line))
+                    yield json_backend.iter_collated_results(line, CAPTURED_EDGES_POINTER)
+
+        yield from _iter_unique_ads(result_groups(), max_ads)
+
+
+def iter_ads_from_archive(archive_path: str, since: Optional[float] = None, until: Optional[float] = None,
+                          max_ads: Optional[int] = None, backend: Optional[str] = None) -> Iterator[ParsedAd]:
+    """
+    Parse unique ads from the responses of a capture archive captured in [since, until)
+
+    Only the frames in the time range are decompressed (since / until are Unix times).
+    """
+    from capture_archive import CaptureArchive
+
+    json_backend = get_backend(backend)
+    with CaptureArchive(archive_path) as archive:
+        def result_groups():
+            for frame in archive.frames_between(since, until):
+                raw = archive.read(frame)
+                metrics.incr("bytes_read", len(raw))
+                yield json_backend.iter_collated_results(raw, CAPTURED_EDGES_POINTER)
+
+        yield from _iter_unique_ads(result_groups(), max_ads)
+
+
+def parse_archived_ad(archive_path: str, ad_id: str, backend: Optional[str] = None) -> Optional[ParsedAd]:
+    """Re-parse one ad from the latest archived response that contains it (None if it was never captured)"""
+    from capture_archive import CaptureArchive
+
+    json_backend = get_backend(backend)
+    with CaptureArchive(archive_path) as archive:
+        for frame in reversed(archive.frames_for_ad(ad_id)):
+            for result in json_backend.iter_collated_results(archive.read(frame), CAPTURED_EDGES_POINTER):
+                if str(result.get("ad_archive_id")) == str(ad_id):
                     ad_data = parse_collated_result(result)
-                    
                     if ad_data:
-                        ad_id = ad_data["ad_id"]
-                        
-                        # Skip duplicates
-                        if ad_id not in seen_ad_ids:
-                            seen_ad_ids.add(ad_id)
-                            ads.append(ad_data)
-                            
-                            if len(ads) >= max_ads:
-                                return ads
-                                
-        except Exception as e:
-            print(f"Error parsing response: {e}")
-            continue
-    
-    return ads
+                        return ad_data
+    return None
 
 
-def parse_graphql_file(file_path: str, max_ads: int = 50) -> List[Dict[str, Any]]:
-    """Load and parse GraphQL responses from a JSON file"""
+def parse_graphql_file(file_path: str, max_ads: int = 50, backend: Optional[str] = None) -> List[ParsedAd]:
+    """Load and parse GraphQL responses from a capture file (NDJSON, JSON array or archive)"""
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            responses = json.load(f)
-        return parse_graphql_responses(responses, max_ads)
+        return list(iter_ads_from_file(file_path, max_ads, backend))
     except Exception as e:
         print(f"Error loading file {file_path}: {e}")
         return []
@@ -0,0 +1,298 @@
+"""
+Cursor-based GraphQL pagination without DOM scrolling ("replay" mode)
+
+The browser is only used to open the Ads Library page once and capture the
+first search_results_connection request (endpoint, doc_id, variables,
+session tokens and cookies). Further pages are requested directly by
+cursor over pooled keep-alive HTTP connections.
+"""
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+from graphql_parser import get_search_results
+from instrumentation import metrics
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 30.0
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Statuses worth retrying (rate limiting and transient server errors)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Request headers that must not be replayed verbatim
+SKIPPED_HEADERS = {"content-length", "host", "connection", "accept-encoding"}
+
+
+class ReplayError(Exception):
+    """Raised when a GraphQL page cannot be fetched after all retries"""
+
+
+def decode_graphql_body(body: bytes) -> Dict[str, Any]:
+    """Decode a GraphQL response body (strips the for(;;); guard, keeps the first payload)"""
+    text = body.decode("utf-8", errors="ignore").strip()
+    if text.startswith("for (;;);"):
+        text = text[len("for (;;);"):]
+    # Streamed responses put one JSON payload per line; the first holds the results
+    first_line = text.split("\n", 1)[0]
+    return json.loads(first_line)
+
+
+class ReplaySession:
+    """Everything needed to request further result pages by cursor"""
+
+    def __init__(self, url: str, form: Dict[str, str], headers: Optional[Dict[str, str]] = None,
+                 cursor: Optional[str] = None):
+        self.url = url
+        self.form = dict(form)
+        self.headers = dict(headers or {})
+        self.cursor = cursor
+
+    @property
+    def variables(self) -> Dict[str, Any]:
+        return json.loads(self.form.get("variables") or "{}")
+
+    def build_body(self, cursor: Optional[str]) -> bytes:
+        """Form-encoded request body for one page"""
+        variables = self.variables
+        variables["cursor"] = cursor
+        form = dict(self.form, variables=json.dumps(variables, separators=(",", ":")))
+        return urlencode(form).encode("utf-8")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"url": self.url, "form": self.form, "headers": self.headers, "cursor": self.cursor}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReplaySession":
+        return cls(data["url"], data["form"], data.get("headers"), data.get("cursor"))
+
+    @classmethod
+    def from_request(cls, url: str, post_data: str, headers: Dict[str, str],
+                     cursor: Optional[str] = None) -> "ReplaySession":
+        """Build a session from a captured browser request"""
+        form = {key: values[0] for key, values in parse_qs(post_data, keep_blank_values=True).items()}
+        kept_headers = {
+            name: value for name, value in headers.items()
+            if not name.startswith(":") and name.lower() not in SKIPPED_HEADERS
+        }
+        return cls(url, form, kept_headers, cursor)
+
+
+class HttpPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections per host"""
+
+    def __init__(self, max_connections: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._pools: Dict[Tuple[str, str, int], queue.LifoQueue] = {}
+        self._slots: Dict[Tuple[str, str, int], threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, url: str) -> Tuple[str, str, int]:
+        parsed = urlparse(url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        return parsed.scheme, parsed.hostname, port
+
+    def _new_connection(self, key: Tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        self.connections_opened += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def request(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        """Send one request on a pooled connection; returns (status, body)"""
+        response, data = self._send(method, url, body, headers, lambda response: response.read())
+        return response.status, data
+
+    def download(self, url: str, file_obj: BinaryIO, headers: Optional[Dict[str, str]] = None,
+                 chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Tuple[int, str, int]:
+        """
+        GET a URL, streaming a 200 response body into file_obj in chunks
+
+        Returns:
+            (status, content type, bytes written)
+        """
+        def stream(response: http.client.HTTPResponse) -> int:
+            if response.status != 200:
+                response.read()
+                return 0
+            written = 0
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    return written
+                file_obj.write(chunk)
+                written += len(chunk)
+
+        response, written = self._send("GET", url, None, headers, stream)
+        return response.status, response.getheader("Content-Type") or "", written
+
+    def _send(self, method: str, url: str, body: Optional[bytes], headers: Optional[Dict[str, str]],
+              read: Callable[[http.client.HTTPResponse], Any]) -> Tuple[http.client.HTTPResponse, Any]:
+        key = self._key(url)
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue()
+                self._slots[key] = threading.BoundedSemaphore(self.max_connections)
+        pool, slots = self._pools[key], self._slots[key]
+
+        parsed = urlparse(url)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+
+        with slots:
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                conn = self._new_connection(key)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = read(response)
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                pool.put(conn)
+            return response, data
+
+    def close(self) -> None:
+        for pool in self._pools.values():
+            while not pool.empty():
+                pool.get_nowait().close()
+
+
+def fetch_page(session: ReplaySession, pool: HttpPool, cursor: Optional[str],
+               retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF) -> Dict[str, Any]:
+    """Fetch one result page, retrying transient failures with exponential backoff"""
+    headers = dict(session.headers)
+    headers["Content-Type"] = "application/x-www-form-urlencoded"
+    body = session.build_body(cursor)
+
+    for attempt in range(retries + 1):
+        if attempt:
+            metrics.incr("retries")
+        try:
+            with metrics.stage("http_fetch"):
+                status, data = pool.request("POST", session.url, body, headers)
+            if status == 200:
+                metrics.incr("bytes_fetched", len(data))
+                with metrics.stage("json_decode"):
+                    return decode_graphql_body(data)
+            if status not in RETRY_STATUSES:
+                raise ReplayError(f"HTTP {status} for cursor {cursor!r}")
+            error = ReplayError(f"HTTP {status}")
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            error = e
+        if attempt < retries:
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+    raise ReplayError(f"Giving up on cursor {cursor!r} after {retries + 1} attempts: {error}")
+
+
+def replay_pages(session: ReplaySession, pool: HttpPool, cursor: Optional[str] = None,
+                 max_pages: Optional[int] = None, **fetch_options) -> Iterator[Dict[str, Any]]:
+    """
+    Page through search_results_connection by cursor
+
+    Args:
+        session: Captured replay session
+        pool: Shared HTTP connection pool
+        cursor: Cursor to start from (defaults to the session's cursor)
+        max_pages: Stop after this many pages (None for all)
+
+    Yields:
+        Response objects with 'url' and 'data' keys, as captured by the scraper
+    """
+    cursor = cursor if cursor is not None else session.cursor
+    pages = 0
+    while cursor and (max_pages is None or pages < max_pages):
+        data = fetch_page(session, pool, cursor, **fetch_options)
+        pages += 1
+        response_obj = {"url": session.url, "data": data}
+        yield response_obj
+
+        page_info = get_search_results(response_obj).get("page_info") or {}
+        if not page_info.get("has_next_page"):
+            return
+        cursor = page_info.get("end_cursor")
+
+
+def replay_many(sessions: List[ReplaySession], pool: HttpPool, concurrency: int = 4,
+                **replay_options) -> List[List[Dict[str, Any]]]:
+    """Replay several sessions (e.g. advertisers) with bounded concurrency"""
+    def run(session: ReplaySession) -> List[Dict[str, Any]]:
+        return list(replay_pages(session, pool, **replay_options))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run, sessions))
+
+
+def capture_replay_session(url: str, timeout: float = 60.0) -> Tuple[ReplaySession, Dict[str, Any]]:
+    """
+    Open the Ads Library page in a browser and capture the first results request
+
+    Returns:
+        The replay session (with the cursor of the next page) and the first
+        captured response object
+    """
+    from playwright.sync_api import sync_playwright
+
+    captured: Dict[str, Any] = {}
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context(
+            viewport={"width": 1920, "height": 1080},
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+        )
+        page = context.new_page()
+
+        def handle_response(response):
+            if captured or "/api/graphql/" not in response.url:
+                return
+            try:
+                response_obj = {"url": response.url, "data": decode_graphql_body(response.body())}
+                if get_search_results(response_obj).get("edges") and response.request.post_data:
+                    captured["response"] = response_obj
+                    captured["request"] = response.request
+                    captured["headers"] = response.request.all_headers()
+            except Exception:
+                pass
+
+        page.on("response", handle_response)
+        page.goto(url, timeout=120000, wait_until="domcontentloaded")
+
+        deadline = time.perf_counter() + timeout
+        while not captured and time.perf_counter() < deadline:
+            page.wait_for_timeout(100)
+
+        if not captured:
+            browser.close()
+            raise ReplayError(f"No search results request seen on {url}")
+
+        page_info = get_search_results(captured["response"]).get("page_info") or {}
+        request = captured["request"]
+        session = ReplaySession.from_request(
+            request.url, request.post_data, captured["headers"],
+            cursor=page_info.get("end_cursor") if page_info.get("has_next_page") else None,
+        )
+        if "cookie" not in {name.lower() for name in session.headers}:
+            cookies = context.cookies(request.url)
+            if cookies:
+                session.headers["Cookie"] = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+
+        browser.close()
+
+    return session, captured["response"]
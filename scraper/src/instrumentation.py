@@ -0,0 +1,248 @@
+"""
+Stage timings and counters for the scrape -> parse -> import path
+
+Code records into the process-wide `metrics` registry:
+
+    with metrics.stage("goto"):
+        page.goto(url)
+    metrics.incr("bytes_captured", len(body))
+
+Hot loops accumulate locally and hand over totals with add_time()/incr()
+once per response or batch, so the bookkeeping stays off the per-ad path.
+
+A run wrapped in instrumented_run() prints a stage report at the end and,
+when configured through the environment, also:
+
+    SCRAPER_METRICS_LOG=metrics.jsonl   append a JSON summary line ("-" for stdout)
+    SCRAPER_METRICS_PROM=scraper.prom   write a Prometheus textfile (node_exporter
+                                        textfile collector / OpenMetrics text)
+    SCRAPER_PROFILE=cprofile            profile the run with cProfile (or "pyinstrument");
+    SCRAPER_PROFILE_OUTPUT=run.prof     output file (default: <run>.prof / <run>-profile.html)
+
+cProfile only sees the main thread; pyinstrument samples all threads.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+METRICS_LOG_ENV = "SCRAPER_METRICS_LOG"
+METRICS_PROM_ENV = "SCRAPER_METRICS_PROM"
+PROFILE_ENV = "SCRAPER_PROFILE"
+PROFILE_OUTPUT_ENV = "SCRAPER_PROFILE_OUTPUT"
+
+METRIC_PREFIX = "scraper"
+
+
+class Metrics:
+    """Thread-safe registry of per-stage timings and named counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages: Dict[str, Dict[str, float]] = {}
+            self._counters: Dict[str, int] = {}
+
+    def add_time(self, name: str, seconds: float, calls: int = 1) -> None:
+        """Add `calls` timed calls totalling `seconds` to a stage"""
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0}
+            stage["calls"] += calls
+            stage["seconds"] += seconds
+            # With several calls at once the longest one is unknown; the average is a lower bound
+            stage["max_seconds"] = max(stage["max_seconds"], seconds / calls if calls else seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one call of a stage (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {name: dict(stage) for name, stage in self._stages.items()},
+                "counters": dict(self._counters),
+            }
+
+    def report(self) -> str:
+        """Human readable table of stages (slowest first) and counters"""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<20} {'calls':>8} {'total s':>10} {'avg ms':>10} {'max ms':>10}"]
+        for name, stage in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            calls = stage["calls"]
+            average = stage["seconds"] * 1000 / calls if calls else 0.0
+            lines.append(f"{name:<20} {calls:>8} {stage['seconds']:>10.3f} {average:>10.2f} "
+                         f"{stage['max_seconds'] * 1000:>10.2f}")
+        if snapshot["counters"]:
+            lines.append(", ".join(f"{name}={value}" for name, value in sorted(snapshot["counters"].items())))
+        return "\n".join(lines)
+
+
+# Process-wide registry used by the scraper, parser and importer
+metrics = Metrics()
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(snapshot: Dict[str, Any], run: str, duration: float, success: bool) -> str:
+    """Render a metrics snapshot in the Prometheus text exposition format"""
+    run_label = f'run="{_label_value(run)}"'
+    lines = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+    stages = sorted(snapshot["stages"].items())
+    if stages:
+        family("stage_seconds_total", "counter", "Wall-clock seconds spent in each stage")
+        for name, stage in stages:
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_total{{{run_label},stage="{_label_value(name)}"}} '
+                         f"{stage['seconds']:.6f}")
+        family("stage_calls_total", "counter", "Timed calls of each stage")
+        for name, stage in stages:
+            lines.append(f'{METRIC_PREFIX}_stage_calls_total{{{run_label},stage="{_label_value(name)}"}} '
+                         f"{stage['calls']}")
+        family("stage_max_seconds", "gauge", "Longest single call of each stage")
+        for name, stage in stages:
+            lines.append(f'{METRIC_PREFIX}_stage_max_seconds{{{run_label},stage="{_label_value(name)}"}} '
+                         f"{stage['max_seconds']:.6f}")
+
+    for name, value in sorted(snapshot["counters"].items()):
+        metric = f"{_metric_name(name)}_total"
+        family(metric, "counter", f"Count of {name.replace('_', ' ')}")
+        lines.append(f"{METRIC_PREFIX}_{metric}{{{run_label}}} {value}")
+
+    family("run_duration_seconds", "gauge", "Wall-clock duration of the last run")
+    lines.append(f"{METRIC_PREFIX}_run_duration_seconds{{{run_label}}} {duration:.3f}")
+    family("run_success", "gauge", "1 if the last run finished without an exception")
+    lines.append(f"{METRIC_PREFIX}_run_success{{{run_label}}} {1 if success else 0}")
+    family("run_finished_timestamp_seconds", "gauge", "Unix time the last run finished")
+    lines.append(f"{METRIC_PREFIX}_run_finished_timestamp_seconds{{{run_label}}} {time.time():.0f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(file_path: str, text: str) -> None:
+    """Write a textfile atomically so the collector never reads a partial file"""
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, file_path)
+
+
+def log_event(event: str, **fields: Any) -> None:
+    """Append one structured JSON log line to SCRAPER_METRICS_LOG (no-op when unset)"""
+    target = os.getenv(METRICS_LOG_ENV)
+    if not target:
+        return
+    record = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "event": event}
+    record.update(fields)
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    if target == "-":
+        print(line)
+        return
+    with open(target, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+class _Profiler:
+    """Opt-in cProfile / pyinstrument session for one run"""
+
+    def __init__(self, kind: str, run: str, output: Optional[str]):
+        self.kind = kind
+        self.output = output
+        self._profiler = None
+        if kind == "cprofile":
+            import cProfile
+            self.output = output or f"{run}.prof"
+            self._profiler = cProfile.Profile()
+        elif kind == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("[WARN] SCRAPER_PROFILE=pyinstrument but pyinstrument is not installed; not profiling")
+                return
+            self.output = output or f"{run}-profile.html"
+            self._profiler = Profiler()
+        else:
+            print(f"[WARN] Unknown SCRAPER_PROFILE {kind!r} (expected cprofile or pyinstrument); not profiling")
+
+    def start(self) -> None:
+        if self._profiler is not None:
+            if self.kind == "cprofile":
+                self._profiler.enable()
+            else:
+                self._profiler.start()
+
+    def stop(self) -> None:
+        if self._profiler is None:
+            return
+        if self.kind == "cprofile":
+            import pstats
+            self._profiler.disable()
+            self._profiler.dump_stats(self.output)
+            print(f"\nTop functions by cumulative time (full profile: {self.output}):")
+            pstats.Stats(self._profiler, stream=sys.stdout).sort_stats("cumulative").print_stats(15)
+        else:
+            self._profiler.stop()
+            with open(self.output, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+            print(f"\nSaved pyinstrument profile to {self.output}")
+
+
+@contextmanager
+def instrumented_run(run: str, **fields: Any) -> Iterator[Metrics]:
+    """
+    Instrument one run of a script: reset the registry, optionally profile,
+    and emit the stage report / JSON log / Prometheus textfile at the end
+
+    Args:
+        run: Run name (label in the outputs and default profile file name)
+        fields: Extra fields for the JSON log line (e.g. input file, options)
+    """
+    metrics.reset()
+    profiler = _Profiler(os.getenv(PROFILE_ENV), run, os.getenv(PROFILE_OUTPUT_ENV)) \
+        if os.getenv(PROFILE_ENV) else None
+    if profiler:
+        profiler.start()
+    started = time.perf_counter()
+    success = False
+    try:
+        yield metrics
+        success = True
+    finally:
+        duration = time.perf_counter() - started
+        if profiler:
+            profiler.stop()
+        snapshot = metrics.snapshot()
+        print(f"\nStage timings ({run}, {duration:.2f}s):")
+        print(metrics.report())
+        log_event("run_summary", run=run, success=success, duration_seconds=round(duration, 3),
+                  stages=snapshot["stages"], counters=snapshot["counters"], **fields)
+        prom_file = os.getenv(METRICS_PROM_ENV)
+        if prom_file:
+            write_prometheus(prom_file, to_prometheus(snapshot, run, duration, success))
+            print(f"Wrote Prometheus metrics to {prom_file}")
@@ -0,0 +1,374 @@
+"""
+Download ad media to local content-addressed storage
+
+The image_url/video_url of ad versions are signed Facebook CDN links that
+expire after a few days. This stage downloads them into MEDIA_DIR, named by
+the sha256 of their content (<sha[:2]>/<sha>.<ext>), and records the hash
+and relative path on the version (media_sha256/media_path for the image,
+video_sha256/video_path for the video).
+
+- downloads run on an asyncio loop with bounded concurrency, over pooled
+  keep-alive connections (graphql_replay.HttpPool), streamed to disk
+- the same URL is fetched once per run, even when many versions share it
+- url_index.tsv in the store maps URLs without their expiring signature
+  (path plus the size variant "stp") to stored files, so media already
+  stored is not downloaded again after a re-scrape hands out new links
+- content already stored under its hash is not written twice
+- with --thumbnails (needs Pillow) images also get a JPEG thumbnail in
+  thumbs/<sha[:2]>/<sha>.jpg
+
+Usage (from scraper/src):
+    py media_downloader.py
+    py media_downloader.py --videos --thumbnails --concurrency 16
+"""
+import argparse
+import asyncio
+import hashlib
+import http.client
+import mimetypes
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from sqlalchemy import and_, bindparam, or_, select, update
+
+from database.connection import engine, init_db
+from database.fingerprints import media_url_key
+from database.models import AdVersion
+from graphql_replay import HttpPool, RETRY_STATUSES
+from instrumentation import metrics
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+MEDIA_DIR = os.getenv("MEDIA_DIR") or "media"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+THUMBNAIL_SIZE = (320, 320)
+URL_INDEX_FILE = "url_index.tsv"
+
+# Version columns per media kind: (URL column, hash column, path column)
+MEDIA_COLUMNS = {
+    "image": ("image_url", "media_sha256", "media_path"),
+    "video": ("video_url", "video_sha256", "video_path"),
+}
+
+
+class MediaError(Exception):
+    """Raised when a media URL cannot be downloaded"""
+
+
+def media_key(url: str) -> str:
+    """Cache key of a media URL: host and path plus the rendition parameters, without signatures"""
+    return media_url_key(url)
+
+
+def guess_extension(url: str, content_type: str) -> str:
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    if ext and len(ext) <= 5:
+        return ".jpg" if ext == ".jpeg" else ext
+    guessed = mimetypes.guess_extension(content_type.split(";")[0].strip()) if content_type else None
+    return {".jpe": ".jpg", ".jpeg": ".jpg"}.get(guessed, guessed) or ".bin"
+
+
+class MediaStore:
+    """Content-addressed file store (<sha[:2]>/<sha>.<ext> under root) with a URL index"""
+
+    def __init__(self, root: str = MEDIA_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[str, str]] = {}
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        path = os.path.join(self.root, URL_INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) == 3:
+                    self._index[parts[0]] = (parts[1], parts[2])
+
+    def path_for(self, sha256: str, ext: str) -> str:
+        """Path of a file relative to the store root"""
+        return f"{sha256[:2]}/{sha256}{ext}"
+
+    def thumbnail_path(self, sha256: str) -> str:
+        return f"thumbs/{sha256[:2]}/{sha256}.jpg"
+
+    def abspath(self, relative_path: str) -> str:
+        return os.path.join(self.root, *relative_path.split("/"))
+
+    def exists(self, relative_path: str) -> bool:
+        return os.path.exists(self.abspath(relative_path))
+
+    def lookup(self, url: str) -> Optional[Tuple[str, str]]:
+        """(sha256, path) of a URL stored before, if its file is still there"""
+        with self._lock:
+            entry = self._index.get(media_key(url))
+        if entry and self.exists(entry[1]):
+            return entry
+        return None
+
+    def remember(self, url: str, sha256: str, relative_path: str) -> None:
+        key = media_key(url)
+        with self._lock:
+            if self._index.get(key) == (sha256, relative_path):
+                return
+            self._index[key] = (sha256, relative_path)
+            with open(os.path.join(self.root, URL_INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(f"{key}\t{sha256}\t{relative_path}\n")
+
+    def temp_file(self):
+        return tempfile.NamedTemporaryFile(dir=os.path.join(self.root, "tmp"), delete=False)
+
+    def put(self, temp_path: str, sha256: str, ext: str) -> Tuple[str, bool]:
+        """
+        Move a downloaded file to its content address
+
+        Returns:
+            (relative path, True if the content was new to the store)
+        """
+        relative_path = self.path_for(sha256, ext)
+        target = self.abspath(relative_path)
+        if os.path.exists(target):
+            os.remove(temp_path)
+            return relative_path, False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temp_path, target)
+        return relative_path, True
+
+
+class MediaDownloader:
+    """Fetches media URLs into a MediaStore (blocking; run_all() drives it from asyncio)"""
+
+    def __init__(self, store: MediaStore, pool: Optional[HttpPool] = None, thumbnails: bool = False,
+                 retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF):
+        if thumbnails and Image is None:
+            print("[WARN] Pillow is not installed; thumbnails disabled (pip install Pillow)")
+            thumbnails = False
+        self.store = store
+        self.pool = pool or HttpPool()
+        self.thumbnails = thumbnails
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = {"downloaded": 0, "cached": 0, "deduplicated": 0, "failed": 0, "bytes": 0, "thumbnails": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+        metrics.incr(f"media_{name}", amount)
+
+    def _download(self, url: str) -> Tuple[str, str, int, str]:
+        """Stream a URL into a temp file while hashing it; returns (temp path, content type, size, sha256)"""
+        for attempt in range(self.retries + 1):
+            with self.store.temp_file() as f:
+                temp_path = f.name
+                digest = _HashingWriter(f)
+                try:
+                    status, content_type, size = self.pool.download(url, digest)
+                except (OSError, http.client.HTTPException) as e:
+                    status, error = None, e
+                else:
+                    error = MediaError(f"HTTP {status}")
+            if status == 200:
+                return temp_path, content_type, size, digest.hexdigest()
+            os.remove(temp_path)
+            if status is not None and status not in RETRY_STATUSES:
+                break
+            if attempt < self.retries:
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+        raise MediaError(f"{url}: {error}")
+
+    def fetch(self, url: str, kind: str = "image") -> Tuple[str, str]:
+        """
+        Store the media behind a URL unless it already is
+
+        Returns:
+            (sha256, path relative to the store root)
+        """
+        cached = self.store.lookup(url)
+        if cached:
+            self._count("cached")
+            return cached
+
+        with metrics.stage("media_download"):
+            temp_path, content_type, size, sha256 = self._download(url)
+        relative_path, new = self.store.put(temp_path, sha256, guess_extension(url, content_type))
+        self._count("downloaded")
+        self._count("bytes", size)
+        if not new:
+            self._count("deduplicated")
+        if self.thumbnails and kind == "image":
+            self._make_thumbnail(sha256, relative_path)
+        self.store.remember(url, sha256, relative_path)
+        return sha256, relative_path
+
+    def _make_thumbnail(self, sha256: str, relative_path: str) -> None:
+        thumbnail = self.store.thumbnail_path(sha256)
+        if self.store.exists(thumbnail):
+            return
+        target = self.store.abspath(thumbnail)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            with metrics.stage("media_thumbnail"), Image.open(self.store.abspath(relative_path)) as image:
+                image.thumbnail(THUMBNAIL_SIZE)
+                image.convert("RGB").save(target, "JPEG", quality=80)
+            self._count("thumbnails")
+        except (OSError, ValueError) as e:
+            print(f"[WARN] No thumbnail for {relative_path}: {e}")
+
+    async def run_all(self, urls: List[Tuple[str, str]], concurrency: int = DEFAULT_CONCURRENCY
+                      ) -> Dict[str, Optional[Tuple[str, str]]]:
+        """
+        Fetch many (url, kind) pairs with at most `concurrency` downloads in flight
+
+        Returns:
+            url -> (sha256, relative path), or None for URLs that failed
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def fetch_one(executor: ThreadPoolExecutor, url: str, kind: str):
+            async with semaphore:
+                try:
+                    return url, await loop.run_in_executor(executor, self.fetch, url, kind)
+                except MediaError as e:
+                    self._count("failed")
+                    print(f"[WARN] {e}")
+                    return url, None
+
+        unique = dict(urls)  # Each URL once, however many versions share it
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="media") as executor:
+            results = await asyncio.gather(*(fetch_one(executor, url, kind) for url, kind in unique.items()))
+        return dict(results)
+
+
+class _HashingWriter:
+    """File wrapper that hashes what is written through it"""
+
+    def __init__(self, file_obj):
+        self._file = file_obj
+        self._hash = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def load_pending_versions(conn, kinds: List[str], after_id: str, limit: int) -> List[Dict[str, Any]]:
+    """Versions (ordered by id, after after_id) that have a media URL of the given kinds but no local copy"""
+    table = AdVersion.__table__
+    missing = [and_(table.c[url_col].isnot(None), table.c[url_col] != "", table.c[sha_col].is_(None))
+               for url_col, sha_col, _ in (MEDIA_COLUMNS[kind] for kind in kinds)]
+    columns = [table.c.id] + [table.c[MEDIA_COLUMNS[kind][0]] for kind in kinds]
+    rows = conn.execute(
+        select(*columns).where(table.c.id > after_id, or_(*missing)).order_by(table.c.id).limit(limit)
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def download_version_media(kinds: List[str], concurrency: int = DEFAULT_CONCURRENCY,
+                           batch_size: int = DEFAULT_BATCH_SIZE, thumbnails: bool = False,
+                           media_dir: str = MEDIA_DIR, limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    Download the media of all versions without a local copy and record hash and path on them
+
+    Args:
+        kinds: Media kinds to fetch ("image", "video")
+        concurrency: Downloads in flight at once
+        batch_size: Versions loaded and updated per round trip
+        thumbnails: Also write image thumbnails (needs Pillow)
+        media_dir: Root of the media store
+        limit: Stop after this many versions (None for all)
+
+    Returns:
+        Download statistics plus the number of versions processed and updated
+    """
+    table = AdVersion.__table__
+    downloader = MediaDownloader(MediaStore(media_dir), HttpPool(max_connections=concurrency), thumbnails)
+    versions_processed = 0
+    versions_updated = 0
+    after_id = ""
+    started = time.perf_counter()
+
+    # Keyset pagination by id: versions whose downloads failed are not picked up again in this run
+    while limit is None or versions_processed < limit:
+        with engine.connect() as conn:
+            size = batch_size if limit is None else min(batch_size, limit - versions_processed)
+            versions = load_pending_versions(conn, kinds, after_id, size)
+        if not versions:
+            break
+        after_id = versions[-1]["id"]
+        versions_processed += len(versions)
+
+        urls = [(version[MEDIA_COLUMNS[kind][0]], kind) for version in versions for kind in kinds
+                if version.get(MEDIA_COLUMNS[kind][0])]
+        results = asyncio.run(downloader.run_all(urls, concurrency))
+
+        updates: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in kinds}
+        for version in versions:
+            for kind in kinds:
+                stored = results.get(version.get(MEDIA_COLUMNS[kind][0]))
+                if stored:
+                    updates[kind].append({"version_id": version["id"], "sha": stored[0], "path": stored[1]})
+
+        with engine.begin() as conn:
+            for kind, rows in updates.items():
+                if rows:
+                    _, sha_col, path_col = MEDIA_COLUMNS[kind]
+                    conn.execute(
+                        update(table).where(table.c.id == bindparam("version_id"))
+                        .values({sha_col: bindparam("sha"), path_col: bindparam("path")}),
+                        rows,
+                    )
+        batch_updated = len({row["version_id"] for rows in updates.values() for row in rows})
+        versions_updated += batch_updated
+        stats = downloader.stats
+        print(f"[MEDIA] {len(versions)} versions, {len(set(url for url, _ in urls))} URLs: "
+              f"{stats['downloaded']} downloaded, {stats['cached']} already stored, {stats['failed']} failed so far "
+              f"({stats['bytes'] / 1024 / 1024:.1f} MB in {time.perf_counter() - started:.1f}s)")
+
+    downloader.pool.close()
+    return dict(downloader.stats, versions_processed=versions_processed, versions_updated=versions_updated)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download ad media to local content-addressed storage")
+    parser.add_argument("--media-dir", default=MEDIA_DIR, help=f"Media store root (default: {MEDIA_DIR}, or MEDIA_DIR)")
+    parser.add_argument("--videos", action="store_true", help="Also download videos")
+    parser.add_argument("--no-images", action="store_true", help="Skip images (with --videos)")
+    parser.add_argument("--thumbnails", action="store_true", help="Write image thumbnails (needs Pillow)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--limit", type=int, help="Stop after this many versions")
+    args = parser.parse_args()
+
+    kinds = ([] if args.no_images else ["image"]) + (["video"] if args.videos else [])
+    if not kinds:
+        parser.error("nothing to download (--no-images without --videos)")
+
+    init_db()
+    stats = download_version_media(kinds, args.concurrency, args.batch_size, args.thumbnails,
+                                   args.media_dir, args.limit)
+    print(f"\nMedia: {stats['versions_updated']} of {stats['versions_processed']} versions updated, {stats['downloaded']} files downloaded "
+          f"({stats['deduplicated']} duplicates of stored content), {stats['cached']} already stored, "
+          f"{stats['failed']} failed, {stats['thumbnails']} thumbnails, {stats['bytes'] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
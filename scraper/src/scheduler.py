@@ -0,0 +1,337 @@
+"""
+Scheduler daemon for recurring scrape-and-import jobs
+
+Jobs live in the scrape_jobs table (advertiser page ID or URL, interval,
+priority). The daemon polls for due jobs and runs each one - scrape, parse,
+import - on a bounded worker pool:
+
+- every run writes to its own temporary directory under --work-dir, so
+  overlapping runs never share scraped_ads.json / capture files
+- a job whose previous run still holds it (running_since, also across
+  scheduler processes) is skipped until its next interval
+- the next run is scheduled interval +/- jitter after a run finishes;
+  failures are retried with exponential backoff (capped by the interval)
+- scrapes of the same domain start at most once per --domain-interval seconds
+
+Usage (from scraper/src):
+    py scheduler.py add 15087023444 --interval 360 --priority 10
+    py scheduler.py add https://www.facebook.com/ads/library/?view_all_page_id=20531316728 --max-ads 500
+    py scheduler.py list
+    py scheduler.py run --workers 4
+    py scheduler.py run --backend fake --once   # offline, with fixtures/fake_scraper.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from sqlalchemy import delete, or_, select, update
+
+from database.connection import engine, init_db
+from database.import_ads import import_ads_bulk, load_ads_json
+from database.models import ScrapeJob
+from instrumentation import metrics
+from scrape_graphql import build_target_url
+from scrape_multi import target_slug
+
+DEFAULT_WORKERS = 2
+DEFAULT_POLL_INTERVAL = 10.0
+DEFAULT_DOMAIN_INTERVAL = 5.0
+DEFAULT_JITTER = 0.1
+DEFAULT_BACKOFF = 60.0
+DEFAULT_LEASE_MINUTES = 180
+DEFAULT_WORK_DIR = "scheduler_runs"
+
+
+def utcnow() -> datetime:
+    """Naive UTC timestamp, as stored in the DateTime columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class DomainRateLimiter:
+    """Spaces out the start of scrapes against the same domain"""
+
+    def __init__(self, min_interval: float = DEFAULT_DOMAIN_INTERVAL):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, domain: str) -> float:
+        """Block until the domain's next slot; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(domain, now))
+            self._next_slot[domain] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class BrowserBackend:
+    """Scrapes a target with the Playwright scroll scraper (scrape_multi.scrape_targets)"""
+
+    name = "browser"
+
+    def __init__(self, browser_profile: Optional[str] = None):
+        self.browser_profile = browser_profile
+
+    def scrape(self, target: str, output_dir: str, max_ads: Optional[int] = None) -> str:
+        from browser_profile import DEFAULT_PROFILE
+        from scrape_multi import scrape_targets
+
+        # Each worker thread runs its own event loop and browser
+        results = asyncio.run(scrape_targets([target], output_dir, concurrency=1, contexts=1,
+                                             browser_profile=self.browser_profile or DEFAULT_PROFILE,
+                                             max_ads=max_ads or 10 ** 9))
+        result = results[0]
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return result["output_file"]
+
+
+class Scheduler:
+    """Polls scrape_jobs and runs due jobs on a bounded thread pool"""
+
+    def __init__(self, backend, workers: int = DEFAULT_WORKERS, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 domain_interval: float = DEFAULT_DOMAIN_INTERVAL, jitter: float = DEFAULT_JITTER,
+                 backoff: float = DEFAULT_BACKOFF, lease_minutes: int = DEFAULT_LEASE_MINUTES,
+                 work_dir: str = DEFAULT_WORK_DIR, keep_outputs: bool = False):
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.rate_limiter = DomainRateLimiter(domain_interval)
+        self.jitter = jitter
+        self.backoff = backoff
+        self.lease = timedelta(minutes=lease_minutes)
+        self.work_dir = work_dir
+        self.keep_outputs = keep_outputs
+        self._stop = threading.Event()
+        self._rng = random.Random()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; running jobs are allowed to finish"""
+        self._stop.set()
+
+    def _jittered(self, seconds: float) -> timedelta:
+        return timedelta(seconds=seconds * (1 + self._rng.uniform(-self.jitter, self.jitter)))
+
+    def next_run_after(self, job: Dict[str, Any], failures: int, now: datetime) -> datetime:
+        """When a job runs next: its interval, or exponential backoff after failures"""
+        interval = job["interval_minutes"] * 60
+        if failures:
+            return now + self._jittered(min(self.backoff * 2 ** (failures - 1), interval))
+        return now + self._jittered(interval)
+
+    def claim_due_jobs(self, limit: int) -> List[Dict[str, Any]]:
+        """Claim up to `limit` due jobs, highest priority first; skips jobs whose last run still holds them"""
+        jobs = ScrapeJob.__table__
+        now = utcnow()
+        stale = now - self.lease
+        claimed: List[Dict[str, Any]] = []
+
+        with engine.begin() as conn:
+            due = conn.execute(
+                select(jobs)
+                .where(jobs.c.enabled.is_(True), or_(jobs.c.next_run_at.is_(None), jobs.c.next_run_at <= now))
+                .order_by(jobs.c.priority.desc(), jobs.c.next_run_at)
+            ).mappings().all()
+
+            for job in due:
+                if len(claimed) >= limit:
+                    break
+                if job["running_since"] is not None and job["running_since"] > stale:
+                    # The previous run is still going: skip this occurrence
+                    print(f"[SKIP] {job['target']} - previous run still in progress "
+                          f"(since {job['running_since']:%H:%M:%S})")
+                    metrics.incr("jobs_skipped")
+                    conn.execute(update(jobs).where(jobs.c.id == job["id"])
+                                 .values(next_run_at=self.next_run_after(job, 0, now), last_status="skipped"))
+                    continue
+                # Conditional update, so two schedulers never claim the same job. The occurrence is
+                # consumed right away: the job is only due again (and skipped) if this run outlasts its interval
+                result = conn.execute(
+                    update(jobs)
+                    .where(jobs.c.id == job["id"], or_(jobs.c.running_since.is_(None), jobs.c.running_since <= stale))
+                    .values(running_since=now, last_started_at=now, next_run_at=self.next_run_after(job, 0, now))
+                )
+                if result.rowcount == 1:
+                    claimed.append(dict(job))
+        return claimed
+
+    def _finish(self, job: Dict[str, Any], error: Optional[str], ads: Optional[int]) -> None:
+        jobs = ScrapeJob.__table__
+        now = utcnow()
+        failures = job["consecutive_failures"] + 1 if error else 0
+        next_run = self.next_run_after(job, failures, now)
+        with engine.begin() as conn:
+            conn.execute(update(jobs).where(jobs.c.id == job["id"]).values(
+                running_since=None, last_finished_at=now, last_status="failed" if error else "ok",
+                last_error=error, last_ads=ads, consecutive_failures=failures, next_run_at=next_run,
+            ))
+        if error:
+            print(f"[RETRY] {job['target']} failed {failures} time(s) in a row, next attempt at {next_run:%H:%M:%S} UTC")
+
+    def run_job(self, job: Dict[str, Any]) -> bool:
+        """Scrape, parse and import one job in its own output directory; returns True on success"""
+        target = job["target"]
+        url = build_target_url(target)
+        os.makedirs(self.work_dir, exist_ok=True)
+        output_dir = tempfile.mkdtemp(prefix=f"{target_slug(url)}-", dir=self.work_dir)
+        started = time.perf_counter()
+        try:
+            waited = self.rate_limiter.wait(urlparse(url).hostname or "")
+            if waited:
+                metrics.add_time("job_rate_limit_wait", waited)
+            with metrics.stage("job_scrape"):
+                output_file = self.backend.scrape(target, output_dir, job["max_ads"])
+            ads_data = load_ads_json(output_file)
+            with metrics.stage("job_import"):
+                counts = import_ads_bulk(ads_data)
+        except Exception as e:
+            metrics.incr("jobs_failed")
+            print(f"[FAILED] {target}: {e.__class__.__name__}: {e} (outputs kept in {output_dir})")
+            self._finish(job, f"{e.__class__.__name__}: {e}", None)
+            return False
+
+        metrics.incr("jobs_ok")
+        print(f"[DONE] {target} - {len(ads_data)} ads ({counts['imported']} new, {counts['updated']} changed, "
+              f"{counts['unchanged']} unchanged, {counts['errors']} errors) in {time.perf_counter() - started:.1f}s")
+        self._finish(job, None, len(ads_data))
+        if not self.keep_outputs:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        return True
+
+    def run(self, once: bool = False) -> None:
+        """
+        Run the scheduling loop until stop() (or SIGINT/SIGTERM)
+
+        Args:
+            once: Run the jobs that are due now, wait for them and return
+        """
+        active: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scrape-job") as executor:
+            while not self._stop.is_set():
+                for future in [f for f in active if f.done()]:
+                    del active[future]
+
+                free = self.workers - len(active)
+                claimed = self.claim_due_jobs(free) if free > 0 else []
+                for job in claimed:
+                    print(f"[START] {job['target']} (priority {job['priority']})")
+                    active[executor.submit(self.run_job, job)] = job["target"]
+
+                if once and not claimed and not active:
+                    break
+                self._stop.wait(0.2 if once else self.poll_interval)
+
+            if active:
+                print(f"Waiting for {len(active)} running job(s) to finish...")
+
+
+def add_job(target: str, interval_minutes: int, priority: int = 0, max_ads: Optional[int] = None) -> None:
+    """Create a job, or update the schedule of an existing one for the same target"""
+    jobs = ScrapeJob.__table__
+    with engine.begin() as conn:
+        existing = conn.execute(select(jobs.c.id).where(jobs.c.target == target)).first()
+        values = {"interval_minutes": interval_minutes, "priority": priority, "max_ads": max_ads, "enabled": True}
+        if existing:
+            conn.execute(update(jobs).where(jobs.c.id == existing.id).values(**values))
+            print(f"Updated job {target}")
+        else:
+            conn.execute(jobs.insert().values(target=target, **values))
+            print(f"Added job {target}")
+
+
+def remove_job(target: str) -> None:
+    jobs = ScrapeJob.__table__
+    with engine.begin() as conn:
+        removed = conn.execute(delete(jobs).where(jobs.c.target == target)).rowcount
+    print(f"Removed job {target}" if removed else f"No job for {target}")
+
+
+def list_jobs() -> None:
+    jobs = ScrapeJob.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(select(jobs).order_by(jobs.c.priority.desc(), jobs.c.next_run_at)).mappings().all()
+    if not rows:
+        print("No jobs")
+        return
+    print(f"{'target':<40} {'every':>7} {'prio':>5} {'next run (UTC)':<20} {'last':<8} {'ads':>6} {'fails':>5}")
+    for job in rows:
+        next_run = f"{job['next_run_at']:%Y-%m-%d %H:%M:%S}" if job["next_run_at"] else "now"
+        if job["running_since"]:
+            next_run = "running"
+        print(f"{job['target'][:40]:<40} {job['interval_minutes']:>6}m {job['priority']:>5} {next_run:<20} "
+              f"{job['last_status'] or '-':<8} {job['last_ads'] if job['last_ads'] is not None else '-':>6} "
+              f"{job['consecutive_failures']:>5}")
+
+
+def build_backend(args: argparse.Namespace):
+    if args.backend == "fake":
+        from fixtures.fake_scraper import FakeScraperBackend
+        return FakeScraperBackend(delay=args.fake_delay, failure_rate=args.fake_failure_rate)
+    return BrowserBackend(browser_profile=args.browser_profile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schedule recurring scrape-and-import jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Add or update a job")
+    add.add_argument("target", help="Advertiser page ID or Ads Library URL")
+    add.add_argument("--interval", type=int, default=1440, help="Minutes between runs (default: 1440)")
+    add.add_argument("--priority", type=int, default=0, help="Higher runs first when several jobs are due")
+    add.add_argument("--max-ads", type=int, help="Stop each scrape after this many ads")
+
+    remove = commands.add_parser("remove", help="Delete a job")
+    remove.add_argument("target")
+
+    commands.add_parser("list", help="Show jobs and their last results")
+
+    run = commands.add_parser("run", help="Run the scheduler")
+    run.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Jobs running at the same time")
+    run.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between checks for due jobs")
+    run.add_argument("--domain-interval", type=float, default=DEFAULT_DOMAIN_INTERVAL,
+                     help="Minimum seconds between scrape starts against one domain")
+    run.add_argument("--jitter", type=float, default=DEFAULT_JITTER, help="Random +/- share of the interval")
+    run.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="Seconds before the first retry")
+    run.add_argument("--lease", type=int, default=DEFAULT_LEASE_MINUTES,
+                     help="Minutes after which a run that never finished is considered dead")
+    run.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    run.add_argument("--keep-outputs", action="store_true", help="Keep each run's output directory")
+    run.add_argument("--once", action="store_true", help="Run the due jobs once and exit")
+    run.add_argument("--backend", choices=["browser", "fake"], default="browser")
+    run.add_argument("--browser-profile", choices=["full", "capture"], default=None)
+    run.add_argument("--fake-delay", type=float, default=0.5)
+    run.add_argument("--fake-failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "add":
+        add_job(args.target, args.interval, args.priority, args.max_ads)
+    elif args.command == "remove":
+        remove_job(args.target)
+    elif args.command == "list":
+        list_jobs()
+    else:
+        scheduler = Scheduler(build_backend(args), workers=args.workers, poll_interval=args.poll,
+                              domain_interval=args.domain_interval, jitter=args.jitter, backoff=args.backoff,
+                              lease_minutes=args.lease, work_dir=args.work_dir, keep_outputs=args.keep_outputs)
+        signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        print(f"Scheduler running with {scheduler.workers} workers ({args.backend} backend)")
+        scheduler.run(once=args.once)
+        print(metrics.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Resumable scrape checkpoints
+
+Captured GraphQL responses are appended to the NDJSON capture file as they
+arrive. The checkpoint file records how far that capture got: the ad IDs
+seen so far, the last search_results_connection end cursor and the number
+of captured responses. It is rewritten every few responses and when the
+run ends (also on errors), always atomically.
+
+With --resume the scraper appends to the same capture file and:
+- replay mode continues paging from the saved cursor
+- scroll mode reloads the page (the DOM cannot jump to a cursor) but skips
+  ads that were already seen, and only counts new ones towards --max-ads
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Set
+from graphql_parser import get_search_results, iter_collated_results
+
+CHECKPOINT_FILE = "scrape_checkpoint.json"
+DEFAULT_CHECKPOINT_EVERY = 5
+
+
+class ScrapeCheckpoint:
+    """Progress of a (possibly resumed) page sweep, saved to a JSON state file"""
+
+    def __init__(self, file_path: str, url: str, responses_file: str,
+                 every: int = DEFAULT_CHECKPOINT_EVERY):
+        self.file_path = file_path
+        self.url = url
+        self.responses_file = responses_file
+        self.every = max(1, every)
+        self.seen_ad_ids: Set[str] = set()
+        self.end_cursor: Optional[str] = None
+        self.has_next_page: Optional[bool] = None
+        self.responses = 0
+        self.runs = 1
+        self._unsaved = 0
+
+    @classmethod
+    def load(cls, file_path: str, url: str, responses_file: str,
+             every: int = DEFAULT_CHECKPOINT_EVERY) -> "ScrapeCheckpoint":
+        """Load the checkpoint of an interrupted sweep of the same URL"""
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("url") != url:
+            raise ValueError(f"Checkpoint {file_path} belongs to {data.get('url')}, not {url}")
+        checkpoint = cls(file_path, url, data.get("responses_file") or responses_file, every)
+        checkpoint.seen_ad_ids = set(data.get("seen_ad_ids") or [])
+        checkpoint.end_cursor = data.get("end_cursor")
+        checkpoint.has_next_page = data.get("has_next_page")
+        checkpoint.responses = data.get("responses", 0)
+        checkpoint.runs = data.get("runs", 0) + 1
+        return checkpoint
+
+    @property
+    def complete(self) -> bool:
+        """True once the last captured page reported no further results"""
+        return self.has_next_page is False
+
+    def record_response(self, response_obj: Dict[str, Any]) -> None:
+        """Account for one captured response ({"url": ..., "data": ...}); saves every `every` responses"""
+        new_ads = 0
+        for result in iter_collated_results(response_obj):
+            # Same rule as ScrollTracker: results the parser keeps have an ID and cards
+            ad_id = result.get("ad_archive_id")
+            if ad_id and (result.get("snapshot") or {}).get("cards") and str(ad_id) not in self.seen_ad_ids:
+                self.seen_ad_ids.add(str(ad_id))
+                new_ads += 1
+
+        # A resumed scroll run re-reads the first pages; those must not move the cursor back
+        page_info = get_search_results(response_obj).get("page_info")
+        if page_info and (new_ads or not page_info.get("has_next_page")):
+            self.has_next_page = bool(page_info.get("has_next_page"))
+            self.end_cursor = page_info.get("end_cursor")
+        self.responses += 1
+        self._unsaved += 1
+        if self._unsaved >= self.every:
+            self.save()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "responses_file": self.responses_file,
+            "responses": self.responses,
+            "end_cursor": self.end_cursor,
+            "has_next_page": self.has_next_page,
+            "runs": self.runs,
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "seen_ad_ids": sorted(self.seen_ad_ids),
+        }
+
+    def save(self) -> None:
+        """Write the state file atomically (a crash mid-write keeps the previous one)"""
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, self.file_path)
+        self._unsaved = 0
+
+    def summary(self) -> str:
+        state = "complete" if self.complete else f"next cursor {self.end_cursor!r}"
+        return (f"{len(self.seen_ad_ids)} ads seen in {self.responses} responses over {self.runs} run(s), "
+                f"{state}")
@@ -1,31 +1,142 @@
 """
 Enhanced scraper that captures GraphQL responses and extracts ad data
 """
+import argparse
+import itertools
 import os
 import json
 import time
+from typing import Any, Callable, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
-from graphql_parser import parse_graphql_responses
+from browser_profile import DEFAULT_PROFILE, PROFILES, launch_options, new_context, save_storage_state
+from capture_pipeline import CapturePipeline, CollectSink, DatabaseSink, JsonLinesSink
+from capture_archive import ArchiveWriter
+from capture_store import CaptureWriter
+from json_backend import get_backend
+from ad_records import ParsedAd, to_json
+from graphql_parser import parse_graphql_file, parse_graphql_responses
+from instrumentation import instrumented_run, metrics
+from scrape_checkpoint import CHECKPOINT_FILE, DEFAULT_CHECKPOINT_EVERY, ScrapeCheckpoint
+from scroll_control import (
+    ScrollTracker, DEFAULT_MAX_IDLE_SCROLLS, DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_INITIAL_TIMEOUT, DEFAULT_MAX_SCROLLS, POLL_INTERVAL,
+)
 
 load_dotenv()
 
 ADS_LIBRARY_URL = os.getenv("ADS_LIBRARY_URL") or "https://www.facebook.com/ads/library/?active_status=all&ad_type=all&country=US&is_targeted_country=false&media_type=all&search_type=page&view_all_page_id=15087023444"
 
 OUTPUT_FILE = "scraped_ads.json"
-GRAPHQL_RESPONSES_FILE = "graphql_responses.json"
+GRAPHQL_RESPONSES_FILE = "graphql_responses.ndjson"
+ADS_JSONL_FILE = "scraped_ads.jsonl"
+
+
+def build_target_url(target: str) -> str:
+    """Turn an advertiser page ID into an Ads Library URL (URLs pass through)"""
+    if target.startswith(("http://", "https://")):
+        return target
+    parsed = urlparse(ADS_LIBRARY_URL)
+    query = parse_qs(parsed.query)
+    query["view_all_page_id"] = [target]
+    return urlunparse(parsed._replace(query=urlencode(query, doseq=True)))
+
+
+def save_scraped_ads(ads: List[ParsedAd], output_file: str = OUTPUT_FILE) -> None:
+    """Write parsed ads in the scraped_ads.json format expected by the importer"""
+    output_data = {
+        "total_ads": len(ads),
+        "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "ads": ads
+    }
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(output_data, f, indent=2, ensure_ascii=False, default=to_json)
+
+
+def wait_for_capture(page, tracker: ScrollTracker, responses_before: int, timeout: float) -> bool:
+    """Wait until a new GraphQL response was captured or the timeout passes"""
+    deadline = time.perf_counter() + timeout
+    while tracker.responses <= responses_before:
+        if time.perf_counter() >= deadline:
+            return False
+        # Waiting through Playwright lets the response handlers run
+        page.wait_for_timeout(POLL_INTERVAL * 1000)
+    return True
+
+
+def scroll_until_done(page, tracker: ScrollTracker, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                      stop_check: Optional[Callable[[], Optional[str]]] = None) -> str:
+    """Scroll the infinite list until the tracker (or stop_check) says to stop; returns the reason"""
+    while True:
+        reason = tracker.stop_reason() or (stop_check() if stop_check else None)
+        if reason:
+            return reason
+
+        ads_before = tracker.ad_count
+        responses_before = tracker.responses
+        with metrics.stage("scroll"):
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        with metrics.stage("scroll_wait"):
+            wait_for_capture(page, tracker, responses_before, idle_timeout)
+        tracker.record_scroll(ads_before)
+
+        if tracker.scrolls % 5 == 0:
+            print(f"Scrolled {tracker.scrolls} times, {tracker.ad_count} ads so far...")
+
+
+def build_sinks(sink_names: List[str], append: bool = False) -> List[Any]:
+    """Create the extra output sinks requested on the command line (append: resuming a checkpoint)"""
+    sinks = []
+    for name in sink_names:
+        if name == "jsonl":
+            sinks.append(JsonLinesSink(ADS_JSONL_FILE, append=append))
+        elif name == "db":
+            sinks.append(DatabaseSink())
+        else:
+            raise ValueError(f"Unknown sink: {name}")
+    return sinks
+
+
+def open_checkpoint(url: str, resume: bool = False, checkpoint_file: str = CHECKPOINT_FILE,
+                    every: int = DEFAULT_CHECKPOINT_EVERY) -> ScrapeCheckpoint:
+    """Load the checkpoint to resume from, or start a new one"""
+    if resume and os.path.exists(checkpoint_file):
+        checkpoint = ScrapeCheckpoint.load(checkpoint_file, url, GRAPHQL_RESPONSES_FILE, every)
+        print(f"Resuming from {checkpoint_file}: {checkpoint.summary()}")
+        return checkpoint
+    if resume:
+        print(f"No checkpoint at {checkpoint_file}, starting from the top")
+    return ScrapeCheckpoint(checkpoint_file, url, GRAPHQL_RESPONSES_FILE, every)
+
+
+def run_scraper(max_ads: int = 50, max_idle_scrolls: int = DEFAULT_MAX_IDLE_SCROLLS,
+                idle_timeout: float = DEFAULT_IDLE_TIMEOUT, max_scrolls: int = DEFAULT_MAX_SCROLLS,
+                sinks: Optional[List[str]] = None, browser_profile: str = DEFAULT_PROFILE,
+                resume: bool = False, checkpoint_file: str = CHECKPOINT_FILE,
+                checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY, archive_file: Optional[str] = None):
+    checkpoint = open_checkpoint(ADS_LIBRARY_URL, resume, checkpoint_file, checkpoint_every)
+    resumed = checkpoint.runs > 1
+    responses_file = checkpoint.responses_file
 
-def run_scraper():
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
+        browser = p.chromium.launch(**launch_options(browser_profile))
+        context, blocker = new_context(browser, browser_profile, page_url=ADS_LIBRARY_URL)
         page = context.new_page()
         
-        # List to collect GraphQL responses
-        captured_responses = []
+        # Append GraphQL responses to disk as they arrive (to the previous capture when resuming)
+        # and, with --archive, to the compressed capture archive as well
+        archive = ArchiveWriter(archive_file) if archive_file else None
+        capture_writer = CaptureWriter(responses_file, append=resumed, archive=archive)
+        tracker = ScrollTracker(max_idle_scrolls=max_idle_scrolls, max_scrolls=max_scrolls)
+        json_codec = get_backend()
+        
+        # Parse and dedupe ads on a worker thread while scrolling continues
+        collected = CollectSink()
+        # A resumed run skips the ads seen before and counts only new ones towards max_ads
+        pipeline = CapturePipeline([collected] + build_sinks(sinks or [], append=resumed), max_ads=max_ads,
+                                   seen_ad_ids=checkpoint.seen_ad_ids if resumed else None).start()
         
         def handle_response(response):
             try:
@@ -33,60 +144,187 @@ def run_scraper():
                 # Capture GraphQL responses
                 if "/api/graphql/" in url:
                     try:
-                        body = response.body()
+                        with metrics.stage("response_body"):
+                            body = response.body()
                         if body:
-                            data = json.loads(body.decode('utf-8', errors='ignore'))
-                            captured_responses.append({
-                                "url": url,
-                                "data": data
-                            })
-                            print(f"[CAPTURED] GraphQL response")
+                            metrics.incr("responses_captured")
+                            metrics.incr("bytes_captured", len(body))
+                            with metrics.stage("json_decode"):
+                                data = json_codec.loads(body.decode('utf-8', errors='ignore'))
+                            with metrics.stage("capture_write"):
+                                capture_writer.write(url, data)
+                            response_obj = {"url": url, "data": data}
+                            tracker.record_response(response_obj)
+                            checkpoint.record_response(response_obj)
+                            # Blocks while the parse queue is full (backpressure)
+                            with metrics.stage("pipeline_submit"):
+                                pipeline.submit(response_obj)
+                            print(f"[CAPTURED] GraphQL response ({pipeline.counters})")
                     except:
-                        pass
+                        metrics.incr("capture_errors")
             except:
                 pass
         
         page.on("response", handle_response)
         
         print(f"Opening Ads Library: {ADS_LIBRARY_URL}")
-        page.goto(ADS_LIBRARY_URL, timeout=120000, wait_until="networkidle")
-        
-        print("Waiting for initial load...")
-        time.sleep(5)
+        try:
+            with metrics.stage("goto"):
+                page.goto(ADS_LIBRARY_URL, timeout=120000, wait_until="networkidle")
+            
+            if not tracker.ad_count:
+                print("Waiting for initial results...")
+                with metrics.stage("initial_wait"):
+                    wait_for_capture(page, tracker, tracker.responses, DEFAULT_INITIAL_TIMEOUT)
+            
+            # Scroll to load more ads (infinite scroll) until the results run out
+            print("Scrolling to load ads...")
+            reason = scroll_until_done(
+                page, tracker, idle_timeout,
+                stop_check=lambda: f"reached {max_ads} ads" if pipeline.done else None,
+            )
+        finally:
+            # Also on crashes and rate limiting: flush what was captured and parsed so far,
+            # then checkpoint it so --resume can pick up from here
+            with metrics.stage("pipeline_drain"):
+                pipeline.close()
+            capture_writer.close()
+            if archive:
+                archive.close()
+            checkpoint.save()
+        print(f"Stopped scrolling: {reason}")
+        print(f"Checkpoint: {checkpoint.summary()}")
+        print(tracker.report())
+        if blocker:
+            print(f"Capture profile: {blocker.report()}")
+            metrics.incr("requests_blocked", sum(blocker.blocked.values()))
         
-        # Scroll to load more ads (infinite scroll)
-        print("Scrolling to load ads...")
-        for i in range(15):
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            time.sleep(2)
-            if i % 3 == 0:
-                print(f"Scrolled {i+1}/15 times...")
-        
-        print(f"\nCaptured {len(captured_responses)} GraphQL responses")
-        
-        # Save raw responses
-        with open(GRAPHQL_RESPONSES_FILE, "w", encoding="utf-8") as f:
-            json.dump(captured_responses, f, indent=2, ensure_ascii=False)
-        print(f"Saved GraphQL responses to {GRAPHQL_RESPONSES_FILE}")
-        
-        # Parse GraphQL responses to extract ad data
-        print("\nParsing GraphQL responses to extract ad data...")
-        ads = parse_graphql_responses(captured_responses, max_ads=50)
+        save_storage_state(context, browser_profile)
+        browser.close()
+        print(f"\nCaptured {capture_writer.count} GraphQL responses")
+        print(f"Saved GraphQL responses to {responses_file}")
+        if archive:
+            print(f"Archived {archive.count} responses to {archive_file}")
+        print(f"Pipeline: {pipeline.counters}")
+        metrics.incr("scrolls", tracker.scrolls)
+        if resumed:
+            # The output covers the whole sweep, including the ads of earlier runs; parsing it
+            # counts every ad once, so the pipeline's counts of this run are not added on top
+            ads = parse_graphql_file(responses_file, max_ads=None)
+        else:
+            counters = pipeline.counters.snapshot()
+            metrics.incr("ads_parsed", counters["parsed"])
+            metrics.incr("duplicates", counters["duplicates"])
+            metrics.incr("invalid_results", counters["skipped"] + counters["failed"])
+            ads = collected.ads
         
         # Save results
-        output_data = {
-            "total_ads": len(ads),
-            "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "ads": ads
-        }
-        
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        with metrics.stage("save_output"):
+            save_scraped_ads(ads, OUTPUT_FILE)
         
         print(f"\nSuccessfully extracted {len(ads)} ads")
         print(f"Saved to {OUTPUT_FILE}")
-        
-        browser.close()
+
+def run_replay(max_ads: int = 50, url: str = ADS_LIBRARY_URL, resume: bool = False,
+               checkpoint_file: str = CHECKPOINT_FILE, checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+               archive_file: Optional[str] = None):
+    """Capture the first results request in the browser, then page by cursor over HTTP"""
+    from graphql_replay import HttpPool, capture_replay_session, replay_pages
+
+    checkpoint = open_checkpoint(url, resume, checkpoint_file, checkpoint_every)
+    resumed = checkpoint.runs > 1
+    responses_file = checkpoint.responses_file
+    if resumed and checkpoint.complete:
+        print("The checkpointed sweep already reached the end of the results")
+        ads = parse_graphql_file(responses_file, max_ads=None)
+        save_scraped_ads(ads, OUTPUT_FILE)
+        print(f"Saved {len(ads)} ads to {OUTPUT_FILE}")
+        return
+
+    print(f"Capturing GraphQL session from: {url}")
+    with metrics.stage("capture_session"):
+        session, first_response = capture_replay_session(url)
+    print(f"Captured session (doc_id={session.form.get('doc_id')}), replaying pages by cursor...")
+
+    tracker = ScrollTracker(max_ads=max_ads)
+    pool = HttpPool()
+
+    archive = ArchiveWriter(archive_file) if archive_file else None
+    with CaptureWriter(responses_file, append=resumed, archive=archive) as capture_writer:
+        def captured_responses():
+            if resumed:
+                # The first page was captured by an earlier run; continue after the saved cursor
+                print(f"Continuing from cursor {checkpoint.end_cursor!r}")
+                pages = replay_pages(session, pool, cursor=checkpoint.end_cursor)
+            else:
+                pages = itertools.chain([first_response], replay_pages(session, pool))
+            for response_obj in pages:
+                metrics.incr("responses_captured")
+                with metrics.stage("capture_write"):
+                    capture_writer.write(response_obj["url"], response_obj["data"])
+                tracker.record_response(response_obj)
+                checkpoint.record_response(response_obj)
+                yield response_obj
+                if tracker.stop_reason():
+                    return
+
+        try:
+            if resumed:
+                for _ in captured_responses():
+                    pass
+            else:
+                ads = parse_graphql_responses(captured_responses(), max_ads=max_ads)
+        finally:
+            pool.close()
+            checkpoint.save()
+
+    if resumed:
+        ads = parse_graphql_file(responses_file, max_ads=None)
+
+    if archive:
+        archive.close()
+        print(f"Archived {archive.count} responses to {archive_file}")
+    metrics.incr("bytes_captured", capture_writer.bytes_written)
+    print(tracker.report())
+    print(f"Checkpoint: {checkpoint.summary()}")
+    print(f"Saved GraphQL responses to {responses_file}")
+
+    with metrics.stage("save_output"):
+        save_scraped_ads(ads, OUTPUT_FILE)
+    print(f"\nSuccessfully extracted {len(ads)} ads")
+    print(f"Saved to {OUTPUT_FILE}")
+
 
 if __name__ == "__main__":
-    run_scraper()
+    parser = argparse.ArgumentParser(description="Scrape ads from the Facebook Ads Library")
+    parser.add_argument("--mode", choices=["scroll", "replay"], default="scroll",
+                        help="scroll the page in the browser, or replay GraphQL pages by cursor over HTTP")
+    parser.add_argument("--max-ads", type=int, default=50, help="Stop after this many ads (default: 50)")
+    parser.add_argument("--max-idle-scrolls", type=int, default=DEFAULT_MAX_IDLE_SCROLLS,
+                        help="Stop after this many scrolls in a row bring no new ads")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help="Seconds to wait for a GraphQL response after each scroll")
+    parser.add_argument("--max-scrolls", type=int, default=DEFAULT_MAX_SCROLLS)
+    parser.add_argument("--sink", action="append", choices=["jsonl", "db"], default=[],
+                        help=f"Also stream parsed ads to {ADS_JSONL_FILE} (jsonl) or the database (db) while scrolling")
+    parser.add_argument("--browser-profile", choices=PROFILES, default=DEFAULT_PROFILE,
+                        help="capture: block media/fonts/CSS/third-party requests and reuse the saved session")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue the sweep saved in the checkpoint file (appends to {GRAPHQL_RESPONSES_FILE})")
+    parser.add_argument("--checkpoint-file", default=CHECKPOINT_FILE)
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                        help=f"Save the checkpoint every N captured responses (default: {DEFAULT_CHECKPOINT_EVERY})")
+    parser.add_argument("--archive", default=os.getenv("CAPTURE_ARCHIVE"),
+                        help="Also append responses to this zstd capture archive (.zca, needs zstandard)")
+    args = parser.parse_args()
+
+    checkpoint_options = {"resume": args.resume, "checkpoint_file": args.checkpoint_file,
+                          "checkpoint_every": args.checkpoint_every, "archive_file": args.archive}
+
+    with instrumented_run("scrape", mode=args.mode, max_ads=args.max_ads):
+        if args.mode == "replay":
+            run_replay(max_ads=args.max_ads, **checkpoint_options)
+        else:
+            run_scraper(max_ads=args.max_ads, max_idle_scrolls=args.max_idle_scrolls,
+                        idle_timeout=args.idle_timeout, max_scrolls=args.max_scrolls, sinks=args.sink,
+                        browser_profile=args.browser_profile, **checkpoint_options)
@@ -0,0 +1,248 @@
+"""
+Concurrent scraper for many advertiser pages sharing one browser
+
+Targets (page IDs or Ads Library URLs) run concurrently on the async
+Playwright API. One Chromium instance is reused with a fixed pool of
+browser contexts, and each target writes its own output directory.
+"""
+import argparse
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+from playwright.async_api import async_playwright
+from browser_profile import (
+    DEFAULT_PROFILE, PROFILES, launch_options, new_context_async, save_storage_state_async,
+)
+from capture_archive import ArchiveWriter
+from capture_store import CaptureWriter
+from json_backend import get_backend
+from graphql_parser import iter_ads, iter_graphql_responses
+from scrape_graphql import build_target_url, save_scraped_ads
+from scroll_control import (
+    ScrollTracker, DEFAULT_MAX_IDLE_SCROLLS, DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_INITIAL_TIMEOUT, DEFAULT_MAX_SCROLLS, POLL_INTERVAL,
+)
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_CONTEXTS = 2
+DEFAULT_OUTPUT_DIR = "scrape_output"
+
+
+def target_slug(target: str) -> str:
+    """Directory name for a target (page ID when available)"""
+    match = re.search(r"view_all_page_id=(\d+)", target)
+    if match:
+        return match.group(1)
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", target).strip("_")[:100] or "target"
+
+
+class ContextPool:
+    """Fixed set of browser contexts handed out to the least busy caller"""
+
+    def __init__(self, contexts: List[Any]):
+        self._load = {context: 0 for context in contexts}
+
+    def acquire(self):
+        context = min(self._load, key=self._load.get)
+        self._load[context] += 1
+        return context
+
+    def release(self, context) -> None:
+        self._load[context] -= 1
+
+    async def close(self) -> None:
+        for context in self._load:
+            await context.close()
+
+
+async def wait_for_capture(tracker: ScrollTracker, responses_before: int, timeout: float) -> bool:
+    """Wait until a new GraphQL response was captured or the timeout passes"""
+    deadline = time.perf_counter() + timeout
+    while tracker.responses <= responses_before:
+        if time.perf_counter() >= deadline:
+            return False
+        await asyncio.sleep(POLL_INTERVAL)
+    return True
+
+
+async def scroll_until_done(page, tracker: ScrollTracker, idle_timeout: float) -> str:
+    """Scroll the infinite list until the tracker says to stop; returns the reason"""
+    while True:
+        reason = tracker.stop_reason()
+        if reason:
+            return reason
+
+        ads_before = tracker.ad_count
+        responses_before = tracker.responses
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        await wait_for_capture(tracker, responses_before, idle_timeout)
+        tracker.record_scroll(ads_before)
+
+
+async def scrape_target(pool: ContextPool, target: str, output_dir: str, max_ads: int = 50,
+                        max_idle_scrolls: int = DEFAULT_MAX_IDLE_SCROLLS,
+                        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                        max_scrolls: int = DEFAULT_MAX_SCROLLS,
+                        archive: Optional[ArchiveWriter] = None) -> Dict[str, Any]:
+    """Scrape one advertiser page into its own output directory (and the shared archive, if any)"""
+    url = build_target_url(target)
+    target_dir = os.path.join(output_dir, target_slug(url))
+    os.makedirs(target_dir, exist_ok=True)
+    responses_file = os.path.join(target_dir, "graphql_responses.ndjson")
+    output_file = os.path.join(target_dir, "scraped_ads.json")
+
+    started = time.perf_counter()
+    context = pool.acquire()
+    page = await context.new_page()
+    capture_writer = CaptureWriter(responses_file, archive=archive)
+    tracker = ScrollTracker(max_ads=max_ads, max_idle_scrolls=max_idle_scrolls, max_scrolls=max_scrolls)
+    json_codec = get_backend()
+
+    async def handle_response(response):
+        try:
+            if "/api/graphql/" in response.url:
+                body = await response.body()
+                if body:
+                    data = json_codec.loads(body.decode("utf-8", errors="ignore"))
+                    capture_writer.write(response.url, data)
+                    tracker.record_response({"url": response.url, "data": data})
+        except Exception:
+            pass
+
+    page.on("response", handle_response)
+
+    try:
+        await page.goto(url, timeout=120000, wait_until="networkidle")
+        if not tracker.ad_count:
+            await wait_for_capture(tracker, tracker.responses, DEFAULT_INITIAL_TIMEOUT)
+        reason = await scroll_until_done(page, tracker, idle_timeout)
+    finally:
+        await page.close()
+        pool.release(context)
+        capture_writer.close()
+
+    ads = list(iter_ads(iter_graphql_responses(responses_file), max_ads=max_ads))
+    save_scraped_ads(ads, output_file)
+
+    elapsed = time.perf_counter() - started
+    print(f"[DONE] {url} - {capture_writer.count} responses, {len(ads)} ads in {elapsed:.1f}s ({reason})")
+    print(tracker.report())
+    return {"target": target, "output_file": output_file, "responses": capture_writer.count,
+            "ads": len(ads), "seconds": elapsed, "stop_reason": reason,
+            "time_to_ads": dict(tracker.milestones)}
+
+
+async def scrape_targets(targets: List[str], output_dir: str = DEFAULT_OUTPUT_DIR,
+                         concurrency: int = DEFAULT_CONCURRENCY, contexts: int = DEFAULT_CONTEXTS,
+                         browser_profile: str = DEFAULT_PROFILE, **scrape_options) -> List[Dict[str, Any]]:
+    """
+    Scrape many targets concurrently with one shared browser
+
+    Args:
+        targets: Advertiser page IDs or Ads Library URLs
+        output_dir: Directory receiving one sub-directory per target
+        concurrency: Maximum number of pages open at the same time
+        contexts: Number of browser contexts the pages are spread across
+        browser_profile: "full" or "capture" (see browser_profile.py)
+        **scrape_options: Passed through to scrape_target (max_ads, idle_timeout, ...)
+
+    Returns:
+        One summary dict per target (failed targets include an "error")
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(**launch_options(browser_profile))
+        page_url = build_target_url(targets[0]) if targets else None
+        opened = [
+            await new_context_async(browser, browser_profile, page_url=page_url)
+            for _ in range(max(1, min(contexts, concurrency)))
+        ]
+        pool = ContextPool([context for context, _ in opened])
+
+        async def run_one(target: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await scrape_target(pool, target, output_dir, **scrape_options)
+                except Exception as e:
+                    print(f"[ERROR] {target}: {e}")
+                    return {"target": target, "error": str(e)}
+
+        try:
+            return await asyncio.gather(*(run_one(target) for target in targets))
+        finally:
+            blockers = [blocker for _, blocker in opened if blocker]
+            if blockers:
+                blocked = sum(sum(blocker.blocked.values()) for blocker in blockers)
+                allowed = sum(blocker.allowed for blocker in blockers)
+                print(f"Capture profile: {allowed} requests allowed, {blocked} blocked")
+            await save_storage_state_async(opened[0][0], browser_profile)
+            await pool.close()
+            await browser.close()
+
+
+def read_targets(args_targets: List[str], targets_file: Optional[str]) -> List[str]:
+    """Collect targets from the command line and an optional file (one per line)"""
+    targets = list(args_targets)
+    if targets_file:
+        with open(targets_file, "r", encoding="utf-8") as f:
+            targets.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape many advertiser pages concurrently")
+    parser.add_argument("targets", nargs="*", help="Advertiser page IDs or Ads Library URLs")
+    parser.add_argument("--targets-file", help="File with one page ID or URL per line")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Pages scraped at the same time (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--contexts", type=int, default=DEFAULT_CONTEXTS,
+                        help=f"Browser contexts in the pool (default: {DEFAULT_CONTEXTS})")
+    parser.add_argument("--max-ads", type=int, default=50)
+    parser.add_argument("--max-idle-scrolls", type=int, default=DEFAULT_MAX_IDLE_SCROLLS)
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT)
+    parser.add_argument("--fixture", action="store_true",
+                        help="Scrape the local fixture server instead of Facebook")
+    parser.add_argument("--browser-profile", choices=PROFILES, default=DEFAULT_PROFILE,
+                        help="capture: block media/fonts/CSS/third-party requests and reuse the saved session")
+    parser.add_argument("--archive", default=os.getenv("CAPTURE_ARCHIVE"),
+                        help="Also append every target's responses to this zstd capture archive (.zca)")
+    args = parser.parse_args()
+
+    targets = read_targets(args.targets, args.targets_file)
+    if not targets:
+        parser.error("no targets given")
+
+    scrape_options = {"max_ads": args.max_ads, "max_idle_scrolls": args.max_idle_scrolls,
+                      "idle_timeout": args.idle_timeout}
+    archive = ArchiveWriter(args.archive) if args.archive else None
+    if archive:
+        scrape_options["archive"] = archive
+    fixture = None
+    if args.fixture:
+        from fixtures.server import FixtureServer
+        fixture = FixtureServer().start()
+        targets = [fixture.library_url(target_slug(build_target_url(t))) for t in targets]
+
+    started = time.perf_counter()
+    try:
+        results = asyncio.run(scrape_targets(targets, args.output_dir, args.concurrency,
+                                             args.contexts, args.browser_profile, **scrape_options))
+    finally:
+        if fixture:
+            fixture.stop()
+        if archive:
+            archive.close()
+            print(f"Archived {archive.count} responses to {args.archive}")
+
+    failed = [r for r in results if "error" in r]
+    total_ads = sum(r.get("ads", 0) for r in results)
+    print(f"\nScraped {len(results) - len(failed)}/{len(results)} targets, "
+          f"{total_ads} ads in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Capture-driven scroll termination for the Ads Library infinite scroll
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from graphql_parser import get_search_results, iter_collated_results
+
+DEFAULT_MAX_IDLE_SCROLLS = 3
+DEFAULT_IDLE_TIMEOUT = 4.0
+DEFAULT_INITIAL_TIMEOUT = 15.0
+DEFAULT_MAX_SCROLLS = 500
+POLL_INTERVAL = 0.1
+
+# Ad counts reported in the time-to-N-ads summary
+AD_MILESTONES = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class ScrollTracker:
+    """
+    Follows captured GraphQL responses and decides when to stop scrolling
+
+    Scrolling stops when search_results_connection reports no next page,
+    when max_ads unique ads were seen, when max_idle_scrolls scrolls in a row
+    brought no new ads, or after max_scrolls scrolls as a safety net.
+    """
+
+    def __init__(self, max_ads: Optional[int] = None, max_idle_scrolls: int = DEFAULT_MAX_IDLE_SCROLLS,
+                 max_scrolls: int = DEFAULT_MAX_SCROLLS):
+        self.max_ads = max_ads
+        self.max_idle_scrolls = max_idle_scrolls
+        self.max_scrolls = max_scrolls
+        self.started_at = time.perf_counter()
+        self.responses = 0
+        self.ad_ids = set()
+        self.has_next_page: Optional[bool] = None
+        self.end_cursor: Optional[str] = None
+        self.scrolls = 0
+        self.idle_scrolls = 0
+        self.milestones: List[Tuple[int, float]] = []
+
+    @property
+    def ad_count(self) -> int:
+        return len(self.ad_ids)
+
+    def record_response(self, response_obj: Dict[str, Any]) -> None:
+        """Account for one captured response ({"url": ..., "data": ...})"""
+        self.responses += 1
+
+        search_results = get_search_results(response_obj)
+        page_info = search_results.get("page_info")
+        if page_info:
+            self.has_next_page = bool(page_info.get("has_next_page"))
+            self.end_cursor = page_info.get("end_cursor")
+
+        for result in iter_collated_results(response_obj):
+            # Count only results the parser keeps (an ID and at least one card)
+            ad_id = result.get("ad_archive_id")
+            if ad_id and (result.get("snapshot") or {}).get("cards"):
+                self.ad_ids.add(str(ad_id))
+
+        elapsed = time.perf_counter() - self.started_at
+        reached = self.milestones[-1][0] if self.milestones else 0
+        for milestone in AD_MILESTONES:
+            if reached < milestone <= self.ad_count:
+                self.milestones.append((milestone, elapsed))
+
+    def record_scroll(self, ads_before: int) -> None:
+        """Account for one scroll, given the ad count before it"""
+        self.scrolls += 1
+        if self.ad_count > ads_before:
+            self.idle_scrolls = 0
+        else:
+            self.idle_scrolls += 1
+
+    def stop_reason(self) -> Optional[str]:
+        """Why scrolling should stop, or None to keep going"""
+        if self.has_next_page is False:
+            return "end of results"
+        if self.max_ads is not None and self.ad_count >= self.max_ads:
+            return f"reached {self.max_ads} ads"
+        if self.idle_scrolls >= self.max_idle_scrolls:
+            return f"{self.idle_scrolls} scrolls without new ads"
+        if self.scrolls >= self.max_scrolls:
+            return f"reached {self.max_scrolls} scrolls"
+        return None
+
+    def report(self) -> str:
+        """Human readable summary including time-to-N-ads"""
+        elapsed = time.perf_counter() - self.started_at
+        lines = [f"{self.ad_count} ads from {self.responses} responses after "
+                 f"{self.scrolls} scrolls in {elapsed:.1f}s"]
+        for milestone, seconds in self.milestones:
+            lines.append(f"  Time to {milestone} ads: {seconds:.1f}s")
+        return "\n".join(lines)
@@ -0,0 +1,46 @@
+"""
+Shared test setup
+
+Tests import the scraper modules from src/ like the scripts do. Unless
+DATABASE_URL is set, they run against a temporary SQLite database (set
+before database.connection is imported, so .env does not apply), removed
+with its WAL files when the session ends.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+
+_scratch_dir = None
+if not os.getenv("DATABASE_URL"):
+    _scratch_dir = tempfile.mkdtemp(prefix="ads_scraper_tests_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch_dir, 'test.db')}"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if _scratch_dir:
+        # Close the pooled connections first, so the files can be removed (also on Windows)
+        connection = sys.modules.get("database.connection")
+        if connection:
+            connection.engine.dispose()
+        shutil.rmtree(_scratch_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def db():
+    """Empty schema (tables and search index) on the test database; yields the engine"""
+    from sqlalchemy import text
+    from database import search
+    from database.connection import Base, engine, init_db
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.execute(text(f"DROP TABLE IF EXISTS {search.FTS_TABLE}"))
+    Base.metadata.drop_all(engine)
+    init_db()
+    yield engine
@@ -0,0 +1,52 @@
+"""Capture pipeline: sinks and resumed runs"""
+import json
+
+from capture_pipeline import CapturePipeline, CollectSink, JsonLinesSink
+from fixtures.server import DEFAULT_PAGE_ID, FixtureServer
+
+
+def write_ads(path, ad_ids, append):
+    sink = JsonLinesSink(str(path), append=append)
+    for ad_id in ad_ids:
+        sink.write({"ad_id": ad_id})
+    sink.close()
+
+
+def read_ad_ids(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["ad_id"] for line in f]
+
+
+def test_jsonl_sink_appends_when_resuming(tmp_path):
+    path = tmp_path / "scraped_ads.jsonl"
+    write_ads(path, ["1", "2"], append=False)
+    write_ads(path, ["3"], append=True)
+    assert read_ad_ids(path) == ["1", "2", "3"]
+
+
+def test_jsonl_sink_starts_over_on_a_new_sweep(tmp_path):
+    path = tmp_path / "scraped_ads.jsonl"
+    write_ads(path, ["1", "2"], append=False)
+    write_ads(path, ["3"], append=False)
+    assert read_ad_ids(path) == ["3"]
+
+
+def run_pipeline(responses, seen_ad_ids=None):
+    collected = CollectSink()
+    with CapturePipeline([collected], seen_ad_ids=seen_ad_ids) as pipeline:
+        for response_obj in responses:
+            pipeline.submit(response_obj)
+    return [ad.ad_id for ad in collected.ads], pipeline.counters.snapshot()
+
+
+def test_resumed_pipeline_skips_the_ads_of_earlier_runs_before_counting():
+    with FixtureServer() as server:
+        first, second = ({"url": "", "data": server.graphql_page(DEFAULT_PAGE_ID, cursor)} for cursor in ("0", "1"))
+    earlier_ids, earlier = run_pipeline([first])
+
+    # A resumed scroll reloads the first page before reaching new results
+    ad_ids, counters = run_pipeline([first, second, second], seen_ad_ids=set(earlier_ids))
+    assert ad_ids and not set(ad_ids) & set(earlier_ids)
+    assert counters["parsed"] == len(ad_ids)
+    assert counters["reloaded"] == len(earlier_ids) == earlier["parsed"]
+    assert counters["duplicates"] == len(ad_ids)
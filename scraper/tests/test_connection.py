@@ -0,0 +1,64 @@
+"""Connection pool profiles and their metrics"""
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+
+from database.connection import PROFILE_OVERRIDES, MeteredQueuePool, _engine_options, load_profile
+
+
+@pytest.fixture(autouse=True)
+def clean_environment(monkeypatch):
+    monkeypatch.delenv("DB_PROFILE", raising=False)
+    for variable in PROFILE_OVERRIDES:
+        monkeypatch.delenv(variable, raising=False)
+
+
+def test_profile_from_db_profile(monkeypatch):
+    assert load_profile()["name"] == "default"
+    monkeypatch.setenv("DB_PROFILE", "worker")
+    profile = load_profile()
+    assert (profile["name"], profile["pool_size"], profile["max_overflow"]) == ("worker", 2, 2)
+    assert load_profile("bulk")["max_overflow"] == 0
+
+
+def test_environment_overrides_single_settings(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    profile = load_profile("worker")
+    assert profile["pool_size"] == 7
+    assert profile["pool_pre_ping"] is False
+    assert profile["max_overflow"] == 2
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError, match="Unknown DB_PROFILE"):
+        load_profile("huge")
+
+
+def test_engine_options_per_backend():
+    bulk = load_profile("bulk")
+    options = _engine_options(make_url("sqlite:///ads.db"), bulk)
+    assert options["poolclass"] is MeteredQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (2, 0)
+    assert options["connect_args"]["timeout"] == 120
+    # One connection holds an in-memory database; SQLAlchemy's own pool is kept
+    assert "poolclass" not in _engine_options(make_url("sqlite://"), bulk)
+    options = _engine_options(make_url("postgresql+psycopg2://user@localhost/ads"), bulk)
+    assert (options["executemany_mode"], options["executemany_batch_page_size"]) == ("values_plus_batch", 1000)
+    assert options["insertmanyvalues_page_size"] == 5000
+
+
+def test_pool_metrics_count_waits_and_timeouts(tmp_path):
+    profile = dict(load_profile("bulk"), pool_size=1, pool_timeout=0.1)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **_engine_options(make_url("sqlite:///pool.db"), profile))
+    try:
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        with engine.connect():
+            pass
+        metrics = engine.pool.metrics()
+        assert (metrics["checkouts"], metrics["timeouts"], metrics["peak_checked_out"]) == (2, 1, 1)
+        assert (metrics["pool_size"], metrics["max_overflow"]) == (1, 0)
+    finally:
+        engine.dispose()
@@ -0,0 +1,44 @@
+"""Parquet export: incremental runs and their watermark"""
+from datetime import datetime, timedelta
+
+import pyarrow.dataset as pa_dataset
+from sqlalchemy import update
+
+from database.export_parquet import export_parquet, load_state
+from database.import_ads import import_ads_bulk
+from database.models import Ad
+
+
+def make_ad(ad_id):
+    return {
+        "ad_id": ad_id,
+        "status": "active",
+        "platforms": ["Facebook"],
+        "start_date": "2026-01-08",
+        "end_date": None,
+        "page_name": "Nike",
+        "versions": [{"ad_copy": f"Copy of ad {ad_id}", "asset_type": "image"}],
+    }
+
+
+def exported_ad_ids(out_dir):
+    return sorted(pa_dataset.dataset(f"{out_dir}/ads", format="parquet").to_table(columns=["ad_id"])
+                  .column("ad_id").to_pylist())
+
+
+def test_incremental_export_picks_up_late_commits(db, tmp_path):
+    import_ads_bulk([make_ad("1"), make_ad("2")])
+    export_parquet(str(tmp_path), incremental=True)
+    assert exported_ad_ids(tmp_path) == ["1", "2"]
+    watermark = load_state(str(tmp_path))["watermark"]
+
+    # An import that started before the export read the watermark and committed after it
+    import_ads_bulk([make_ad("3")])
+    with db.begin() as conn:
+        conn.execute(update(Ad).where(Ad.ad_id == "3")
+                     .values(updated_at=datetime.fromisoformat(watermark) - timedelta(seconds=1)))
+
+    result = export_parquet(str(tmp_path), incremental=True)
+    assert exported_ad_ids(tmp_path) == ["1", "1", "2", "2", "3"]  # 1 and 2 again from the overlap
+    assert result["watermark"] == watermark
+
@@ -0,0 +1,80 @@
+"""Cursor replay against the local fixture server: pages, keep-alive and retries"""
+import json
+
+import pytest
+
+from fixtures.server import DEFAULT_PAGE_ID, FIXTURE_LSD, FixtureServer
+from graphql_parser import get_search_results, iter_collated_results
+from graphql_replay import HttpPool, ReplayError, ReplaySession, replay_pages
+
+PAGE_ID = "100001"
+
+
+@pytest.fixture(scope="module")
+def fixture_server():
+    with FixtureServer() as server:
+        yield server
+
+
+def fixture_session(server, page_id=PAGE_ID, lsd=FIXTURE_LSD):
+    """Replay session like the one the browser captures on the fixture page"""
+    form = {"doc_id": "fixture", "lsd": lsd, "variables": json.dumps({"cursor": None, "viewAllPageID": page_id})}
+    return ReplaySession(f"{server.base_url}/api/graphql/", form, cursor="0")
+
+
+def end_cursors(responses):
+    return [get_search_results(response_obj)["page_info"]["end_cursor"] for response_obj in responses]
+
+
+def test_replays_every_page_by_cursor_on_one_connection(fixture_server):
+    pool = HttpPool()
+    responses = list(replay_pages(fixture_session(fixture_server), pool))
+    pool.close()
+
+    pages = len(fixture_server.pages)
+    assert len(responses) == pages
+    assert end_cursors(responses) == [str(index) for index in range(1, pages)] + [None]
+    ad_ids = [result["ad_archive_id"] for response_obj in responses for result in iter_collated_results(response_obj)]
+    assert ad_ids and all(ad_id.startswith(PAGE_ID) for ad_id in ad_ids)
+    assert pool.connections_opened == 1
+
+
+def test_keep_alive_connection_per_host(fixture_server):
+    pool = HttpPool()
+    for page_id in (PAGE_ID, DEFAULT_PAGE_ID):
+        list(replay_pages(fixture_session(fixture_server, page_id), pool, max_pages=2))
+    # 127.0.0.1 and localhost are separate hosts to the pool
+    third_party = ReplaySession(f"{fixture_server.third_party_url}/api/graphql/",
+                                fixture_session(fixture_server).form, cursor="0")
+    list(replay_pages(third_party, pool, max_pages=2))
+    pool.close()
+    assert pool.connections_opened == 2
+
+
+def test_retries_a_server_error(fixture_server):
+    pool = HttpPool()
+    fixture_server.fail_graphql(1, status=503)
+    requests_before = fixture_server.graphql_requests
+    responses = list(replay_pages(fixture_session(fixture_server), pool, max_pages=2, backoff=0.0))
+    pool.close()
+
+    assert end_cursors(responses) == ["1", "2"]
+    assert fixture_server.graphql_requests - requests_before == 3  # One retry
+    assert pool.connections_opened == 1  # The error response kept the connection alive
+
+
+def test_gives_up_after_the_retries(fixture_server):
+    pool = HttpPool()
+    fixture_server.fail_graphql(2, status=502)
+    with pytest.raises(ReplayError, match="after 2 attempts"):
+        list(replay_pages(fixture_session(fixture_server), pool, retries=1, backoff=0.0))
+    pool.close()
+
+
+def test_client_errors_are_not_retried(fixture_server):
+    pool = HttpPool()
+    requests_before = fixture_server.graphql_requests
+    with pytest.raises(ReplayError, match="HTTP 403"):
+        list(replay_pages(fixture_session(fixture_server, lsd="expired"), pool, backoff=0.0))
+    pool.close()
+    assert fixture_server.graphql_requests == requests_before  # Rejected before counting
@@ -0,0 +1,121 @@
+"""Importer: fingerprints, unchanged-ad skip, id resolution"""
+import copy
+
+from sqlalchemy import func, select
+
+from database.connection import POSTGRESQL_MAX_PARAMETERS, SQLITE_MAX_VARIABLE_NUMBER, values_chunks
+from database.fingerprints import version_fingerprint
+from database.import_ads import _write_batch, import_ads_bulk, prepare_ad
+from database.models import Ad, AdEvent, AdPlatform, AdVersion
+
+IMAGE_URL = ("https://scontent.ftlv5-1.fna.fbcdn.net/v/t39.35426-6/590867089_n.jpg"
+             "?stp=dst-jpg_s600x600_tt6&_nc_cat=111&_nc_ohc=XbsiT02hiKoQ7kNvwGtV5PF"
+             "&_nc_gid=USyQAqYUki2lQjM8TwkDqw&oh=00_AfraClsTTPNL&oe=696B89EA")
+RESIGNED_URL = ("https://scontent.ftlv5-1.fna.fbcdn.net/v/t39.35426-6/590867089_n.jpg"
+                "?stp=dst-jpg_s600x600_tt6&_nc_cat=111&_nc_ohc=Q2dV9kLmZ0sQ7kNvwH1aB2c"
+                "&_nc_gid=Zx81PqLm3nVbT0aKd9wQzA&oh=00_AfqZ93kLmPq1&oe=6975C1F0")
+
+
+def make_ad(ad_id="1000", image_url=IMAGE_URL):
+    return {
+        "ad_id": ad_id,
+        "status": "active",
+        "platforms": ["Facebook", "Instagram"],
+        "start_date": "2026-01-08",
+        "end_date": None,
+        "page_name": "Nike",
+        "page_profile_uri": "https://www.facebook.com/nike/",
+        "versions": [{
+            "ad_copy": "Get the gear not afraid to put in the work.",
+            "title": "Nike Air Monarch IV",
+            "image_url": image_url,
+            "video_url": None,
+            "asset_type": "image",
+            "link_url": "https://www.nike.com/t/air-monarch-iv",
+            "link_description": None,
+            "cta_text": "Shop Now",
+            "cta_type": "SHOP_NOW",
+            "caption": "nike.com",
+        }],
+    }
+
+
+def test_version_fingerprint_ignores_url_signatures():
+    version = make_ad()["versions"][0]
+    resigned = dict(version, image_url=RESIGNED_URL)
+    other_rendition = dict(version, image_url=IMAGE_URL.replace("s600x600", "s1080x1080"))
+    assert version_fingerprint(version) == version_fingerprint(resigned)
+    assert version_fingerprint(version) != version_fingerprint(other_rendition)
+
+
+def test_reimport_with_resigned_urls_is_skipped(db):
+    assert import_ads_bulk([make_ad()])["imported"] == 1
+    with db.connect() as conn:
+        version_id, updated_at = conn.execute(select(AdVersion.id, Ad.updated_at).join(Ad)).one()
+    counts = import_ads_bulk([make_ad(image_url=RESIGNED_URL)])
+    assert counts["unchanged"] == 1
+    assert counts["updated"] == 0
+    assert counts["events"] == 0
+    # The new link is stored in place, so it does not expire with the old one
+    with db.connect() as conn:
+        assert conn.execute(select(AdVersion.id, AdVersion.image_url, Ad.updated_at).join(Ad)).one() == \
+            (version_id, RESIGNED_URL, updated_at)
+        assert conn.execute(select(func.count()).select_from(AdEvent)).scalar() == 1  # ad_started
+
+
+def test_changed_ad_keeps_unchanged_versions_with_resigned_urls(db):
+    ad = make_ad()
+    ad["versions"].append(dict(ad["versions"][0], ad_copy="Second card"))
+    import_ads_bulk([ad])
+    with db.connect() as conn:
+        first_version = conn.execute(select(AdVersion.id).where(AdVersion.version_number == 1)).scalar()
+
+    changed = copy.deepcopy(ad)
+    changed["versions"][0]["image_url"] = RESIGNED_URL
+    changed["versions"][1]["ad_copy"] = "New second card"
+    assert import_ads_bulk([changed])["updated"] == 1
+    with db.connect() as conn:
+        assert conn.execute(select(AdVersion.id, AdVersion.image_url).where(AdVersion.version_number == 1)).one() == \
+            (first_version, RESIGNED_URL)
+
+
+def test_reimport_with_changed_copy_is_updated(db):
+    import_ads_bulk([make_ad()])
+    changed = copy.deepcopy(make_ad())
+    changed["versions"][0]["ad_copy"] = "New copy"
+    counts = import_ads_bulk([changed])
+    assert counts["updated"] == 1
+
+
+def test_write_resolves_ids_inside_the_transaction(db):
+    # Prepared as new, then another import stores the ad before this batch writes
+    changed = make_ad()
+    changed["versions"][0]["ad_copy"] = "New copy"
+    item = prepare_ad(changed, None)
+    import_ads_bulk([make_ad()])
+
+    with db.begin() as conn:
+        _write_batch(conn, [item])
+    assert item["existing"]
+    with db.connect() as conn:
+        ad_pks = conn.execute(select(Ad.id)).scalars().all()
+        assert len(ad_pks) == 1
+        assert set(conn.execute(select(AdVersion.ad_id)).scalars()) == set(ad_pks)
+        assert set(conn.execute(select(AdPlatform.ad_id)).scalars()) == set(ad_pks)
+        assert conn.execute(select(AdVersion.ad_copy)).scalars().all() == ["New copy"]
+
+
+def test_values_chunks_stay_under_the_parameter_limit(db):
+    rows = [make_ad(str(i)) for i in range(1000)]
+    with db.connect() as conn:
+        chunks = list(values_chunks(conn, rows))
+        limit = POSTGRESQL_MAX_PARAMETERS if conn.dialect.name == "postgresql" else SQLITE_MAX_VARIABLE_NUMBER
+    assert [row for chunk in chunks for row in chunk] == rows
+    assert all(len(chunk) * len(rows[0]) <= limit for chunk in chunks)
+
+
+def test_batch_larger_than_one_statement(db):
+    ads = [make_ad(str(5000 + i)) for i in range(300)]
+    assert import_ads_bulk(ads, batch_size=300)["imported"] == 300
+    with db.connect() as conn:
+        assert len(conn.execute(select(Ad.id)).all()) == 300
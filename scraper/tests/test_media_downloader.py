@@ -0,0 +1,52 @@
+"""Media store: URL keys without signatures, content-addressed dedupe"""
+import hashlib
+
+from media_downloader import MediaStore, media_key
+
+IMAGE_URL = ("https://scontent.ftlv5-1.fna.fbcdn.net/v/t39.35426-6/590867089_n.jpg"
+             "?stp=dst-jpg_s600x600_tt6&_nc_cat=111&_nc_ohc=XbsiT02hiKoQ7kNvwGtV5PF&oh=00_AfraClsTTPNL&oe=696B89EA")
+RESIGNED_URL = ("https://scontent.ftlv5-1.fna.fbcdn.net/v/t39.35426-6/590867089_n.jpg"
+                "?_nc_cat=111&stp=dst-jpg_s600x600_tt6&_nc_ohc=Q2dV9kLmZ0sQ7kNvwH1aB2c&oh=00_AfqZ93kLmPq1&oe=6975C1F0")
+LARGER_URL = IMAGE_URL.replace("s600x600", "s1080x1080")
+
+
+def store_file(store, content, ext=".jpg"):
+    temp = store.temp_file()
+    temp.write(content)
+    temp.close()
+    return store.put(temp.name, hashlib.sha256(content).hexdigest(), ext)
+
+
+def test_media_key_ignores_signatures_but_not_renditions():
+    assert media_key(IMAGE_URL) == "scontent.ftlv5-1.fna.fbcdn.net/v/t39.35426-6/590867089_n.jpg?stp=dst-jpg_s600x600_tt6"
+    assert media_key(LARGER_URL) != media_key(IMAGE_URL)
+    assert media_key("https://video.xx.fbcdn.net/o1/v/t2/f2/m69/clip.mp4?oh=1&oe=2") == \
+        "video.xx.fbcdn.net/o1/v/t2/f2/m69/clip.mp4"
+
+
+def test_resigned_url_hits_the_url_index_after_a_restart(tmp_path):
+    store = MediaStore(str(tmp_path))
+    relative_path, new = store_file(store, b"image bytes")
+    assert new
+    store.remember(IMAGE_URL, hashlib.sha256(b"image bytes").hexdigest(), relative_path)
+
+    reopened = MediaStore(str(tmp_path))
+    assert reopened.lookup(RESIGNED_URL) == (hashlib.sha256(b"image bytes").hexdigest(), relative_path)
+    assert reopened.lookup(LARGER_URL) is None
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = MediaStore(str(tmp_path))
+    first = store_file(store, b"image bytes")
+    second = store_file(store, b"image bytes")
+    assert first == (first[0], True)
+    assert second == (first[0], False)
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+
+def test_lookup_misses_when_the_file_is_gone(tmp_path):
+    store = MediaStore(str(tmp_path))
+    relative_path, _ = store_file(store, b"image bytes")
+    store.remember(IMAGE_URL, hashlib.sha256(b"image bytes").hexdigest(), relative_path)
+    (tmp_path / relative_path).unlink()
+    assert store.lookup(IMAGE_URL) is None
@@ -0,0 +1,26 @@
+"""Statistics rollups kept by the importer"""
+from datetime import date, timedelta
+
+from database import rollups
+from database.import_ads import import_ads_bulk
+
+
+def make_ad(ad_id, start_date, page_name):
+    return {
+        "ad_id": ad_id,
+        "status": "active",
+        "platforms": ["Facebook", "Instagram"],
+        "start_date": start_date.isoformat(),
+        "end_date": None,
+        "page_name": page_name,
+        "versions": [{"ad_copy": f"Copy of ad {ad_id}", "asset_type": "image"}],
+    }
+
+
+def test_deltas_larger_than_one_statement_match_a_rebuild(db):
+    # 900 daily and 300 page rollup rows: more parameters than one SQLite statement takes
+    first = date(2025, 1, 1)
+    ads = [make_ad(str(7000 + i), first + timedelta(days=i), f"Page {i}") for i in range(300)]
+    assert import_ads_bulk(ads, batch_size=300)["imported"] == 300
+    with db.connect() as conn:
+        assert rollups.verify(conn) == []
@@ -0,0 +1,57 @@
+"""Scheduler: job claims and leases, on the fake scraper backend"""
+from datetime import timedelta
+
+from sqlalchemy import select, update
+
+from database.models import Ad, ScrapeJob
+from fixtures.fake_scraper import FakeScraperBackend
+from scheduler import Scheduler, add_job, utcnow
+
+TARGET = "15087023444"
+
+
+def make_scheduler(**options):
+    return Scheduler(FakeScraperBackend(delay=0, seed=1), domain_interval=0, **options)
+
+
+def job_row(db):
+    with db.connect() as conn:
+        return conn.execute(select(ScrapeJob.__table__)).mappings().one()
+
+
+def test_second_scheduler_skips_a_job_still_running(db):
+    add_job(TARGET, interval_minutes=0)
+    first, second = make_scheduler(), make_scheduler()
+    assert [job["target"] for job in first.claim_due_jobs(5)] == [TARGET]
+    assert second.claim_due_jobs(5) == []
+    job = job_row(db)
+    assert job["running_since"] is not None
+    assert job["last_status"] == "skipped"
+
+
+def test_expired_lease_is_claimed_again(db):
+    add_job(TARGET, interval_minutes=0)
+    assert make_scheduler().claim_due_jobs(5)
+    # The claiming scheduler died without finishing the run
+    with db.begin() as conn:
+        conn.execute(update(ScrapeJob.__table__).values(running_since=utcnow() - timedelta(minutes=181)))
+    assert [job["target"] for job in make_scheduler(lease_minutes=180).claim_due_jobs(5)] == [TARGET]
+
+
+def test_claim_limit_takes_the_highest_priority(db):
+    add_job("111", interval_minutes=60, priority=0)
+    add_job("222", interval_minutes=60, priority=10)
+    assert [job["target"] for job in make_scheduler().claim_due_jobs(1)] == ["222"]
+
+
+def test_run_once_releases_the_lease(db, tmp_path):
+    add_job(TARGET, interval_minutes=60, max_ads=10)
+    scheduler = make_scheduler(work_dir=str(tmp_path))
+    scheduler.run(once=True)
+    job = job_row(db)
+    assert job["running_since"] is None
+    assert job["last_status"] == "ok"
+    assert job["next_run_at"] > utcnow()
+    assert scheduler.claim_due_jobs(5) == []  # Not due until its next interval
+    with db.connect() as conn:
+        assert len(conn.execute(select(Ad.id)).all()) == job["last_ads"] == 10
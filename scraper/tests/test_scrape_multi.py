@@ -0,0 +1,52 @@
+"""Concurrent browser scrape of several fixture advertisers (skipped without Playwright's Chromium)"""
+import asyncio
+import json
+import os
+
+import pytest
+
+from fixtures.server import FixtureServer
+from graphql_parser import parse_graphql_responses
+
+PAGE_IDS = ["100001", "100002"]
+MAX_ADS = 40
+
+
+def chromium_installed() -> bool:
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            return os.path.exists(p.chromium.executable_path)
+    except Exception:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not chromium_installed(),
+                                reason="needs Playwright with Chromium (py -m playwright install chromium)")
+
+
+def expected_ads(server, page_id):
+    responses = [{"url": "", "data": server.graphql_page(page_id, str(index))} for index in range(len(server.pages))]
+    return min(MAX_ADS, len(parse_graphql_responses(responses, max_ads=10 ** 9)))
+
+
+def test_scrapes_targets_concurrently_into_their_own_directories(tmp_path, monkeypatch):
+    from scrape_multi import scrape_targets
+
+    monkeypatch.chdir(tmp_path)  # Browser state files stay out of the repo
+    output_dir = tmp_path / "scrape_output"
+    with FixtureServer() as server:
+        targets = [server.library_url(page_id) for page_id in PAGE_IDS]
+        results = asyncio.run(scrape_targets(targets, str(output_dir), concurrency=2, contexts=2,
+                                             max_ads=MAX_ADS, idle_timeout=2.0))
+        expected = {page_id: expected_ads(server, page_id) for page_id in PAGE_IDS}
+
+    assert sorted(os.listdir(output_dir)) == PAGE_IDS
+    for page_id, result in zip(PAGE_IDS, results):
+        assert "error" not in result
+        assert result["output_file"] == str(output_dir / page_id / "scraped_ads.json")
+        assert (output_dir / page_id / "graphql_responses.ndjson").exists()
+        with open(result["output_file"], encoding="utf-8") as f:
+            ads = json.load(f)["ads"]
+        assert result["ads"] == len(ads) == expected[page_id]
+        assert all(str(ad["ad_id"]).startswith(page_id) for ad in ads)
@@ -0,0 +1,69 @@
+"""Scroll termination: the stop reasons of ScrollTracker"""
+from scroll_control import ScrollTracker
+
+
+def response(ad_ids, has_next_page=True, cards=True):
+    results = [{"ad_archive_id": ad_id, "snapshot": {"cards": [{"body": "Copy"}] if cards else []}}
+               for ad_id in ad_ids]
+    return {"url": "https://www.facebook.com/api/graphql/", "data": {"data": {"ad_library_main": {
+        "search_results_connection": {
+            "edges": [{"node": {"collated_results": results}}],
+            "page_info": {"has_next_page": has_next_page, "end_cursor": "cursor"},
+        },
+    }}}}
+
+
+def scroll(tracker, ad_ids=()):
+    ads_before = tracker.ad_count
+    if ad_ids:
+        tracker.record_response(response(ad_ids))
+    tracker.record_scroll(ads_before)
+
+
+def test_keeps_going_while_pages_bring_new_ads():
+    tracker = ScrollTracker(max_ads=10, max_idle_scrolls=2, max_scrolls=5)
+    scroll(tracker, ["1", "2"])
+    scroll(tracker, ["3"])
+    assert tracker.stop_reason() is None
+    assert tracker.end_cursor == "cursor"
+
+
+def test_stops_at_the_end_of_results():
+    tracker = ScrollTracker(max_ads=10)
+    tracker.record_response(response(["1"], has_next_page=False))
+    assert tracker.stop_reason() == "end of results"
+
+
+def test_stops_at_max_ads_counting_unique_parsable_ads():
+    tracker = ScrollTracker(max_ads=3)
+    tracker.record_response(response(["1", "2"]))
+    tracker.record_response(response(["2"]))  # Duplicate
+    tracker.record_response(response(["4"], cards=False))  # Dropped by the parser
+    assert tracker.ad_count == 2
+    assert tracker.stop_reason() is None
+    tracker.record_response(response(["3"]))
+    assert tracker.stop_reason() == "reached 3 ads"
+
+
+def test_stops_after_idle_scrolls_in_a_row():
+    tracker = ScrollTracker(max_idle_scrolls=2)
+    scroll(tracker, ["1"])
+    scroll(tracker)
+    scroll(tracker, ["1"])  # Only an ad seen before
+    assert tracker.stop_reason() == "2 scrolls without new ads"
+
+
+def test_new_ads_reset_the_idle_count():
+    tracker = ScrollTracker(max_idle_scrolls=2)
+    scroll(tracker)
+    scroll(tracker, ["1"])
+    scroll(tracker)
+    assert tracker.idle_scrolls == 1
+    assert tracker.stop_reason() is None
+
+
+def test_stops_at_max_scrolls():
+    tracker = ScrollTracker(max_scrolls=3)
+    for i in range(3):
+        scroll(tracker, [str(i)])
+    assert tracker.stop_reason() == "reached 3 scrolls"